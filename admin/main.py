@@ -2,19 +2,53 @@
 # ADMIN DASHBOARD BACKEND (admin/main.py)
 # ============================================================================
 from fastapi import FastAPI, Depends
-from typing import List, Dict
-import psycopg2
+from typing import List, Dict, Optional
+import asyncpg
+import os
 from datetime import datetime, timedelta
+from middleware.metrics import setup_metrics_endpoint
+from middleware.event_loop import setup_event_loop
 
 app = FastAPI(title="Admin Dashboard API")
+setup_metrics_endpoint(app)
+
+# Database access goes through an asyncpg pool so queries never block the loop
+setup_event_loop(
+    app,
+    "admin",
+    threads=int(os.getenv("EVENT_LOOP_THREADS", "8")),
+    block_threshold_ms=float(os.getenv("EVENT_LOOP_BLOCK_THRESHOLD_MS", "100"))
+)
+
+POSTGRES_HOST = os.getenv("POSTGRES_HOST", "postgres")
+POSTGRES_DB = os.getenv("POSTGRES_DB", "chatbot_db")
+POSTGRES_USER = os.getenv("POSTGRES_USER", "chatbot_user")
+POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD", "chatbot_password")
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+
+db_pool: Optional[asyncpg.Pool] = None
+
+@app.on_event("startup")
+async def open_db_pool():
+    global db_pool
+    db_pool = await asyncpg.create_pool(
+        host=POSTGRES_HOST,
+        database=POSTGRES_DB,
+        user=POSTGRES_USER,
+        password=POSTGRES_PASSWORD,
+        min_size=1,
+        max_size=DB_POOL_MAX_SIZE
+    )
+
+@app.on_event("shutdown")
+async def close_db_pool():
+    if db_pool is not None:
+        await db_pool.close()
 
 @app.get("/dashboard/overview")
 async def get_overview():
-    conn = get_db_connection()
-    cur = conn.cursor()
-    
     # Get key metrics
-    cur.execute("""
+    metrics = await db_pool.fetchrow("""
         SELECT 
             (SELECT COUNT(*) FROM escalations WHERE status = 'pending') as pending_escalations,
             (SELECT COUNT(DISTINCT session_id) FROM audit_logs 
@@ -25,10 +59,6 @@ async def get_overview():
              WHERE created_at >= NOW() - INTERVAL '24 hours') as orders_24h
     """)
     
-    metrics = cur.fetchone()
-    cur.close()
-    conn.close()
-    
     return {
         "pending_escalations": metrics[0],
         "active_sessions_24h": metrics[1],
@@ -39,10 +69,7 @@ async def get_overview():
 
 @app.get("/dashboard/intents")
 async def get_intent_distribution():
-    conn = get_db_connection()
-    cur = conn.cursor()
-    
-    cur.execute("""
+    intents = await db_pool.fetch("""
         SELECT 
             details->>'intent' as intent,
             COUNT(*) as count
@@ -54,10 +81,6 @@ async def get_intent_distribution():
         LIMIT 10
     """)
     
-    intents = cur.fetchall()
-    cur.close()
-    conn.close()
-    
     return {
         "intents": [
             {"intent": row[0], "count": row[1]} 
@@ -5,13 +5,29 @@ from fastapi import FastAPI
 from pydantic import BaseModel
 from typing import List, Optional
 from datetime import datetime
-import redis
+import redis.asyncio as redis
 import json
+import os
+from middleware.metrics import setup_metrics_endpoint
+from middleware.event_loop import setup_event_loop
 
 app = FastAPI(title="Conversation History Service")
+setup_metrics_endpoint(app)
+
+# Redis is awaited through redis.asyncio so history calls never block the loop
+setup_event_loop(
+    app,
+    "conversation_history",
+    threads=int(os.getenv("EVENT_LOOP_THREADS", "8")),
+    block_threshold_ms=float(os.getenv("EVENT_LOOP_BLOCK_THRESHOLD_MS", "100"))
+)
 
 redis_client = redis.Redis(host='redis', port=6379, decode_responses=True)
 
+@app.on_event("shutdown")
+async def close_redis():
+    await redis_client.close()
+
 class ConversationMessage(BaseModel):
     session_id: str
     user_id: str
@@ -29,15 +45,17 @@ async def add_message(conv: ConversationMessage):
     key = f"conversation:{conv.session_id}"
     message_data = json.dumps(conv.dict())
     
-    redis_client.rpush(key, message_data)
-    redis_client.expire(key, 86400)  # 24 hours
+    async with redis_client.pipeline(transaction=False) as pipe:
+        pipe.rpush(key, message_data)
+        pipe.expire(key, 86400)  # 24 hours
+        await pipe.execute()
     
     return {"status": "success"}
 
 @app.get("/conversation/{session_id}")
 async def get_conversation(session_id: str, limit: int = 10):
     key = f"conversation:{session_id}"
-    messages = redis_client.lrange(key, -limit, -1)
+    messages = await redis_client.lrange(key, -limit, -1)
     
     return {
         "session_id": session_id,
@@ -4,9 +4,29 @@
 from fastapi import FastAPI
 from pydantic import BaseModel
 from typing import Optional
-import psycopg2
+import asyncpg
+import os
+from middleware.metrics import setup_metrics_endpoint
+from middleware.event_loop import setup_event_loop
 
 app = FastAPI(title="Feedback Service")
+setup_metrics_endpoint(app)
+
+# Database access goes through an asyncpg pool so queries never block the loop
+setup_event_loop(
+    app,
+    "feedback",
+    threads=int(os.getenv("EVENT_LOOP_THREADS", "8")),
+    block_threshold_ms=float(os.getenv("EVENT_LOOP_BLOCK_THRESHOLD_MS", "100"))
+)
+
+POSTGRES_HOST = os.getenv("POSTGRES_HOST", "postgres")
+POSTGRES_DB = os.getenv("POSTGRES_DB", "chatbot_db")
+POSTGRES_USER = os.getenv("POSTGRES_USER", "chatbot_user")
+POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD", "chatbot_password")
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+
+db_pool: Optional[asyncpg.Pool] = None
 
 class Feedback(BaseModel):
     session_id: str
@@ -15,40 +35,39 @@ class Feedback(BaseModel):
     comment: Optional[str] = None
     category: Optional[str] = None
 
-def get_db_connection():
-    return psycopg2.connect(
-        host="postgres",
-        database="chatbot_db",
-        user="chatbot_user",
-        password="chatbot_password"
+@app.on_event("startup")
+async def open_db_pool():
+    global db_pool
+    db_pool = await asyncpg.create_pool(
+        host=POSTGRES_HOST,
+        database=POSTGRES_DB,
+        user=POSTGRES_USER,
+        password=POSTGRES_PASSWORD,
+        min_size=1,
+        max_size=DB_POOL_MAX_SIZE
     )
 
+@app.on_event("shutdown")
+async def close_db_pool():
+    if db_pool is not None:
+        await db_pool.close()
+
 @app.post("/feedback")
 async def submit_feedback(feedback: Feedback):
-    conn = get_db_connection()
-    cur = conn.cursor()
-    
-    cur.execute(
+    await db_pool.execute(
         """
         INSERT INTO feedback (session_id, user_id, rating, comment, category, created_at)
-        VALUES (%s, %s, %s, %s, %s, NOW())
+        VALUES ($1, $2, $3, $4, $5, NOW())
         """,
-        (feedback.session_id, feedback.user_id, feedback.rating, 
-         feedback.comment, feedback.category)
+        feedback.session_id, feedback.user_id, feedback.rating,
+        feedback.comment, feedback.category
     )
     
-    conn.commit()
-    cur.close()
-    conn.close()
-    
     return {"status": "success", "message": "Thank you for your feedback!"}
 
 @app.get("/feedback/stats")
 async def get_feedback_stats():
-    conn = get_db_connection()
-    cur = conn.cursor()
-    
-    cur.execute("""
+    stats = await db_pool.fetchrow("""
         SELECT 
             AVG(rating) as avg_rating,
             COUNT(*) as total_feedback,
@@ -57,10 +76,6 @@ async def get_feedback_stats():
         WHERE created_at >= NOW() - INTERVAL '7 days'
     """)
     
-    stats = cur.fetchone()
-    cur.close()
-    conn.close()
-    
     return {
         "average_rating": float(stats[0]) if stats[0] else 0,
         "total_feedback": stats[1],
@@ -0,0 +1,118 @@
+# ============================================================================
+# JWT VERIFICATION (gateway/auth.py)
+# ============================================================================
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+import jwt
+from jwt.algorithms import get_default_algorithms
+from prometheus_client import Counter
+
+token_cache_requests = Counter(
+    'gateway_token_cache_requests_total',
+    'Bearer token verifications by cache outcome',
+    ['outcome']
+)
+
+
+class TokenVerifier:
+    """Reusable JWT verifier with a bounded cache of verified claims.
+
+    Keys and decode options are prepared once. Supply ``secret_key`` for HMAC,
+    ``public_key`` (PEM) for a single asymmetric key, or ``jwks_url`` to
+    resolve keys by ``kid`` from a cached JWKS. A single key requires every
+    algorithm in ``algorithms`` to use the same key type. Verified claims are cached by
+    token digest until the earlier of ``cache_ttl`` and the token's ``exp``.
+    """
+
+    def __init__(
+        self,
+        secret_key: Optional[str] = None,
+        algorithms: Optional[List[str]] = None,
+        public_key: Optional[str] = None,
+        jwks_url: Optional[str] = None,
+        audience: Optional[str] = None,
+        issuer: Optional[str] = None,
+        cache_size: int = 10000,
+        cache_ttl: float = 300.0,
+        jwks_cache_lifespan: int = 300,
+    ):
+        self.algorithms = algorithms or ["HS256"]
+        self.audience = audience
+        self.issuer = issuer
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+
+        self._jwks_client = None
+        self._key = None
+        if jwks_url:
+            self._jwks_client = jwt.PyJWKClient(
+                jwks_url,
+                cache_keys=True,
+                cache_jwk_set=True,
+                lifespan=jwks_cache_lifespan
+            )
+        else:
+            raw_key = public_key or secret_key
+            if raw_key is None:
+                raise ValueError("A secret key, public key or JWKS URL is required")
+            # One key verifies every accepted algorithm, so they must all take
+            # the same kind of key (HMAC secret, RSA, EC, ...)
+            supported = get_default_algorithms()
+            unknown = [name for name in self.algorithms if name not in supported]
+            if unknown:
+                raise ValueError(f"Unsupported JWT algorithms: {unknown}")
+            if len({type(supported[name]).prepare_key for name in self.algorithms}) > 1:
+                raise ValueError(f"JWT algorithms {self.algorithms} need different key types; use a JWKS URL")
+            # Parse the key once instead of on every decode
+            self._key = supported[self.algorithms[0]].prepare_key(raw_key)
+
+        self._cache: "OrderedDict[bytes, Tuple[Dict[str, Any], float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _signing_key(self, token: str):
+        if self._jwks_client is not None:
+            return self._jwks_client.get_signing_key_from_jwt(token).key
+        return self._key
+
+    def _decode(self, token: str) -> Dict[str, Any]:
+        return jwt.decode(
+            token,
+            self._signing_key(token),
+            algorithms=self.algorithms,
+            audience=self.audience,
+            issuer=self.issuer
+        )
+
+    def verify(self, token: str) -> Dict[str, Any]:
+        """Return the token's claims, raising jwt.InvalidTokenError if it is not valid"""
+        digest = hashlib.sha256(token.encode()).digest()
+        now = time.time()
+
+        with self._lock:
+            entry = self._cache.get(digest)
+            if entry is not None:
+                claims, expires_at = entry
+                if expires_at > now:
+                    self._cache.move_to_end(digest)
+                    token_cache_requests.labels(outcome="hit").inc()
+                    return dict(claims)
+                del self._cache[digest]
+
+        token_cache_requests.labels(outcome="miss").inc()
+        claims = self._decode(token)
+
+        expires_at = now + self.cache_ttl
+        if "exp" in claims:
+            expires_at = min(expires_at, float(claims["exp"]))
+        with self._lock:
+            self._cache[digest] = (dict(claims), expires_at)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return claims
+
+    def clear(self):
+        with self._lock:
+            self._cache.clear()
@@ -3,22 +3,37 @@
 # ============================================================================
 from fastapi import FastAPI, HTTPException, Depends, Header, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Optional, Dict, Any
-import httpx
+import os
 import time
-import redis
+import httpx
+import redis.asyncio as redis
 from datetime import datetime, timedelta
 import jwt
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi import Depends
 from middleware.metrics import setup_metrics_endpoint
+from middleware.event_loop import setup_event_loop
+from middleware.rate_limiter import RateLimiter, rate_limit_headers
+from auth import TokenVerifier
+from utils.service_client import ServiceClients, format_sse
 security = HTTPBearer()
 
 app = FastAPI(title="API Gateway", swagger_ui_init_oauth={
         "usePkceWithAuthorizationCodeGrant": False
     })
 setup_metrics_endpoint(app)
+
+# Blocking work goes to a bounded pool; handlers that block the loop are flagged
+setup_event_loop(
+    app,
+    "gateway",
+    threads=int(os.getenv("EVENT_LOOP_THREADS", "8")),
+    block_threshold_ms=float(os.getenv("EVENT_LOOP_BLOCK_THRESHOLD_MS", "100"))
+)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
@@ -28,10 +43,47 @@ app.add_middleware(
 )
 
 
-# Redis for rate limiting
-redis_client = redis.Redis(host='redis', port=6379, decode_responses=True)
+# Upstream services (pooled clients; the gateway sets the end-to-end budget)
+NLU_SERVICE_URL = os.getenv("NLU_SERVICE_URL", "http://nlu-service:8001")
+REQUEST_BUDGET_SECONDS = float(os.getenv("GATEWAY_REQUEST_BUDGET_SECONDS", "30"))
+
+service_clients = ServiceClients()
+service_clients.register("nlu", NLU_SERVICE_URL, timeout=30.0)
+service_clients.setup(app, default_budget=REQUEST_BUDGET_SECONDS)
 
-SECRET_KEY = "your-secret-key-change-in-production"
+# Redis for rate limiting (async client: decisions never block the event loop)
+redis_client = redis.Redis(host=os.getenv("REDIS_HOST", "redis"), port=6379, decode_responses=True)
+
+# Requests per window for each user tier
+RATE_LIMIT_TIERS = {
+    "standard": (60, 60),
+    "premium": (300, 60),
+}
+rate_limiter = RateLimiter(
+    redis_client,
+    algorithm=os.getenv("GATEWAY_RATE_LIMIT_ALGORITHM", "sliding_counter"),
+    limit=60,
+    window=60,
+    tier_limits=RATE_LIMIT_TIERS,
+    local_precheck=os.getenv("GATEWAY_RATE_LIMIT_LOCAL_PRECHECK", "true").lower() == "true",
+    # Two-tier mode (token_bucket only): 0 disables local leasing
+    lease_size=int(os.getenv("GATEWAY_RATE_LIMIT_LEASE_SIZE", "0")),
+    lease_ttl=float(os.getenv("GATEWAY_RATE_LIMIT_LEASE_TTL", "1.0")),
+    max_over_admit=int(os.getenv("GATEWAY_RATE_LIMIT_MAX_OVER_ADMIT", "0"))
+)
+
+SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
+
+# Tokens are verified once and their claims cached until they expire.
+# Set JWT_JWKS_URL (or JWT_PUBLIC_KEY) with an RS256/ES256 algorithm for asymmetric keys.
+token_verifier = TokenVerifier(
+    secret_key=SECRET_KEY,
+    algorithms=[os.getenv("JWT_ALGORITHM", "HS256")],
+    public_key=os.getenv("JWT_PUBLIC_KEY"),
+    jwks_url=os.getenv("JWT_JWKS_URL"),
+    cache_size=int(os.getenv("JWT_CACHE_SIZE", "10000")),
+    cache_ttl=float(os.getenv("JWT_CACHE_TTL_SECONDS", "300"))
+)
 
 class ChatMessage(BaseModel):
     message: str
@@ -42,26 +94,21 @@ class ChatMessage(BaseModel):
 class AuthToken(BaseModel):
     token: str
 
-# Rate limiting
-async def check_rate_limit(user_id: str):
-    key = f"rate_limit:{user_id}"
-    count = redis_client.get(key)
-    
-    if count is None:
-        redis_client.setex(key, 60, 1)
-        return True
-    
-    if int(count) >= 60:  # 60 requests per minute
-        raise HTTPException(status_code=429, detail="Rate limit exceeded")
-    
-    redis_client.incr(key)
+# Rate limiting, keyed on the verified token claims (never on the request body)
+async def check_rate_limit(user_id: str, tier: Optional[str] = None):
+    result = await rate_limiter.hit(user_id, tier)
+    if not result.allowed:
+        raise HTTPException(
+            status_code=429,
+            detail="Rate limit exceeded",
+            headers=rate_limit_headers(result)
+        )
     return True
 
 def verify_token(credentials: HTTPAuthorizationCredentials = Depends(security)):
     token = credentials.credentials
     try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=["HS256"])
-        return payload
+        return token_verifier.verify(token)
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token expired")
     except jwt.InvalidTokenError:
@@ -72,21 +119,56 @@ async def chat_endpoint(
     message: ChatMessage,
     user: dict = Depends(verify_token)
 ):
-    await check_rate_limit(message.user_id)
+    await check_rate_limit(user["user_id"], user.get("tier"))
     
     # Route to NLU service
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            "http://nlu-service:8001/process",
-            json={
-                "message": message.message,
-                "user_id": message.user_id,
-                "session_id": message.session_id,
-                "metadata": message.metadata
-            },
-            timeout=30.0
-        )
-        return response.json()
+    response = await service_clients["nlu"].post(
+        "/process",
+        json={
+            "message": message.message,
+            "user_id": message.user_id,
+            "session_id": message.session_id,
+            "metadata": message.metadata
+        }
+    )
+    return response.json()
+
+@app.post("/api/chat/stream")
+async def chat_stream_endpoint(
+    message: ChatMessage,
+    user: dict = Depends(verify_token)
+):
+    """Stream the reply as Server-Sent Events: nlu, token*, then done (or error)"""
+    await check_rate_limit(user["user_id"], user.get("tier"))
+
+    async def relay():
+        # Pass bytes through untouched so tokens reach the client as they arrive
+        try:
+            async with service_clients["nlu"].stream(
+                "POST",
+                "/process/stream",
+                json={
+                    "message": message.message,
+                    "user_id": message.user_id,
+                    "session_id": message.session_id,
+                    "metadata": message.metadata
+                }
+            ) as response:
+                if response.status_code != 200:
+                    await response.aread()
+                    yield format_sse("error", {"detail": f"NLU service returned {response.status_code}"})
+                    return
+                async for chunk in response.aiter_raw():
+                    yield chunk
+        except httpx.HTTPError as e:
+            # Terminate any half-sent event, then tell the client why the stream stopped
+            yield "\n\n" + format_sse("error", {"detail": f"Response stream interrupted: {e}"})
+
+    return StreamingResponse(
+        relay(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @app.post("/api/auth/login")
 async def login(user_id: str, password: str):
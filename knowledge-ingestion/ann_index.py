@@ -0,0 +1,148 @@
+# ============================================================================
+# APPROXIMATE NEAREST-NEIGHBOUR INDEXES (knowledge_ingestion/ann_index.py)
+# ============================================================================
+# Builds and tunes the FAISS index behind the VectorStore. Small corpora use
+# an exact flat index; once the corpus passes a size threshold (or when an
+# ANN type is configured explicitly and there is enough data to train it)
+# the store switches to IVF-Flat, IVF-PQ or HNSW. Every index is keyed by
+# stable int64 ids: IVF indexes store ids natively, flat and HNSW are
+# wrapped in an IndexIDMap2.
+import math
+from typing import Optional
+import numpy as np
+import faiss
+
+INDEX_TYPES = ("flat", "ivf_flat", "ivf_pq", "hnsw")
+
+
+class IndexSettings:
+    """Index type selection and tuning knobs.
+
+    ``index_type`` is one of INDEX_TYPES or ``"auto"``, which uses a flat
+    index up to ``ann_threshold`` vectors and ``ann_type`` beyond it.
+    ``nlist=0`` sizes the IVF coarse quantizer from the corpus (about
+    4 * sqrt(n) lists). ``nprobe`` and ``ef_search`` trade recall for
+    latency at query time.
+    """
+
+    def __init__(
+        self,
+        index_type: str = "auto",
+        ann_type: str = "ivf_flat",
+        ann_threshold: int = 10000,
+        nlist: int = 0,
+        nprobe: int = 8,
+        pq_m: int = 16,
+        pq_bits: int = 8,
+        hnsw_m: int = 32,
+        ef_construction: int = 200,
+        ef_search: int = 64,
+    ):
+        if index_type != "auto" and index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown index type {index_type!r}; expected auto or one of {INDEX_TYPES}")
+        if ann_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown ANN index type {ann_type!r}; expected one of {INDEX_TYPES}")
+        self.index_type = index_type
+        self.ann_type = ann_type
+        self.ann_threshold = ann_threshold
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.pq_m = pq_m
+        self.pq_bits = pq_bits
+        self.hnsw_m = hnsw_m
+        self.ef_construction = ef_construction
+        self.ef_search = ef_search
+
+    def nlist_for(self, corpus_size: int) -> int:
+        if self.nlist > 0:
+            return self.nlist
+        # k-means wants ~39 training points per centroid
+        return max(1, min(int(4 * math.sqrt(corpus_size)), corpus_size // 39))
+
+    def min_training_points(self, index_type: str, corpus_size: int) -> int:
+        if index_type == "ivf_flat":
+            return self.nlist_for(corpus_size)
+        if index_type == "ivf_pq":
+            return max(self.nlist_for(corpus_size), 2 ** self.pq_bits)
+        return 0
+
+    def resolve(self, corpus_size: int) -> str:
+        """Index type to use for a corpus of ``corpus_size`` vectors"""
+        index_type = self.index_type
+        if index_type == "auto":
+            index_type = self.ann_type if corpus_size > self.ann_threshold else "flat"
+        # An untrained IVF index cannot hold vectors, so stay exact until there is enough data
+        if corpus_size < max(1, self.min_training_points(index_type, corpus_size)):
+            return "flat"
+        return index_type
+
+
+def _unwrap(index: faiss.Index) -> faiss.Index:
+    index = faiss.downcast_index(index)
+    if isinstance(index, faiss.IndexIDMap):
+        index = faiss.downcast_index(index.index)
+    return index
+
+
+def index_type_of(index: faiss.Index) -> str:
+    index = _unwrap(index)
+    if isinstance(index, faiss.IndexHNSW):
+        return "hnsw"
+    if isinstance(index, faiss.IndexIVFPQ):
+        return "ivf_pq"
+    if isinstance(index, faiss.IndexIVF):
+        return "ivf_flat"
+    return "flat"
+
+
+def tune_index(index: faiss.Index, settings: IndexSettings):
+    """Apply the query-time knobs; a no-op for a flat index"""
+    index = _unwrap(index)
+    if isinstance(index, faiss.IndexIVF):
+        index.nprobe = min(settings.nprobe, index.nlist)
+    elif isinstance(index, faiss.IndexHNSW):
+        index.hnsw.efSearch = settings.ef_search
+
+
+def supports_remove(index: faiss.Index) -> bool:
+    """HNSW graphs cannot drop vectors in place; the store tombstones them instead"""
+    return index_type_of(index) != "hnsw"
+
+
+def build_index(settings: IndexSettings, dimension: int, vectors: Optional[np.ndarray] = None,
+                ids: Optional[np.ndarray] = None) -> faiss.Index:
+    """Create, train and fill the index type ``settings`` picks for ``vectors``.
+
+    ``ids`` are the int64 ids searches return for each vector (defaults to
+    row numbers).
+    """
+    if vectors is None:
+        vectors = np.empty((0, dimension), dtype='float32')
+    vectors = np.ascontiguousarray(vectors, dtype='float32')
+    if ids is None:
+        ids = np.arange(len(vectors))
+    ids = np.ascontiguousarray(ids, dtype='int64')
+    index_type = settings.resolve(len(vectors))
+
+    if index_type == "hnsw":
+        index = faiss.IndexHNSWFlat(dimension, settings.hnsw_m)
+        index.hnsw.efConstruction = settings.ef_construction
+    elif index_type in ("ivf_flat", "ivf_pq"):
+        nlist = settings.nlist_for(len(vectors))
+        quantizer = faiss.IndexFlatL2(dimension)
+        if index_type == "ivf_pq":
+            if dimension % settings.pq_m:
+                raise ValueError(f"PQ sub-quantizers ({settings.pq_m}) must divide the dimension ({dimension})")
+            index = faiss.IndexIVFPQ(quantizer, dimension, nlist, settings.pq_m, settings.pq_bits)
+        else:
+            index = faiss.IndexIVFFlat(quantizer, dimension, nlist)
+        index.train(vectors)
+    else:
+        index = faiss.IndexFlatL2(dimension)
+
+    if index_type in ("flat", "hnsw"):
+        index = faiss.IndexIDMap2(index)
+    tune_index(index, settings)
+    if len(vectors):
+        index.add_with_ids(vectors, ids)
+    return index
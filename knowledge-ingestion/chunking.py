@@ -0,0 +1,115 @@
+# ============================================================================
+# DOCUMENT CHUNKING (knowledge_ingestion/chunking.py)
+# ============================================================================
+# Long documents are split into chunks that fit the embedding model's
+# sequence length, so nothing past the first few hundred tokens is silently
+# truncated. Chunks follow section boundaries (headings in HTML and DOCX,
+# pages in PDF), carry their section heading for context, and overlap their
+# neighbours so a sentence cut at a boundary is still retrievable.
+import re
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+_PARAGRAPH_BREAK = re.compile(r'\n\s*\n|\n')
+_SENTENCE_END = re.compile(r'(?<=[.!?])\s+')
+
+
+class Section(NamedTuple):
+    heading: Optional[str]
+    text: str
+
+
+class Chunk(NamedTuple):
+    index: int
+    heading: Optional[str]
+    text: str
+
+
+def token_counter_for(model: Any) -> Callable[[str], int]:
+    """Count tokens with the embedding model's tokenizer, or estimate from words"""
+    tokenizer = getattr(model, "tokenizer", None)
+    if tokenizer is not None:
+        return lambda text: len(tokenizer.encode(text, add_special_tokens=False))
+    return lambda text: round(len(text.split()) * 1.3)
+
+
+class Chunker:
+    """Packs sentences into chunks of at most ``chunk_tokens`` tokens.
+
+    Consecutive chunks of a section share up to ``overlap_tokens`` of
+    trailing sentences. A sentence longer than a whole chunk is split on
+    word boundaries.
+    """
+
+    def __init__(self, count_tokens: Callable[[str], int], chunk_tokens: int = 200, overlap_tokens: int = 40):
+        if overlap_tokens >= chunk_tokens:
+            raise ValueError("Chunk overlap must be smaller than the chunk size")
+        self.count_tokens = count_tokens
+        self.chunk_tokens = chunk_tokens
+        self.overlap_tokens = overlap_tokens
+
+    def _units(self, text: str, budget: int) -> List[Tuple[str, int]]:
+        units = []
+        for paragraph in _PARAGRAPH_BREAK.split(text):
+            for sentence in _SENTENCE_END.split(paragraph.strip()):
+                sentence = " ".join(sentence.split())
+                if not sentence:
+                    continue
+                tokens = self.count_tokens(sentence)
+                if tokens <= budget:
+                    units.append((sentence, tokens))
+                    continue
+                words = sentence.split()
+                step = max(1, len(words) * budget // tokens)
+                for start in range(0, len(words), step):
+                    piece = " ".join(words[start:start + step])
+                    units.append((piece, self.count_tokens(piece)))
+        return units
+
+    def split(self, sections: List[Section]) -> List[Chunk]:
+        chunks: List[Chunk] = []
+        for section in sections:
+            prefix = f"{section.heading}\n" if section.heading else ""
+            budget = max(1, self.chunk_tokens - (self.count_tokens(prefix) if prefix else 0))
+
+            window: List[Tuple[str, int]] = []
+            size = 0
+            for unit, tokens in self._units(section.text, budget):
+                if window and size + tokens > budget:
+                    chunks.append(Chunk(len(chunks), section.heading, prefix + " ".join(u for u, _ in window)))
+                    # Carry the trailing sentences that fit in the overlap
+                    carried = 0
+                    keep = len(window)
+                    while keep > 0 and carried + window[keep - 1][1] <= self.overlap_tokens:
+                        keep -= 1
+                        carried += window[keep][1]
+                    window = window[keep:]
+                    size = carried
+                    while window and size + tokens > budget:
+                        size -= window.pop(0)[1]
+                window.append((unit, tokens))
+                size += tokens
+            if window:
+                chunks.append(Chunk(len(chunks), section.heading, prefix + " ".join(u for u, _ in window)))
+        return chunks
+
+
+def chunk_document(doc: Dict[str, Any], sections: List[Section], chunker: Chunker) -> List[Dict[str, Any]]:
+    """Turn a document into the records to index.
+
+    A document that fits in one chunk is stored whole under its own id;
+    longer ones become ``{id}#{n}`` chunk records linked by ``parent_id``.
+    """
+    chunks = chunker.split(sections)
+    if len(chunks) <= 1:
+        return [doc]
+    return [
+        {
+            'id': f"{doc['id']}#{chunk.index}",
+            'parent_id': doc['id'],
+            'title': doc['title'],
+            'content': chunk.text,
+            'category': doc['category'],
+            'metadata': {**doc.get('metadata', {}), 'chunk': chunk.index, 'heading': chunk.heading},
+        }
+        for chunk in chunks
+    ]
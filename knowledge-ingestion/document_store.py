@@ -0,0 +1,133 @@
+# ============================================================================
+# MEMORY-MAPPED DOCUMENT STORE (knowledge_ingestion/document_store.py)
+# ============================================================================
+# Documents live on disk as a blob of JSON records plus a row index sorted
+# by vector id (vector id, offset, length), both memory-mapped. Only the
+# documents a search returns are decoded, and the corpus text is served
+# from the page cache rather than held in the process heap. Changes since
+# the last checkpoint are kept in a small in-memory overlay.
+import glob
+import json
+import mmap
+import os
+from typing import Any, Dict, NamedTuple, Optional, Set
+import numpy as np
+
+ROW_DTYPE = np.dtype([('vector_id', '<i8'), ('offset', '<i8'), ('length', '<i8')])
+
+
+class DocumentSnapshot(NamedTuple):
+    rows: np.ndarray
+    blob: Any
+    added: Dict[int, bytes]
+    removed: Set[int]
+
+
+class DocumentStore:
+    """Documents addressed by vector id.
+
+    Files are written per checkpoint generation
+    (``{path}.{generation}`` and ``{path}.{generation}.rows``), so a
+    checkpoint never overwrites the files the previous one points at.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._rows = np.empty(0, dtype=ROW_DTYPE)
+        self._blob: Any = b""
+        self._added: Dict[int, bytes] = {}
+        self._removed: Set[int] = set()
+
+    def _files(self, generation: int):
+        blob_path = f"{self.path}.{generation:08d}"
+        return blob_path, f"{blob_path}.rows"
+
+    def open(self, generation: int):
+        blob_path, rows_path = self._files(generation)
+        self._rows = np.load(rows_path, mmap_mode='r')
+        if os.path.getsize(blob_path):
+            with open(blob_path, "rb") as f:
+                self._blob = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self._blob = b""
+
+    def _base_row(self, vector_id: int) -> Optional[int]:
+        ids = self._rows['vector_id']
+        row = int(np.searchsorted(ids, vector_id))
+        if row < len(ids) and ids[row] == vector_id:
+            return row
+        return None
+
+    def __contains__(self, vector_id: int) -> bool:
+        if vector_id in self._added:
+            return True
+        return vector_id not in self._removed and self._base_row(vector_id) is not None
+
+    def get(self, vector_id: int) -> Optional[Dict[str, Any]]:
+        """Decode one document, or None if there is none with this id"""
+        data = self._added.get(vector_id)
+        if data is None:
+            if vector_id in self._removed:
+                return None
+            row = self._base_row(vector_id)
+            if row is None:
+                return None
+            offset, length = int(self._rows[row]['offset']), int(self._rows[row]['length'])
+            data = self._blob[offset:offset + length]
+        return json.loads(data)
+
+    def put(self, vector_id: int, doc: Dict[str, Any]):
+        self._removed.discard(vector_id)
+        self._added[vector_id] = json.dumps(doc, separators=(",", ":")).encode()
+
+    def remove(self, vector_id: int):
+        self._added.pop(vector_id, None)
+        self._removed.add(vector_id)
+
+    def snapshot(self) -> DocumentSnapshot:
+        """Capture the current contents for write(); cheap, taken under the caller's lock"""
+        return DocumentSnapshot(self._rows, self._blob, dict(self._added), set(self._removed))
+
+    def write(self, snapshot: DocumentSnapshot, generation: int):
+        """Write a snapshot as the files for ``generation``, copying unchanged records as bytes"""
+        blob_path, rows_path = self._files(generation)
+        base_ids = snapshot.rows['vector_id']
+        keep = ~np.isin(base_ids, list(snapshot.removed | snapshot.added.keys()))
+        kept_rows = np.asarray(snapshot.rows[keep])
+        added_ids = sorted(snapshot.added)
+
+        rows = np.empty(len(kept_rows) + len(added_ids), dtype=ROW_DTYPE)
+        sources = [(int(row['vector_id']), int(row['offset']), int(row['length'])) for row in kept_rows]
+        sources += [(vector_id, -1, 0) for vector_id in added_ids]
+        sources.sort()
+
+        offset = 0
+        with open(blob_path, "wb") as f:
+            for i, (vector_id, source_offset, length) in enumerate(sources):
+                if source_offset < 0:
+                    data = snapshot.added[vector_id]
+                else:
+                    data = snapshot.blob[source_offset:source_offset + length]
+                f.write(data)
+                rows[i] = (vector_id, offset, len(data))
+                offset += len(data)
+            f.flush()
+            os.fsync(f.fileno())
+        with open(rows_path, "wb") as f:
+            np.save(f, rows)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def swap(self, snapshot: DocumentSnapshot, generation: int):
+        """Serve from the files written for ``snapshot``, keeping later changes in the overlay"""
+        self.open(generation)
+        for vector_id, data in snapshot.added.items():
+            if self._added.get(vector_id) is data:
+                del self._added[vector_id]
+        self._removed -= snapshot.removed
+
+    def remove_other_generations(self, generation: int):
+        keep = set(self._files(generation))
+        for path in glob.glob(glob.escape(self.path) + ".[0-9]*"):
+            if path not in keep:
+                os.remove(path)
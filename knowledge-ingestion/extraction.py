@@ -0,0 +1,75 @@
+# ============================================================================
+# TEXT EXTRACTION (knowledge_ingestion/extraction.py)
+# ============================================================================
+# Turns uploaded files into heading-delimited sections for chunking. Kept
+# free of service state so the functions can run in the process pool.
+import io
+from typing import List, Optional
+import PyPDF2
+import docx
+from bs4 import BeautifulSoup, Comment, Doctype
+from chunking import Section
+
+HTML_HEADINGS = ["h1", "h2", "h3", "h4", "h5", "h6"]
+HTML_SKIPPED = ["script", "style", "head", "noscript"]
+
+
+def extract_sections_from_pdf(file_content: bytes) -> List[Section]:
+    """One section per page; PDFs carry no reliable heading structure"""
+    pdf_reader = PyPDF2.PdfReader(io.BytesIO(file_content))
+    return [Section(None, page.extract_text() or "") for page in pdf_reader.pages]
+
+
+def extract_sections_from_docx(file_content: bytes) -> List[Section]:
+    """Start a new section at every Title or Heading-styled paragraph"""
+    document = docx.Document(io.BytesIO(file_content))
+    sections: List[Section] = []
+    heading: Optional[str] = None
+    lines: List[str] = []
+    for para in document.paragraphs:
+        style = para.style.name if para.style is not None else ""
+        if style == "Title" or style.startswith("Heading"):
+            if lines:
+                sections.append(Section(heading, "\n".join(lines)))
+            heading, lines = para.text.strip() or None, []
+        elif para.text.strip():
+            lines.append(para.text)
+    if lines:
+        sections.append(Section(heading, "\n".join(lines)))
+    return sections
+
+
+def extract_sections_from_html(file_content: bytes) -> List[Section]:
+    """Start a new section at every h1-h6 element"""
+    soup = BeautifulSoup(file_content, 'html.parser')
+    for element in soup(HTML_SKIPPED):
+        element.decompose()
+    sections: List[Section] = []
+    heading: Optional[str] = None
+    lines: List[str] = []
+    for string in soup.find_all(string=True):
+        text = string.strip()
+        if not text or isinstance(string, (Comment, Doctype)):
+            continue
+        if string.find_parent(HTML_HEADINGS) is not None:
+            if lines:
+                sections.append(Section(heading, "\n".join(lines)))
+                heading, lines = text, []
+            else:
+                heading = f"{heading} {text}" if heading else text
+        else:
+            lines.append(text)
+    if lines:
+        sections.append(Section(heading, "\n".join(lines)))
+    return sections
+
+
+def extract_sections(filename: str, file_content: bytes) -> List[Section]:
+    """Sections of a PDF, DOCX, HTML or plain-text file"""
+    if filename.endswith('.pdf'):
+        return extract_sections_from_pdf(file_content)
+    if filename.endswith('.docx'):
+        return extract_sections_from_docx(file_content)
+    if filename.endswith('.html'):
+        return extract_sections_from_html(file_content)
+    return [Section(None, file_content.decode('utf-8'))]
@@ -0,0 +1,262 @@
+# ============================================================================
+# BULK INGESTION JOBS (knowledge_ingestion/jobs.py)
+# ============================================================================
+# Bulk loads (a JSON batch, a JSONL file or a tar archive of documents) run
+# as background jobs. Documents flow through extract -> chunk -> embed ->
+# index in windows: extraction of the next window (in the process pool)
+# overlaps with embedding and indexing of the current one. Indexing runs on
+# its own small executor, so a large job never occupies the threads that
+# serve /search, and the store rebuilds its index (past the ANN threshold,
+# or to compact HNSW deletes) in the background rather than under the lock
+# searches take.
+import asyncio
+import itertools
+import json
+import os
+import shutil
+import tarfile
+import tempfile
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional
+from prometheus_client import Counter
+from chunking import Chunker, Section, chunk_document
+from middleware.event_loop import run_blocking, run_in_process
+
+ingest_jobs = Counter(
+    'kb_ingest_jobs_total',
+    'Bulk ingestion jobs by final status',
+    ['status']
+)
+ingest_documents = Counter(
+    'kb_ingest_documents_total',
+    'Documents processed by bulk ingestion jobs by outcome (indexed, failed)',
+    ['outcome']
+)
+
+JSONL_SUFFIXES = (".jsonl", ".ndjson")
+ARCHIVE_SUFFIXES = (".tar", ".tar.gz", ".tgz", ".tar.bz2", ".tar.xz")
+MAX_REPORTED_ERRORS = 50
+
+
+def spool_upload(upload, directory: Optional[str] = None) -> str:
+    """Copy an upload to a temporary file that outlives the request"""
+    with tempfile.NamedTemporaryFile(delete=False, dir=directory, prefix="bulk-") as f:
+        shutil.copyfileobj(upload, f, 1024 * 1024)
+        return f.name
+
+
+def iter_jsonl(lines: Iterator[bytes], category: str, source: str = "") -> Iterator[Dict[str, Any]]:
+    """Documents from JSONL lines; a line that cannot be used becomes an error item"""
+    for number, line in enumerate(lines, start=1):
+        if not line.strip():
+            continue
+        label = f"{source}:{number}" if source else f"line {number}"
+        try:
+            doc = json.loads(line)
+            yield {
+                'id': str(doc['id']),
+                'title': doc.get('title') or str(doc['id']),
+                'content': doc['content'],
+                'category': doc.get('category', category),
+                'metadata': doc.get('metadata', {}),
+            }
+        except (ValueError, KeyError, TypeError) as e:
+            yield {'id': label, 'error': f"Invalid document: {e!r}"}
+
+
+def iter_upload(path: str, filename: str, category: str) -> Iterator[Dict[str, Any]]:
+    """Items from a spooled JSONL or tar upload; the file is removed once read"""
+    try:
+        if filename.endswith(JSONL_SUFFIXES):
+            with open(path, "rb") as f:
+                yield from iter_jsonl(f, category)
+            return
+        with tarfile.open(path, "r:*") as archive:
+            for member in archive:
+                if not member.isfile():
+                    continue
+                data = archive.extractfile(member).read()
+                if member.name.endswith(JSONL_SUFFIXES):
+                    yield from iter_jsonl(data.splitlines(), category, member.name)
+                else:
+                    yield {'id': member.name, 'filename': member.name, 'file_content': data, 'category': category}
+    finally:
+        os.remove(path)
+
+
+class IngestionJob:
+    def __init__(self, job_id: str, source: str, total: Optional[int] = None):
+        self.id = job_id
+        self.source = source
+        self.status = "queued"
+        self.total = total
+        self.seen = 0
+        self.indexed = 0
+        self.failed = 0
+        self.chunks = 0
+        self.chunks_embedded = 0
+        self.errors: List[Dict[str, str]] = []
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+
+    def fail(self, item_id: str, error: str, count: int = 1):
+        self.failed += count
+        ingest_documents.labels(outcome="failed").inc(count)
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'id': item_id, 'error': error})
+
+    def as_dict(self) -> Dict[str, Any]:
+        elapsed = None
+        if self.started_at is not None:
+            elapsed = (self.finished_at or time.time()) - self.started_at
+        return {
+            'job_id': self.id,
+            'status': self.status,
+            'source': self.source,
+            'documents_total': self.total,
+            'documents_seen': self.seen,
+            'documents_indexed': self.indexed,
+            'documents_failed': self.failed,
+            'chunks_indexed': self.chunks,
+            'chunks_embedded': self.chunks_embedded,
+            'elapsed_seconds': elapsed,
+            'documents_per_second': self.indexed / elapsed if elapsed else None,
+            'chunks_per_second': self.chunks / elapsed if elapsed else None,
+            'errors': self.errors,
+        }
+
+
+class JobManager:
+    """Runs bulk ingestion jobs, ``max_running`` at a time.
+
+    ``extract(filename, content)`` returns a file's sections and must be
+    picklable (it runs in the process pool). ``index(records)`` stores a
+    window of chunk records and returns its counts (see
+    ``VectorStore.add_documents``); it embeds them, so it runs on the
+    manager's own executor. ``on_indexed`` is awaited after each window
+    that ``changed(counts)`` so consumers can invalidate caches.
+    """
+
+    def __init__(
+        self,
+        chunker: Chunker,
+        extract: Callable[[str, bytes], List[Section]],
+        index: Callable[[List[Dict[str, Any]]], Dict[str, int]],
+        changed: Callable[[Dict[str, int]], bool] = lambda counts: True,
+        on_indexed: Optional[Callable[[], Awaitable[None]]] = None,
+        window: int = 64,
+        max_running: int = 1,
+        index_workers: int = 1,
+        keep_finished: int = 100,
+    ):
+        self.chunker = chunker
+        self.extract = extract
+        self.index = index
+        self.changed = changed
+        self.on_indexed = on_indexed
+        self.window = window
+        self.keep_finished = keep_finished
+        self.jobs: "OrderedDict[str, IngestionJob]" = OrderedDict()
+        self._slots = asyncio.Semaphore(max_running)
+        self._executor = ThreadPoolExecutor(max_workers=index_workers, thread_name_prefix="bulk-index")
+        self._tasks: Dict[str, asyncio.Task] = {}
+
+    def get(self, job_id: str) -> Optional[IngestionJob]:
+        return self.jobs.get(job_id)
+
+    def submit(self, items: Iterator[Dict[str, Any]], source: str, total: Optional[int] = None) -> IngestionJob:
+        job = IngestionJob(uuid.uuid4().hex, source, total)
+        self.jobs[job.id] = job
+        self._forget_finished()
+        task = asyncio.create_task(self._run(job, items))
+        self._tasks[job.id] = task
+        task.add_done_callback(lambda _: self._tasks.pop(job.id, None))
+        return job
+
+    def _forget_finished(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.finished_at is not None]
+        for job_id in finished[:max(0, len(finished) - self.keep_finished)]:
+            del self.jobs[job_id]
+
+    async def _prepare(self, job: IngestionJob, item: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Extract and chunk one item; failures are recorded on the job"""
+        if 'error' in item:
+            job.fail(item['id'], item['error'])
+            return []
+        try:
+            if 'file_content' in item:
+                sections = await run_in_process(self.extract, item['filename'], item['file_content'])
+                doc = {
+                    'id': item['filename'],
+                    'title': item['filename'],
+                    'content': "\n".join(section.text for section in sections),
+                    'category': item['category'],
+                    'metadata': {'filename': item['filename']},
+                }
+            else:
+                doc = item
+                sections = [Section(None, item['content'])]
+            return await run_blocking(chunk_document, doc, sections, self.chunker)
+        except Exception as e:
+            job.fail(item['id'], repr(e))
+            return []
+
+    async def _index(self, job: IngestionJob, documents: int, records: List[Dict[str, Any]]):
+        if not records:
+            return
+        loop = asyncio.get_running_loop()
+        try:
+            counts = await loop.run_in_executor(self._executor, self.index, records)
+        except Exception as e:
+            job.fail(f"{documents} documents from {records[0]['id']}", repr(e), count=documents)
+            return
+        job.indexed += documents
+        job.chunks += len(records)
+        job.chunks_embedded += counts.get("embedded", len(records))
+        ingest_documents.labels(outcome="indexed").inc(documents)
+        if self.on_indexed is not None and self.changed(counts):
+            await self.on_indexed()
+
+    async def _run(self, job: IngestionJob, items: Iterator[Dict[str, Any]]):
+        try:
+            async with self._slots:
+                job.status = "running"
+                job.started_at = time.time()
+                indexing: Optional[asyncio.Task] = None
+                while True:
+                    batch = await run_blocking(lambda: list(itertools.islice(items, self.window)))
+                    if not batch:
+                        break
+                    job.seen += len(batch)
+                    prepared = await asyncio.gather(*(self._prepare(job, item) for item in batch))
+                    records = [record for item_records in prepared for record in item_records]
+                    documents = sum(1 for item_records in prepared if item_records)
+                    # Embed this window while the next one is being extracted
+                    if indexing is not None:
+                        await indexing
+                    indexing = asyncio.create_task(self._index(job, documents, records))
+                if indexing is not None:
+                    await indexing
+                job.status = "completed" if job.indexed or not job.failed else "failed"
+        except asyncio.CancelledError:
+            job.status = "cancelled"
+            raise
+        except Exception as e:
+            job.status = "failed"
+            job.fail(job.source, repr(e), count=0)
+        finally:
+            job.finished_at = time.time()
+            ingest_jobs.labels(status=job.status).inc()
+            close = getattr(items, "close", None)
+            if close is not None:
+                await run_blocking(close)
+
+    async def shutdown(self):
+        for task in list(self._tasks.values()):
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+        self._executor.shutdown(wait=True)
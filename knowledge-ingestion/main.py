@@ -1,17 +1,125 @@
 # ============================================================================
 # KNOWLEDGE BASE INGESTION SERVICE (knowledge_ingestion/main.py)
 # ============================================================================
-from fastapi import FastAPI, UploadFile, File
+from fastapi import FastAPI, UploadFile, File, BackgroundTasks, HTTPException
 from pydantic import BaseModel
 from typing import List
-import PyPDF2
-import docx
-from bs4 import BeautifulSoup
-import io
+import asyncio
+import logging
+import os
+import httpx
 from vector_store import VectorStore
+from ann_index import IndexSettings
+from chunking import Chunker, Section, chunk_document, token_counter_for
+from extraction import extract_sections
+from jobs import ARCHIVE_SUFFIXES, JSONL_SUFFIXES, JobManager, iter_upload, spool_upload
+from middleware.metrics import setup_metrics_endpoint
+from middleware.event_loop import run_blocking, run_in_process, setup_event_loop
 app = FastAPI(title="Knowledge Base Ingestion")
+setup_metrics_endpoint(app)
 
-vector_store = VectorStore()
+# Embedding, FAISS and file parsing run off the event loop; parsing is pure
+# Python, so it runs in a process pool (threads if EVENT_LOOP_PROCESSES=0)
+setup_event_loop(
+    app,
+    "knowledge_ingestion",
+    threads=int(os.getenv("EVENT_LOOP_THREADS", "8")),
+    processes=int(os.getenv("EVENT_LOOP_PROCESSES", "2")),
+    block_threshold_ms=float(os.getenv("EVENT_LOOP_BLOCK_THRESHOLD_MS", "100"))
+)
+
+# Exact (flat) search until the corpus outgrows KB_ANN_THRESHOLD, then ANN
+index_settings = IndexSettings(
+    index_type=os.getenv("KB_INDEX_TYPE", "auto"),
+    ann_type=os.getenv("KB_ANN_INDEX_TYPE", "ivf_flat"),
+    ann_threshold=int(os.getenv("KB_ANN_THRESHOLD", "10000")),
+    nlist=int(os.getenv("KB_IVF_NLIST", "0")),
+    nprobe=int(os.getenv("KB_IVF_NPROBE", "8")),
+    pq_m=int(os.getenv("KB_PQ_M", "16")),
+    pq_bits=int(os.getenv("KB_PQ_BITS", "8")),
+    hnsw_m=int(os.getenv("KB_HNSW_M", "32")),
+    ef_construction=int(os.getenv("KB_HNSW_EF_CONSTRUCTION", "200")),
+    ef_search=int(os.getenv("KB_HNSW_EF_SEARCH", "64"))
+)
+# Ingests and deletes are logged and applied in memory; the full index is
+# written out by the background checkpoint, not per request
+CHECKPOINT_INTERVAL_SECONDS = float(os.getenv("KB_CHECKPOINT_SECONDS", "30"))
+WAL_FSYNC = os.getenv("KB_WAL_FSYNC", "true").lower() == "true"
+
+vector_store = VectorStore(
+    settings=index_settings,
+    wal_fsync=WAL_FSYNC,
+    encode_batch_size=int(os.getenv("KB_EMBED_BATCH_SIZE", "64")),
+    embedding_cache_size=int(os.getenv("KB_EMBEDDING_CACHE_SIZE", "10000")),
+    max_tombstone_ratio=float(os.getenv("KB_MAX_TOMBSTONE_RATIO", "0.1"))
+)
+
+# Chunks stay within the embedding model's 256-token input
+chunker = Chunker(
+    token_counter_for(vector_store.embedding_model),
+    chunk_tokens=int(os.getenv("KB_CHUNK_TOKENS", "200")),
+    overlap_tokens=int(os.getenv("KB_CHUNK_OVERLAP_TOKENS", "40"))
+)
+
+logger = logging.getLogger(__name__)
+
+# Consumers that cache search results (the LLM service) are told about every
+# knowledge base change so they can drop stale entries immediately
+INVALIDATION_WEBHOOKS = [
+    url.strip()
+    for url in os.getenv("KB_INVALIDATION_WEBHOOKS", "http://llm-service:8007/cache/invalidate").split(",")
+    if url.strip()
+]
+
+def changed(counts: dict) -> bool:
+    """Whether an add_documents call changed the knowledge base (re-ingesting identical content does not)"""
+    return bool(counts["added"] or counts["updated"] or counts["removed"])
+
+async def notify_kb_change(kb_version: int):
+    async with httpx.AsyncClient(timeout=2.0) as client:
+        for url in INVALIDATION_WEBHOOKS:
+            try:
+                await client.post(url, json={"kb_version": kb_version})
+            except httpx.HTTPError as e:
+                # Consumers also poll /version, so a missed call only delays invalidation
+                logger.warning(f"Knowledge base invalidation webhook {url} failed: {e}")
+
+# Bulk loads run as background jobs; their embedding and indexing use a
+# dedicated executor so /search keeps the shared thread pool
+job_manager = JobManager(
+    chunker,
+    extract_sections,
+    vector_store.add_documents,
+    changed=changed,
+    on_indexed=lambda: notify_kb_change(vector_store.version),
+    window=int(os.getenv("KB_BULK_WINDOW", "64")),
+    max_running=int(os.getenv("KB_BULK_MAX_RUNNING_JOBS", "1")),
+    index_workers=int(os.getenv("KB_BULK_INDEX_WORKERS", "1"))
+)
+BULK_SPOOL_DIR = os.getenv("KB_BULK_SPOOL_DIR") or None
+
+async def checkpoint_vector_store():
+    while True:
+        await asyncio.sleep(CHECKPOINT_INTERVAL_SECONDS)
+        try:
+            await run_blocking(vector_store.checkpoint)
+        except Exception as e:
+            # The log still holds every change, so a failed checkpoint loses nothing
+            logger.error(f"Vector store checkpoint failed: {e}")
+
+checkpoint_task = None
+
+@app.on_event("startup")
+async def start_checkpoints():
+    global checkpoint_task
+    checkpoint_task = asyncio.create_task(checkpoint_vector_store())
+
+@app.on_event("shutdown")
+async def stop_checkpoints():
+    if checkpoint_task is not None:
+        checkpoint_task.cancel()
+    await job_manager.shutdown()
+    await run_blocking(vector_store.close)
 
 class Document(BaseModel):
     id: str
@@ -20,44 +128,26 @@ class Document(BaseModel):
     category: str
     metadata: dict = {}
 
-def extract_text_from_pdf(file_content: bytes) -> str:
-    """Extract text from PDF"""
-    pdf_reader = PyPDF2.PdfReader(io.BytesIO(file_content))
-    text = ""
-    for page in pdf_reader.pages:
-        text += page.extract_text()
-    return text
-
-def extract_text_from_docx(file_content: bytes) -> str:
-    """Extract text from DOCX"""
-    doc = docx.Document(io.BytesIO(file_content))
-    return "\n".join([para.text for para in doc.paragraphs])
-
-def extract_text_from_html(file_content: bytes) -> str:
-    """Extract text from HTML"""
-    soup = BeautifulSoup(file_content, 'html.parser')
-    return soup.get_text()
+class DocumentBatch(BaseModel):
+    documents: List[Document]
 
 @app.post("/ingest/document")
-async def ingest_document(doc: Document):
+async def ingest_document(doc: Document, background_tasks: BackgroundTasks):
     """Ingest a single document"""
-    vector_store.add_documents([doc.dict()])
-    return {"status": "success", "document_id": doc.id}
+    records = await run_blocking(chunk_document, doc.dict(), [Section(None, doc.content)], chunker)
+    counts = await run_blocking(vector_store.add_documents, records)
+    if changed(counts):
+        background_tasks.add_task(notify_kb_change, vector_store.version)
+    return {"status": "success", "document_id": doc.id, **counts}
 
 @app.post("/ingest/file")
-async def ingest_file(file: UploadFile = File(...), category: str = "general"):
+async def ingest_file(background_tasks: BackgroundTasks, file: UploadFile = File(...), category: str = "general"):
     """Ingest a file (PDF, DOCX, HTML, TXT)"""
     content = await file.read()
     
-    # Extract text based on file type
-    if file.filename.endswith('.pdf'):
-        text = extract_text_from_pdf(content)
-    elif file.filename.endswith('.docx'):
-        text = extract_text_from_docx(content)
-    elif file.filename.endswith('.html'):
-        text = extract_text_from_html(content)
-    else:
-        text = content.decode('utf-8')
+    # Extract heading-delimited sections based on file type
+    sections = await run_in_process(extract_sections, file.filename, content)
+    text = "\n".join(section.text for section in sections)
     
     # Create document
     doc = {
@@ -68,22 +158,69 @@ async def ingest_file(file: UploadFile = File(...), category: str = "general"):
         'metadata': {'filename': file.filename}
     }
     
-    vector_store.add_documents([doc])
+    records = await run_blocking(chunk_document, doc, sections, chunker)
+    counts = await run_blocking(vector_store.add_documents, records)
+    if changed(counts):
+        background_tasks.add_task(notify_kb_change, vector_store.version)
     
-    return {"status": "success", "filename": file.filename, "length": len(text)}
+    return {"status": "success", "filename": file.filename, "length": len(text), "chunks": len(records), **counts}
+
+@app.post("/ingest/bulk", status_code=202)
+async def ingest_bulk(batch: DocumentBatch):
+    """Queue a batch of documents for background ingestion"""
+    job = job_manager.submit(iter([doc.dict() for doc in batch.documents]), "batch", total=len(batch.documents))
+    return {"job_id": job.id, "status": job.status}
+
+@app.post("/ingest/bulk/upload", status_code=202)
+async def ingest_bulk_upload(file: UploadFile = File(...), category: str = "general"):
+    """Queue a JSONL file or a tar archive (of JSONL or PDF/DOCX/HTML/TXT files) for background ingestion"""
+    if not file.filename or not file.filename.endswith(JSONL_SUFFIXES + ARCHIVE_SUFFIXES):
+        raise HTTPException(status_code=400, detail="Expected a .jsonl file or a tar archive")
+    # The upload is closed when this request returns, so the job reads its own copy
+    path = await run_blocking(spool_upload, file.file, BULK_SPOOL_DIR)
+    job = job_manager.submit(iter_upload(path, file.filename, category), file.filename)
+    return {"job_id": job.id, "status": job.status}
+
+@app.get("/ingest/jobs")
+async def list_ingestion_jobs():
+    """Recent bulk ingestion jobs, newest last"""
+    return {"jobs": [job.as_dict() for job in job_manager.jobs.values()]}
+
+@app.get("/ingest/jobs/{job_id}")
+async def ingestion_job_status(job_id: str):
+    """Progress, throughput and failures of a bulk ingestion job"""
+    job = job_manager.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job.as_dict()
 
 @app.post("/search")
 async def search_knowledge(query: str, k: int = 5):
     """Search knowledge base"""
-    results = vector_store.search(query, k)
-    return {"query": query, "results": results}
+    results = await run_blocking(vector_store.search, query, k)
+    return {"query": query, "results": results, "kb_version": vector_store.version}
 
 @app.delete("/document/{doc_id}")
-async def delete_document(doc_id: str):
+async def delete_document(doc_id: str, background_tasks: BackgroundTasks):
     """Delete a document"""
-    vector_store.delete_by_id([doc_id])
+    await run_blocking(vector_store.delete_by_id, [doc_id])
+    background_tasks.add_task(notify_kb_change, vector_store.version)
     return {"status": "success", "deleted": doc_id}
 
+@app.get("/version")
+async def knowledge_base_version():
+    """Current knowledge base version, bumped on every ingest or delete"""
+    return {"kb_version": vector_store.version}
+
+@app.get("/index")
+async def index_info():
+    """Index type currently serving searches and its size"""
+    return {
+        "index_type": vector_store.index_type,
+        "vectors": vector_store.index.ntotal - len(vector_store.tombstones),
+        "tombstones": len(vector_store.tombstones)
+    }
+
 @app.get("/health")
 async def health():
     return {"status": "healthy", "service": "knowledge_ingestion"}
\ No newline at end of file
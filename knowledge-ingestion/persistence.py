@@ -0,0 +1,117 @@
+# ============================================================================
+# VECTOR STORE PERSISTENCE (knowledge_ingestion/persistence.py)
+# ============================================================================
+# Write-behind persistence for the VectorStore: every change is appended to
+# a write-ahead log before it is applied in memory, and the full state is
+# checkpointed periodically in the background. The log is split into
+# numbered segments so writers can keep appending to a fresh segment while
+# a checkpoint of the previous ones is being written out.
+import logging
+import os
+import pickle
+import re
+import struct
+import threading
+import zlib
+from typing import Any, Iterator, List
+
+logger = logging.getLogger(__name__)
+
+_FRAME = struct.Struct(">II")  # payload length, crc32
+
+
+def atomic_write(path: str, data: bytes, fsync: bool = True):
+    """Replace ``path`` with ``data`` so readers only ever see the old or new file"""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+        f.flush()
+        if fsync:
+            os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+
+
+class WriteAheadLog:
+    """Append-only log of pickled records in numbered segment files.
+
+    Each record is framed with its length and CRC, so a record torn by a
+    crash mid-write is detected and ignored on replay.
+    """
+
+    def __init__(self, path: str, fsync: bool = True):
+        self.path = path
+        self.fsync = fsync
+        self.pending = 0
+        self._segment_pattern = re.compile(re.escape(os.path.basename(path)) + r"\.(\d+)$")
+        self._lock = threading.Lock()
+        segments = self.segments()
+        self.generation = segments[-1] + 1 if segments else 1
+        self._file = None
+
+    def _segment_path(self, generation: int) -> str:
+        return f"{self.path}.{generation:08d}"
+
+    def segments(self) -> List[int]:
+        directory = os.path.dirname(self.path) or "."
+        generations = []
+        for name in os.listdir(directory):
+            match = self._segment_pattern.match(name)
+            if match:
+                generations.append(int(match.group(1)))
+        return sorted(generations)
+
+    def replay(self, from_generation: int = 0) -> Iterator[Any]:
+        """Yield records from segments at or after ``from_generation``, oldest first"""
+        for generation in self.segments():
+            if generation < from_generation:
+                continue
+            with open(self._segment_path(generation), "rb") as f:
+                data = f.read()
+            offset = 0
+            while offset < len(data):
+                header = data[offset:offset + _FRAME.size]
+                if len(header) < _FRAME.size:
+                    break
+                length, crc = _FRAME.unpack(header)
+                payload = data[offset + _FRAME.size:offset + _FRAME.size + length]
+                if len(payload) < length or zlib.crc32(payload) != crc:
+                    break
+                yield pickle.loads(payload)
+                offset += _FRAME.size + length
+            if offset < len(data):
+                logger.warning(
+                    f"Ignoring {len(data) - offset} bytes of incomplete records at the end of WAL segment {generation}"
+                )
+
+    def append(self, record: Any):
+        payload = pickle.dumps(record, protocol=pickle.HIGHEST_PROTOCOL)
+        with self._lock:
+            if self._file is None:
+                self._file = open(self._segment_path(self.generation), "ab")
+            self._file.write(_FRAME.pack(len(payload), zlib.crc32(payload)) + payload)
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            self.pending += 1
+
+    def rotate(self) -> int:
+        """Start a new segment; returns its generation (the first one a checkpoint taken now does not cover)"""
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+            self.generation += 1
+            self.pending = 0
+            return self.generation
+
+    def truncate_before(self, generation: int):
+        """Delete segments a completed checkpoint has made redundant"""
+        for segment in self.segments():
+            if segment < generation:
+                os.remove(self._segment_path(segment))
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
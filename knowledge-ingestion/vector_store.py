@@ -1,73 +1,614 @@
 # ============================================================================
 # VECTOR DATABASE SERVICE (knowledge_ingestion/vector_store.py)
 # ============================================================================
+import glob
+import hashlib
+import io
+import json
+import logging
 import os
 import pickle
+import threading
+import time
+from collections import OrderedDict
 import numpy as np
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Set, Tuple
 import faiss
-from sentence_transformers import SentenceTransformer
+from prometheus_client import Counter, Gauge, Histogram
+from ann_index import IndexSettings, build_index, index_type_of, supports_remove, tune_index
+from persistence import WriteAheadLog, atomic_write
+from document_store import DocumentStore
+
+logger = logging.getLogger(__name__)
+
+search_latency = Histogram(
+    'kb_search_latency_seconds',
+    'Vector index search latency (excluding query embedding)',
+    ['index_type'],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5)
+)
+index_rebuilds = Counter(
+    'kb_index_rebuilds_total',
+    'Vector index rebuilds by resulting index type',
+    ['index_type']
+)
+checkpoint_duration = Histogram(
+    'kb_checkpoint_seconds',
+    'Time to write a vector store checkpoint',
+    buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+wal_pending_records = Gauge(
+    'kb_wal_pending_records',
+    'Changes in the write-ahead log not yet covered by a checkpoint'
+)
+ingested_records = Counter(
+    'kb_ingested_records_total',
+    'Documents and chunks passed to add_documents by outcome (added, updated, unchanged)',
+    ['outcome']
+)
+embedded_records = Counter(
+    'kb_embedded_records_total',
+    'Texts run through the embedding model; ingested records minus this is what the hash cache saved'
+)
+
+
+def content_hash(text: str) -> bytes:
+    """Digest of the text that gets embedded"""
+    return hashlib.blake2b(text.encode(), digest_size=16).digest()
+
+
+def record_hash(doc: Dict[str, Any]) -> bytes:
+    """Digest of a whole stored record (text, title, category and metadata)"""
+    canonical = json.dumps(doc, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.blake2b(canonical.encode(), digest_size=16).digest()
 
 
 class VectorStore:
-    def __init__(self, dimension: int = 384, index_path: str = "vector_index.faiss"):
+    """FAISS-backed document store.
+
+    Each stored document gets a stable int64 vector id that the index
+    returns from searches. Embeddings are kept alongside the metadata, so
+    deletes, upserts and index rebuilds never re-run the embedding model.
+    Indexes that cannot remove vectors (HNSW) keep removed ids as
+    tombstones that searches skip; once they pile up the index is rebuilt
+    on a background thread and swapped in, as is the ANN index that
+    replaces the flat one past ``ann_threshold``, so searches are never
+    blocked on a rebuild.
+
+    Every record is hashed. Re-ingesting an identical record is a no-op,
+    and text whose hash matches a stored (or recently removed) record
+    reuses its embedding, so an edited document only embeds what changed.
+
+    Changes are appended to a write-ahead log and applied in memory;
+    ``checkpoint()`` writes the full state out and drops the log segments
+    it covers. The index and embeddings are written per checkpoint
+    generation and the metadata, replaced last, names the generation to
+    load, so a crash mid-checkpoint leaves the previous one intact. On
+    startup the last checkpoint is loaded and the log replayed on top of it.
+    """
+
+    def __init__(self, dimension: int = 384, index_path: str = "vector_index.faiss",
+                 settings: Optional[IndexSettings] = None, embedding_model=None,
+                 wal_fsync: bool = True, encode_batch_size: int = 64, chunk_overfetch: int = 4,
+                 embedding_cache_size: int = 10000, max_tombstone_ratio: float = 0.1):
         self.dimension = dimension
         self.index_path = index_path
-        self.embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
-        
-        # Initialize FAISS index
+        self.settings = settings or IndexSettings()
+        if embedding_model is None:
+            from sentence_transformers import SentenceTransformer
+            embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
+        self.embedding_model = embedding_model
+        self.encode_batch_size = encode_batch_size
+        self.chunk_overfetch = chunk_overfetch
+        self.embedding_cache_size = embedding_cache_size
+        self.max_tombstone_ratio = max_tombstone_ratio
+
+        self.documents = DocumentStore(f"{index_path}.documents")
+        self.embeddings: Dict[int, np.ndarray] = {}
+        self.vector_ids: Dict[str, int] = {}
+        # Parent document id -> ids of the chunks it was split into
+        self.chunks: Dict[str, Set[str]] = {}
+        # Vector id -> digests of the stored record and of its embedded text
+        self.record_hashes: Dict[int, bytes] = {}
+        self.content_hashes: Dict[int, bytes] = {}
+        # Embedded text digest -> vector ids holding it, and embeddings of
+        # recently removed text, so re-ingested text is not embedded again
+        self._hash_vectors: Dict[bytes, Set[int]] = {}
+        self._removed_embeddings: "OrderedDict[bytes, np.ndarray]" = OrderedDict()
+        self.next_id = 0
+        # Vector ids still in an index that cannot remove them; skipped by search
+        self.tombstones: Set[int] = set()
+        # Bumped on every change so consumers can tell when cached answers are stale
+        self.version = 0
+        self.index = None
+        self.wal = WriteAheadLog(f"{index_path}.wal", fsync=wal_fsync)
+
+        # Handlers call in from the executor's threads; FAISS and the metadata
+        # must not be read while another request is changing them
+        self._lock = threading.Lock()
+        self._checkpoint_lock = threading.Lock()
+        # Background rebuilds: while one runs, index changes are journalled
+        # (added ids, removed ids) and replayed onto the new index at the swap
+        self._rebuild_lock = threading.Lock()
+        self._rebuild_requested = False
+        self._rebuild_thread: Optional[threading.Thread] = None
+        self._rebuild_journal: Optional[Tuple[List[int], List[int]]] = None
+
+        recovered = self._recover()
+        if self.index is None or recovered or self.index.ntotal != len(self.embeddings) + len(self.tombstones):
+            self._rebuild()
+        if recovered:
+            self._checkpoint()
+
+    def _recover(self) -> int:
+        """Load the last checkpoint and replay the log; returns how many changes were not checkpointed"""
+        wal_generation = 0
+        pending = 0
+        if os.path.exists(f"{self.index_path}.metadata"):
+            with open(f"{self.index_path}.metadata", "rb") as f:
+                stored = pickle.load(f)
+            if isinstance(stored, list):
+                self._migrate(stored)
+                pending += 1
+            else:
+                if self._load(stored):
+                    pending += 1
+                wal_generation = stored.get("wal_generation", 0)
+
+        for record in self.wal.replay(wal_generation):
+            self._apply(record)
+            pending += 1
+        # Checkpoints from before per-generation files could be torn, leaving
+        # newer embeddings next to older metadata; drop any left orphaned
+        for vector_id in [v for v in self.embeddings if v not in self.documents]:
+            del self.embeddings[vector_id]
+        return pending
+
+    def _load(self, stored: Dict[str, Any]) -> bool:
+        """Load a checkpoint; returns True if it was in an older format and needs rewriting"""
+        self.next_id = stored["next_id"]
+        self.version = stored.get("version", self._legacy_version())
+        if "files_generation" in stored:
+            index_path, embeddings_path = self._checkpoint_files(stored["files_generation"])
+        else:
+            index_path, embeddings_path = self.index_path, f"{self.index_path}.embeddings"
+        with np.load(embeddings_path) as arrays:
+            self.embeddings = dict(zip(arrays["ids"].tolist(), arrays["vectors"]))
         if os.path.exists(index_path):
             self.index = faiss.read_index(index_path)
-            with open(f"{index_path}.metadata", "rb") as f:
-                self.metadata = pickle.load(f)
+            tune_index(self.index, self.settings)
+
+        if "documents" in stored:
+            # Checkpoints used to pickle every document with the metadata
+            for vector_id, doc in stored["documents"].items():
+                self.documents.put(vector_id, doc)
+            self.vector_ids = {doc['id']: vector_id for vector_id, doc in stored["documents"].items()}
         else:
-            self.index = faiss.IndexFlatL2(dimension)
-            self.metadata = []
-    
-    def add_documents(self, documents: List[Dict[str, Any]]):
-        """Add documents to vector store"""
-        texts = [doc['content'] for doc in documents]
-        embeddings = self.embedding_model.encode(texts)
-        
-        self.index.add(np.array(embeddings).astype('float32'))
-        self.metadata.extend(documents)
-        
-        self.save()
+            self.documents.open(stored["wal_generation"])
+            self.vector_ids = stored["vector_ids"]
+            self.chunks = {parent: set(chunk_ids) for parent, chunk_ids in stored.get("chunks", {}).items()}
+            self.tombstones = set(stored.get("tombstones", ()))
+        if "content_hashes" not in stored:
+            # Checkpoints from before hashing: hash every stored record once
+            for vector_id in self.vector_ids.values():
+                self._remember_hashes(vector_id, self.documents.get(vector_id))
+            return True
+        self.record_hashes = stored["record_hashes"]
+        self.content_hashes = stored["content_hashes"]
+        for vector_id, digest in self.content_hashes.items():
+            self._hash_vectors.setdefault(digest, set()).add(vector_id)
+        return "documents" in stored
+
+    def _migrate(self, metadata: List[Dict[str, Any]]):
+        """Convert a position-keyed index and metadata list to vector ids"""
+        index = faiss.read_index(self.index_path)
+        try:
+            vectors = index.reconstruct_n(0, index.ntotal)
+        except RuntimeError:
+            # Some ANN indexes cannot return their vectors; embed once more
+            vectors = self._encode([doc['content'] for doc in metadata])
+        for position, doc in enumerate(metadata):
+            self._place(position, doc, vectors[position])
+        self.version = self._legacy_version()
+
+    def _checkpoint_files(self, generation: int) -> Tuple[str, str]:
+        index_path = f"{self.index_path}.{generation:08d}"
+        return index_path, f"{index_path}.embeddings"
+
+    def _remove_other_checkpoints(self, generation: int):
+        """Delete index and embeddings files the published checkpoint no longer points at"""
+        keep = set(self._checkpoint_files(generation))
+        stale = glob.glob(glob.escape(self.index_path) + ".[0-9]*")
+        # Checkpoints used to overwrite a single index and embeddings file
+        stale += [self.index_path, f"{self.index_path}.embeddings"]
+        for path in stale:
+            if path not in keep and os.path.exists(path):
+                os.remove(path)
+
+    def _legacy_version(self) -> int:
+        try:
+            with open(f"{self.index_path}.version") as f:
+                return int(f.read().strip() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    @property
+    def index_type(self) -> str:
+        return index_type_of(self.index)
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        return np.array(self.embedding_model.encode(texts, batch_size=self.encode_batch_size)).astype('float32')
+
+    def _remember_hashes(self, vector_id: int, doc: Dict[str, Any]):
+        digest = content_hash(doc['content'])
+        self.record_hashes[vector_id] = record_hash(doc)
+        self.content_hashes[vector_id] = digest
+        self._hash_vectors.setdefault(digest, set()).add(vector_id)
+
+    def _forget_hashes(self, vector_id: int):
+        del self.record_hashes[vector_id]
+        digest = self.content_hashes.pop(vector_id)
+        holders = self._hash_vectors[digest]
+        holders.discard(vector_id)
+        if not holders:
+            del self._hash_vectors[digest]
+            # Keep the last copy of the text's embedding in case it comes back;
+            # a replayed delete may find it already gone from an older checkpoint
+            embedding = self.embeddings.get(vector_id)
+            if embedding is None:
+                return
+            self._removed_embeddings[digest] = embedding
+            self._removed_embeddings.move_to_end(digest)
+            while len(self._removed_embeddings) > self.embedding_cache_size:
+                self._removed_embeddings.popitem(last=False)
+
+    def _cached_embedding(self, digest: bytes) -> Optional[np.ndarray]:
+        holders = self._hash_vectors.get(digest)
+        if holders:
+            return self.embeddings[next(iter(holders))]
+        return self._removed_embeddings.get(digest)
+
+    def _place(self, vector_id: int, doc: Dict[str, Any], embedding: np.ndarray) -> List[int]:
+        """Store a document under ``vector_id``; returns the vector id it replaced, if any"""
+        replaced = self._drop([doc['id']])
+        self.documents.put(vector_id, doc)
+        self.embeddings[vector_id] = embedding
+        self._remember_hashes(vector_id, doc)
+        self.vector_ids[doc['id']] = vector_id
+        if doc.get('parent_id') is not None:
+            self.chunks.setdefault(doc['parent_id'], set()).add(doc['id'])
+        self.next_id = max(self.next_id, vector_id + 1)
+        return replaced
+
+    def _drop(self, doc_ids: List[str]) -> List[int]:
+        removed = []
+        for doc_id in doc_ids:
+            vector_id = self.vector_ids.pop(doc_id, None)
+            if vector_id is not None:
+                if self.chunks:
+                    parent_id = self.documents.get(vector_id).get('parent_id')
+                    siblings = self.chunks.get(parent_id)
+                    if siblings is not None:
+                        siblings.discard(doc_id)
+                        if not siblings:
+                            del self.chunks[parent_id]
+                self._forget_hashes(vector_id)
+                self.documents.remove(vector_id)
+                self.embeddings.pop(vector_id, None)
+                removed.append(vector_id)
+        return removed
+
+    def _apply(self, record: Tuple[str, int, Any]) -> List[int]:
+        """Apply a logged change to the documents; returns the vector ids it removed.
+
+        Replaying a change that is already reflected is harmless, so the
+        log can safely overlap a checkpoint.
+        """
+        op, version, payload = record
+        self.version = max(self.version, version)
+        if op == "add":
+            removed = []
+            for vector_id, doc, embedding in payload:
+                removed.extend(self._place(vector_id, doc, embedding))
+            return removed
+        return self._drop(payload)
+
+    def _with_chunks(self, doc_ids) -> List[str]:
+        """Stored ids for ``doc_ids``, expanding chunked parents to their chunks"""
+        expanded = []
+        for doc_id in doc_ids:
+            expanded.extend(sorted(self.chunks.get(doc_id, ())))
+            if doc_id in self.vector_ids:
+                expanded.append(doc_id)
+        return expanded
+
+    def _log(self, op: str, payload: Any) -> List[int]:
+        record = (op, self.version + 1, payload)
+        self.wal.append(record)
+        wal_pending_records.set(self.wal.pending)
+        return self._apply(record)
+
+    def _stored_vectors(self) -> Tuple[np.ndarray, np.ndarray]:
+        ids = np.fromiter(self.embeddings.keys(), dtype='int64', count=len(self.embeddings))
+        vectors = (
+            np.stack(list(self.embeddings.values())) if self.embeddings
+            else np.empty((0, self.dimension), dtype='float32')
+        )
+        return ids, vectors
+
+    def _rebuild(self):
+        """Rebuild the index from the stored embeddings, in the calling thread (startup only)"""
+        ids, vectors = self._stored_vectors()
+        self.index = build_index(self.settings, self.dimension, vectors, ids)
+        self.tombstones = set()
+        index_rebuilds.labels(index_type=self.index_type).inc()
+
+    def rebuild(self):
+        """Rebuild the index from the stored embeddings and swap it in.
+
+        The new index is built without holding the store lock; changes made
+        meanwhile are replayed onto it under the lock before the swap.
+        """
+        with self._rebuild_lock:
+            with self._lock:
+                ids, vectors = self._stored_vectors()
+                # Vector ids are allocated in increasing order, so ids from
+                # here on were added after this snapshot
+                snapshot_next_id = self.next_id
+                self._rebuild_journal = ([], [])
+            try:
+                index = build_index(self.settings, self.dimension, vectors, ids)
+            except Exception:
+                with self._lock:
+                    self._rebuild_journal = None
+                raise
+
+            with self._lock:
+                added, removed = self._rebuild_journal
+                self._rebuild_journal = None
+                added = [vector_id for vector_id in added if vector_id in self.embeddings]
+                if added:
+                    index.add_with_ids(
+                        np.stack([self.embeddings[vector_id] for vector_id in added]),
+                        np.array(added, dtype='int64')
+                    )
+                self.index = index
+                self.tombstones = set()
+                self._remove_vectors([vector_id for vector_id in removed if vector_id < snapshot_next_id])
+        index_rebuilds.labels(index_type=self.index_type).inc()
+
+    def _schedule_rebuild(self):
+        """Ask the background thread for a rebuild; called with the lock held"""
+        self._rebuild_requested = True
+        if self._rebuild_thread is None:
+            self._rebuild_thread = threading.Thread(
+                target=self._rebuild_in_background, name="kb-index-rebuild", daemon=True
+            )
+            self._rebuild_thread.start()
+
+    def _rebuild_in_background(self):
+        while True:
+            with self._lock:
+                if not self._rebuild_requested:
+                    self._rebuild_thread = None
+                    return
+                self._rebuild_requested = False
+            try:
+                self.rebuild()
+            except Exception as e:
+                # The current index keeps serving; the next change asks again
+                logger.error(f"Vector index rebuild failed: {e}")
+
+    def wait_for_rebuild(self):
+        """Block until any scheduled background rebuild has been swapped in"""
+        thread = self._rebuild_thread
+        if thread is not None:
+            thread.join()
+
+    def _add_vectors(self, vector_ids: List[int]):
+        if not vector_ids:
+            return
+        self.index.add_with_ids(
+            np.stack([self.embeddings[vector_id] for vector_id in vector_ids]),
+            np.array(vector_ids, dtype='int64')
+        )
+        if self._rebuild_journal is not None:
+            self._rebuild_journal[0].extend(vector_ids)
+
+    def _remove_vectors(self, vector_ids: List[int]):
+        """Remove vectors from the index, or tombstone them if it cannot remove"""
+        if not vector_ids:
+            return
+        if self._rebuild_journal is not None:
+            self._rebuild_journal[1].extend(vector_ids)
+        if supports_remove(self.index):
+            self.index.remove_ids(np.array(vector_ids, dtype='int64'))
+            return
+        self.tombstones.update(vector_ids)
+        if len(self.tombstones) > self.max_tombstone_ratio * self.index.ntotal:
+            self._schedule_rebuild()
     
+    def add_documents(self, documents: List[Dict[str, Any]]) -> Dict[str, int]:
+        """Add documents or chunks to vector store, replacing any with the same ID.
+
+        Chunks of a re-ingested parent that the new batch no longer contains
+        are removed along with it. Records identical to the stored copy are
+        skipped, and only text not already stored (or recently removed) is
+        embedded. Returns how many records were added, updated, unchanged,
+        removed and embedded.
+        """
+        # A document repeated within the batch keeps only its last copy
+        documents = list({doc['id']: doc for doc in documents}.values())
+        hashes = [(record_hash(doc), content_hash(doc['content'])) for doc in documents]
+        embeddings: Dict[bytes, np.ndarray] = {}
+        embedded = 0
+
+        while True:
+            with self._lock:
+                changed = [
+                    (doc, digest) for doc, (full, digest) in zip(documents, hashes)
+                    if self.record_hashes.get(self.vector_ids.get(doc['id'])) != full
+                ]
+                missing: Dict[bytes, str] = {}
+                for doc, digest in changed:
+                    if digest not in embeddings:
+                        cached = self._cached_embedding(digest)
+                        if cached is not None:
+                            embeddings[digest] = cached
+                        else:
+                            missing[digest] = doc['content']
+                if not missing:
+                    counts = self._store(documents, changed, embeddings)
+                    break
+            # Embed outside the lock, then re-check: the store may have changed meanwhile
+            embeddings.update(zip(missing, self._encode(list(missing.values()))))
+            embedded += len(missing)
+
+        counts["embedded"] = embedded
+        embedded_records.inc(embedded)
+        for outcome in ("added", "updated", "unchanged"):
+            ingested_records.labels(outcome=outcome).inc(counts[outcome])
+        return counts
+
+    def _store(self, documents: List[Dict[str, Any]], changed: List[Tuple[Dict[str, Any], bytes]],
+               embeddings: Dict[bytes, np.ndarray]) -> Dict[str, int]:
+        """Apply the changed records of an add_documents batch; called with the lock held"""
+        incoming = {doc['id'] for doc in documents}
+        parents = {doc.get('parent_id') or doc['id'] for doc in documents}
+        stale = [doc_id for doc_id in self._with_chunks(parents) if doc_id not in incoming]
+        updated = sum(1 for doc, _ in changed if doc['id'] in self.vector_ids)
+        counts = {
+            "added": len(changed) - updated,
+            "updated": updated,
+            "unchanged": len(documents) - len(changed),
+            "removed": len(stale),
+        }
+        if not changed and not stale:
+            return counts
+        removed = self._log("delete", stale) if stale else []
+
+        entries = []
+        # Records whose text is unchanged keep their vector; only the stored record is rewritten
+        in_place = set()
+        next_id = self.next_id
+        for doc, digest in changed:
+            vector_id = self.vector_ids.get(doc['id'])
+            if vector_id is not None and self.content_hashes[vector_id] == digest:
+                in_place.add(vector_id)
+            else:
+                vector_id = next_id
+                next_id += 1
+            entries.append((vector_id, doc, embeddings[digest]))
+        if entries:
+            removed += self._log("add", entries)
+        removed = [vector_id for vector_id in removed if vector_id not in in_place]
+        new_ids = [vector_id for vector_id, _, _ in entries if vector_id not in in_place]
+
+        self._remove_vectors(removed)
+        self._add_vectors(new_ids)
+        if self.index_type == "flat" and self.settings.resolve(len(self.embeddings)) != "flat":
+            # Train the new index type on the whole corpus in the background;
+            # the exact index keeps serving until it is swapped in
+            self._schedule_rebuild()
+        return counts
+
     def search(self, query: str, k: int = 5) -> List[Dict[str, Any]]:
-        """Search for similar documents"""
-        query_embedding = self.embedding_model.encode([query])
-        distances, indices = self.index.search(
-            np.array(query_embedding).astype('float32'), k
-        )
-        
-        results = []
-        for i, idx in enumerate(indices[0]):
-            if idx < len(self.metadata):
-                result = self.metadata[idx].copy()
-                result['score'] = float(distances[0][i])
-                results.append(result)
+        """Search for similar documents, returning each parent document at most once.
+
+        A chunked document is represented by its best-matching chunk, under
+        the parent's id.
+        """
+        query_embedding = self._encode([query])
+        with self._lock:
+            # Several hits may be chunks of the same parent, and tombstoned
+            # vectors are skipped, so look further
+            candidates = (k * self.chunk_overfetch if self.chunks else k) + len(self.tombstones)
+            started = time.perf_counter()
+            distances, indices = self.index.search(query_embedding, candidates)
+            search_latency.labels(index_type=self.index_type).observe(time.perf_counter() - started)
+            
+            results = []
+            seen = set()
+            for i, idx in enumerate(indices[0]):
+                # ANN indexes return -1 when fewer than k neighbours were found
+                # Decoded from the memory-mapped store, so it is already a private copy
+                doc = self.documents.get(int(idx))
+                if doc is None:
+                    continue
+                parent_id = doc.pop('parent_id', None)
+                if parent_id is not None:
+                    doc['chunk_id'], doc['id'] = doc['id'], parent_id
+                if doc['id'] in seen:
+                    continue
+                seen.add(doc['id'])
+                doc['score'] = float(distances[0][i])
+                results.append(doc)
+                if len(results) == k:
+                    break
         
         return results
-    
-    def save(self):
-        """Save index to disk"""
-        faiss.write_index(self.index, self.index_path)
-        with open(f"{self.index_path}.metadata", "wb") as f:
-            pickle.dump(self.metadata, f)
+
+    def checkpoint(self) -> bool:
+        """Checkpoint if anything changed since the last one; returns whether it did"""
+        if not self.wal.pending:
+            return False
+        self._checkpoint()
+        return True
+
+    def _checkpoint(self):
+        """Write the current state to disk and drop the log segments it covers.
+
+        Only the in-memory snapshot is taken under the store lock; writers
+        carry on in a new log segment while the files are written.
+        """
+        with self._checkpoint_lock:
+            started = time.perf_counter()
+            with self._lock:
+                index_bytes = faiss.serialize_index(self.index).tobytes()
+                ids, vectors = self._stored_vectors()
+                documents = self.documents.snapshot()
+                state = {
+                    "vector_ids": dict(self.vector_ids),
+                    "chunks": {parent: sorted(chunk_ids) for parent, chunk_ids in self.chunks.items()},
+                    "tombstones": sorted(self.tombstones),
+                    "next_id": self.next_id,
+                    "version": self.version,
+                    "record_hashes": dict(self.record_hashes),
+                    "content_hashes": dict(self.content_hashes),
+                    "wal_generation": self.wal.rotate(),
+                }
+                state["files_generation"] = state["wal_generation"]
+                wal_pending_records.set(0)
+
+            generation = state["wal_generation"]
+            index_path, embeddings_path = self._checkpoint_files(generation)
+            embeddings = io.BytesIO()
+            np.savez(embeddings, ids=ids, vectors=vectors)
+            self.documents.write(documents, generation)
+            atomic_write(index_path, index_bytes)
+            atomic_write(embeddings_path, embeddings.getvalue())
+            # Written last, it publishes this generation's files: until it lands,
+            # recovery uses the previous checkpoint's files plus the full log
+            atomic_write(f"{self.index_path}.metadata", pickle.dumps(state, protocol=pickle.HIGHEST_PROTOCOL))
+
+            with self._lock:
+                self.documents.swap(documents, generation)
+            self.documents.remove_other_generations(generation)
+            self._remove_other_checkpoints(generation)
+            self.wal.truncate_before(generation)
+            checkpoint_duration.observe(time.perf_counter() - started)
+
+    def close(self):
+        """Checkpoint outstanding changes and close the log"""
+        self.wait_for_rebuild()
+        self.checkpoint()
+        self.wal.close()
     
     def delete_by_id(self, doc_ids: List[str]):
-        """Delete documents by ID (requires rebuilding index)"""
-        self.metadata = [doc for doc in self.metadata if doc['id'] not in doc_ids]
-        
-        # Rebuild index
-        if self.metadata:
-            texts = [doc['content'] for doc in self.metadata]
-            embeddings = self.embedding_model.encode(texts)
-            
-            self.index = faiss.IndexFlatL2(self.dimension)
-            self.index.add(np.array(embeddings).astype('float32'))
-        else:
-            self.index = faiss.IndexFlatL2(self.dimension)
-        
-        self.save()
\ No newline at end of file
+        """Delete documents (and their chunks) by ID, without re-embedding the rest of the corpus"""
+        with self._lock:
+            doc_ids = self._with_chunks(doc_ids)
+            if not doc_ids:
+                return
+            removed = self._log("delete", doc_ids)
+            self._remove_vectors(removed)
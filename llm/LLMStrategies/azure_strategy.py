@@ -10,7 +10,7 @@ class AzureOpenAIStrategy(LLMStrategy):
             openai_api_version=env_vars["OPENAI-API-VERSION"],           
             openai_api_key=env_vars["AZURE-OPENAI-API-KEY"],         
             azure_endpoint=env_vars["AZURE-OPENAI-ENDPOINT"],
-            max_tokens=4000
+            max_tokens=self.config.get("max_tokens", 4000)
         )
 
 
@@ -1,17 +1,19 @@
-from .openai_strategy import OpenAIStrategy
-from .gemini_strategy import GeminiStrategy
-from .llama_strategy import LlamaStrategy
-from .azure_strategy import AzureOpenAIStrategy
+import importlib
 
-def get_llm_strategy(service_name: str,config):
-    strategies = {
-        "openai": OpenAIStrategy,
-        "gemini": GeminiStrategy,
-        "llama": LlamaStrategy,
-        "azure_openai": AzureOpenAIStrategy,
-    }
+# Strategy modules are imported on first use so a replica only pays the
+# import cost of the provider SDKs it is configured for
+STRATEGIES = {
+    "openai": ("openai_strategy", "OpenAIStrategy"),
+    "gemini": ("gemini_strategy", "GeminiStrategy"),
+    "llama": ("llama_strategy", "LlamaStrategy"),
+    "azure_openai": ("azure_strategy", "AzureOpenAIStrategy"),
+}
 
-    strategy_cls = strategies.get(service_name.lower())
-    if not strategy_cls:
+def get_llm_strategy(service_name: str,config):
+    entry = STRATEGIES.get(service_name.lower())
+    if not entry:
         raise ValueError(f"Unsupported LLM service: {service_name}")
+    module_name, class_name = entry
+    module = importlib.import_module(f".{module_name}", __package__)
+    strategy_cls = getattr(module, class_name)
     return strategy_cls(config)
@@ -8,5 +8,5 @@ class LlamaStrategy(LLMStrategy):
         return OllamaLLM(
             base_url=env_vars["BASE_URL"],
             model="llama3.3:latest",
-            max_tokens=4000
+            max_tokens=self.config.get("max_tokens", 4000)
         )
\ No newline at end of file
@@ -0,0 +1,122 @@
+import asyncio
+import json
+import logging
+import os
+import threading
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def load_llm_config(path: Optional[str], default_service: str, default_config: Dict[str, Any]) -> Dict[str, Any]:
+    """Read the backend configuration, falling back to the built-in defaults.
+
+    The file holds ``{"default": "<service>", "backends": {"<service>": {...}}}``;
+    every listed backend is initialized, requests go to ``default``.
+    """
+    if path and os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            config = json.load(f)
+    else:
+        config = {"default": default_service, "backends": {default_service: default_config}}
+
+    if config.get("default") not in config.get("backends", {}):
+        raise ValueError(f"Default LLM backend {config.get('default')!r} is not configured")
+    return config
+
+
+class LLMRegistry:
+    """Initialized LLM clients, built once per backend and reused across requests.
+
+    Clients keep their own HTTP connection pools, so reusing them also reuses
+    the connections. ``reload()`` rebuilds only backends whose configuration
+    changed and swaps them in atomically; a backend that fails to rebuild
+    keeps serving with its previous client.
+    """
+
+    def __init__(
+        self,
+        strategy_factory: Callable[[str, Dict[str, Any]], Any],
+        config_loader: Callable[[], Dict[str, Any]],
+    ):
+        self.strategy_factory = strategy_factory
+        self.config_loader = config_loader
+        self.default: Optional[str] = None
+        self._clients: Dict[str, Any] = {}
+        self._configs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._watcher: Optional[asyncio.Task] = None
+
+    def _build(self, service: str, config: Dict[str, Any]):
+        return self.strategy_factory(service, config).initialize()
+
+    def reload(self) -> Dict[str, str]:
+        """Re-read the configuration and rebuild changed backends"""
+        with self._lock:
+            config = self.config_loader()
+            backends = config["backends"]
+            clients = dict(self._clients)
+            configs = dict(self._configs)
+            outcome = {}
+
+            for service, backend_config in backends.items():
+                if configs.get(service) == backend_config and service in clients:
+                    outcome[service] = "unchanged"
+                    continue
+                try:
+                    clients[service] = self._build(service, backend_config)
+                    configs[service] = backend_config
+                    outcome[service] = "initialized"
+                except Exception as e:
+                    if service not in clients:
+                        raise
+                    logger.error(f"Reloading LLM backend {service} failed, keeping previous client: {e}")
+                    outcome[service] = "failed"
+
+            for service in set(clients) - set(backends):
+                del clients[service]
+                configs.pop(service, None)
+                outcome[service] = "removed"
+
+            # Readers see either the old or the new set, never a mix
+            self._clients, self._configs, self.default = clients, configs, config["default"]
+            return outcome
+
+    def get(self, service: Optional[str] = None):
+        service = service or self.default
+        try:
+            return self._clients[service]
+        except KeyError:
+            raise ValueError(f"LLM backend {service!r} is not initialized")
+
+    @property
+    def services(self):
+        return list(self._clients)
+
+    async def watch(self, path: str, interval: float):
+        """Reload whenever the config file's modification time changes"""
+        last_mtime = os.path.getmtime(path) if os.path.exists(path) else None
+        while True:
+            await asyncio.sleep(interval)
+            mtime = os.path.getmtime(path) if os.path.exists(path) else None
+            if mtime == last_mtime:
+                continue
+            last_mtime = mtime
+            try:
+                outcome = await asyncio.to_thread(self.reload)
+                logger.info(f"Reloaded LLM config from {path}: {outcome}")
+            except Exception as e:
+                logger.error(f"Reloading LLM config from {path} failed: {e}")
+
+    def start_watching(self, path: Optional[str], interval: float):
+        if path and interval > 0 and self._watcher is None:
+            self._watcher = asyncio.create_task(self.watch(path, interval))
+
+    async def stop_watching(self):
+        if self._watcher is not None:
+            self._watcher.cancel()
+            try:
+                await self._watcher
+            except asyncio.CancelledError:
+                pass
+            self._watcher = None
@@ -1,15 +1,39 @@
 # ============================================================================
 # LLM ORCHESTRATOR SERVICE (llm/main.py)
 # ============================================================================
-from fastapi import FastAPI
-from pydantic import BaseModel
+from startup import LazyResource, StartupReport
+
+# Created first so every import below is timed
+startup_report = StartupReport()
+
+with startup_report.phase("import fastapi"):
+    from fastapi import FastAPI, HTTPException
+    from fastapi.responses import StreamingResponse
+    from pydantic import BaseModel
 from typing import Dict, Any, List
-import faiss
-import numpy as np
-import httpx
-from sentence_transformers import SentenceTransformer
+import asyncio
+import hashlib
+import json
+import os
+import time
+from utils.log import Logger
 # Import strategy factory
-from LLMStrategies.factory import get_llm_strategy
+with startup_report.phase("import LLM strategies"):
+    from LLMStrategies.factory import get_llm_strategy
+    from LLMStrategies.registry import LLMRegistry, load_llm_config
+import httpx
+from utils.service_client import DeadlineExceeded, ServiceClients, format_sse
+from utils.circuit_breaker import CircuitBreaker, CircuitOpenError
+from middleware.metrics import setup_metrics_endpoint
+from middleware.event_loop import run_blocking, setup_event_loop
+from semantic_cache import SemanticCache
+from prompt_builder import PromptBuilder, TokenCounter
+from retrieval_cache import RetrievalCache, normalize_query
+from single_flight import SingleFlight
+from provider_router import NoProviderAvailable, ProviderRouter
+from retrieval_snapshot import RetrievalSnapshot, retrieval_fallbacks, retrieval_requests
+
+Logging = Logger(name="llm_service", log_file="Logs/app.log")
 
 # Initialize app
 app = FastAPI(title="LLM Orchestrator Service")
@@ -17,44 +41,269 @@ app = FastAPI(title="LLM Orchestrator Service")
 # ---------------------------------------------------------------------------
 # Configuration
 # ---------------------------------------------------------------------------
-LLM_SERVICE = "azure_openai"  # could be "gemini", "llama", etc.
+LLM_SERVICE = os.getenv("LLM_SERVICE", "azure_openai")  # could be "gemini", "llama", etc.
 LLM_CONFIG = {
     "temperature": 0.3,
     "model": "gpt-4o-mini",
     "max_tokens": 3000
 }
+# Optional JSON file listing several backends; polled for changes so the
+# config can be hot reloaded without a restart
+LLM_CONFIG_PATH = os.getenv("LLM_CONFIG_PATH")
+LLM_CONFIG_RELOAD_SECONDS = float(os.getenv("LLM_CONFIG_RELOAD_SECONDS", "10"))
 
-app = FastAPI(title="LLM Orchestrator Service")
+# Each backend is initialized once and its client (and HTTP pool) reused
+llm_registry = LLMRegistry(
+    get_llm_strategy,
+    lambda: load_llm_config(LLM_CONFIG_PATH, LLM_SERVICE, LLM_CONFIG)
+)
 
-# Vector store for RAG
-embedding_model = SentenceTransformer('all-MiniLM-L6-v2')
-dimension = 384
-index = faiss.IndexFlatL2(dimension)
+# Requests are routed across every configured backend: the default first,
+# failing over (and optionally hedging) to the others
+LLM_PROVIDER_ORDER = [p.strip() for p in os.getenv("LLM_PROVIDER_ORDER", "").split(",") if p.strip()]
+LLM_PROVIDER_TIMEOUT_SECONDS = float(os.getenv("LLM_PROVIDER_TIMEOUT_SECONDS", "30"))
+LLM_FIRST_TOKEN_TIMEOUT_SECONDS = float(os.getenv("LLM_FIRST_TOKEN_TIMEOUT_SECONDS", "10"))
+LLM_HEDGING_ENABLED = os.getenv("LLM_HEDGING_ENABLED", "false").lower() == "true"
+LLM_HEDGE_MIN_DELAY_MS = float(os.getenv("LLM_HEDGE_MIN_DELAY_MS", "200"))
+LLM_HEDGE_MAX_DELAY_MS = float(os.getenv("LLM_HEDGE_MAX_DELAY_MS", "5000"))
+LLM_PROVIDER_BREAKER_FAILURES = int(os.getenv("LLM_PROVIDER_BREAKER_FAILURES", "5"))
+LLM_PROVIDER_BREAKER_RESET_SECONDS = int(os.getenv("LLM_PROVIDER_BREAKER_RESET_SECONDS", "30"))
 
+def provider_order() -> list:
+    configured = llm_registry.services
+    if LLM_PROVIDER_ORDER:
+        return [p for p in LLM_PROVIDER_ORDER if p in configured]
+    return [llm_registry.default] + [p for p in configured if p != llm_registry.default]
 
-KNOWLEDGE_INGESTION_URL = "http://knowledge-ingestion-service:8011"
+provider_router = ProviderRouter(
+    llm_registry.get,
+    provider_order,
+    timeout=LLM_PROVIDER_TIMEOUT_SECONDS,
+    first_token_timeout=LLM_FIRST_TOKEN_TIMEOUT_SECONDS,
+    hedging=LLM_HEDGING_ENABLED,
+    hedge_min_delay=LLM_HEDGE_MIN_DELAY_MS / 1000.0,
+    hedge_max_delay=LLM_HEDGE_MAX_DELAY_MS / 1000.0,
+    breaker_failures=LLM_PROVIDER_BREAKER_FAILURES,
+    breaker_reset=LLM_PROVIDER_BREAKER_RESET_SECONDS
+)
 
-async def retrieve_context(query: str, k: int = 3) -> list[str]:
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(
-            f"{KNOWLEDGE_INGESTION_URL}/search",
-            params={"k": k},
-            json={"query": query}
-        )
-        data = resp.json()
-    return [doc["content"] for doc in data.get("results", [])]
+@app.on_event("startup")
+async def start_llm_registry():
+    # Includes importing the configured providers' SDKs
+    with startup_report.phase("initialize LLM backends"):
+        llm_registry.reload()
+    llm_registry.start_watching(LLM_CONFIG_PATH, LLM_CONFIG_RELOAD_SECONDS)
+
+@app.on_event("shutdown")
+async def stop_llm_registry():
+    await llm_registry.stop_watching()
+
+@app.post("/admin/reload")
+async def reload_llm_config():
+    outcome = await run_blocking(llm_registry.reload)
+    return {"default": llm_registry.default, "backends": outcome}
+
+# Prompts are fitted into an input-token budget counted with the model's tokenizer
+PROMPT_TOKEN_BUDGET = int(os.getenv("LLM_PROMPT_TOKEN_BUDGET", "2000"))
+PROMPT_HISTORY_TURNS = int(os.getenv("LLM_PROMPT_HISTORY_TURNS", "3"))
+PROMPT_MAX_MESSAGE_TOKENS = int(os.getenv("LLM_PROMPT_MAX_MESSAGE_TOKENS", "512"))
+
+prompt_builder = PromptBuilder(
+    TokenCounter.for_model(LLM_CONFIG["model"]),
+    input_budget=PROMPT_TOKEN_BUDGET,
+    max_history_turns=PROMPT_HISTORY_TURNS,
+    max_message_tokens=PROMPT_MAX_MESSAGE_TOKENS
+)
+
+# Heavy models load only if a feature that needs them is enabled: on the
+# first request that uses them (in the thread pool), or at startup with
+# LLM_PRELOAD_MODELS=true to trade a slower start for a fast first request
+LLM_PRELOAD_MODELS = os.getenv("LLM_PRELOAD_MODELS", "false").lower() == "true"
+EMBEDDING_MODEL_NAME = os.getenv("LLM_EMBEDDING_MODEL", "all-MiniLM-L6-v2")
+
+def load_embedding_model():
+    with startup_report.phase("import sentence_transformers"):
+        from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(EMBEDDING_MODEL_NAME)
+
+embedding_model = LazyResource("embedding model", load_embedding_model, startup_report)
+
+KNOWLEDGE_INGESTION_URL = os.getenv("KNOWLEDGE_INGESTION_URL", "http://knowledge-ingestion-service:8011")
+
+service_clients = ServiceClients()
+service_clients.register("knowledge_ingestion", KNOWLEDGE_INGESTION_URL, timeout=10.0)
+service_clients.setup(app)
+setup_metrics_endpoint(app)
+
+# Blocking work goes to a bounded pool; handlers that block the loop are flagged
+setup_event_loop(
+    app,
+    "llm_service",
+    threads=int(os.getenv("EVENT_LOOP_THREADS", "8")),
+    block_threshold_ms=float(os.getenv("EVENT_LOOP_BLOCK_THRESHOLD_MS", "100"))
+)
+
+# Semantic cache of validated responses for near-duplicate questions
+SEMANTIC_CACHE_ENABLED = os.getenv("LLM_SEMANTIC_CACHE_ENABLED", "true").lower() == "true"
+SEMANTIC_CACHE_THRESHOLD = float(os.getenv("LLM_SEMANTIC_CACHE_THRESHOLD", "0.92"))
+SEMANTIC_CACHE_TTL_SECONDS = float(os.getenv("LLM_SEMANTIC_CACHE_TTL_SECONDS", "3600"))
+SEMANTIC_CACHE_MAX_ENTRIES = int(os.getenv("LLM_SEMANTIC_CACHE_MAX_ENTRIES", "5000"))
+
+semantic_cache = SemanticCache(
+    lambda texts: embedding_model.get().encode(texts),
+    threshold=SEMANTIC_CACHE_THRESHOLD,
+    ttl=SEMANTIC_CACHE_TTL_SECONDS,
+    max_entries=SEMANTIC_CACHE_MAX_ENTRIES
+)
+
+# Retrieval gets a strict deadline behind a circuit breaker; when it times
+# out or the circuit is open, a local snapshot of the most retrieved
+# documents answers instead
+RETRIEVAL_TIMEOUT_SECONDS = float(os.getenv("LLM_RETRIEVAL_TIMEOUT_SECONDS", "1.0"))
+RETRIEVAL_BREAKER_FAILURES = int(os.getenv("LLM_RETRIEVAL_BREAKER_FAILURES", "5"))
+RETRIEVAL_BREAKER_RESET_SECONDS = int(os.getenv("LLM_RETRIEVAL_BREAKER_RESET_SECONDS", "30"))
+FALLBACK_ENABLED = os.getenv("LLM_FALLBACK_RETRIEVAL_ENABLED", "true").lower() == "true"
+FALLBACK_SNAPSHOT_DIR = os.getenv("LLM_FALLBACK_SNAPSHOT_DIR", "snapshots")
+FALLBACK_SNAPSHOT_DOCUMENTS = int(os.getenv("LLM_FALLBACK_SNAPSHOT_DOCUMENTS", "500"))
+FALLBACK_SYNC_SECONDS = float(os.getenv("LLM_FALLBACK_SYNC_SECONDS", "300"))
 
-# Knowledge base (in production, load from database)
-knowledge_base = [
-    "Our return policy allows returns within 30 days of delivery.",
-    "Shipping typically takes 3-5 business days for standard delivery.",
-    "You can track your order using the tracking ID sent to your email.",
-    "Refunds are processed within 5-7 business days after approval.",
-]
+retrieval_breaker = CircuitBreaker(
+    failure_threshold=RETRIEVAL_BREAKER_FAILURES,
+    timeout=RETRIEVAL_BREAKER_RESET_SECONDS,
+    half_open_attempts=1
+)
+retrieval_snapshot = RetrievalSnapshot(
+    FALLBACK_SNAPSHOT_DIR,
+    lambda texts: embedding_model.get().encode(texts),
+    max_documents=FALLBACK_SNAPSHOT_DOCUMENTS
+)
 
-# Embed and store knowledge
-knowledge_embeddings = embedding_model.encode(knowledge_base)
-index.add(np.array(knowledge_embeddings).astype('float32'))
+async def search_knowledge_base(query: str, k: int) -> tuple:
+    # A single attempt: retrying a slow vector store only adds to its load.
+    # httpx applies its timeout to each phase (connect, pool, read, ...), so
+    # wait_for makes the budget a hard deadline for the whole call
+    resp = await asyncio.wait_for(
+        service_clients["knowledge_ingestion"].post(
+            "/search",
+            params={"query": query, "k": k},
+            timeout=RETRIEVAL_TIMEOUT_SECONDS,
+            retries=0
+        ),
+        RETRIEVAL_TIMEOUT_SECONDS
+    )
+    resp.raise_for_status()
+    data = resp.json()
+    return [doc["content"] for doc in data.get("results", [])], data.get("kb_version", 0)
+
+# Search results for repeated queries, dropped whenever the knowledge base
+# version moves (seen on searches, pushed by knowledge-ingestion's webhook or
+# found by polling its /version endpoint)
+RETRIEVAL_CACHE_ENABLED = os.getenv("LLM_RETRIEVAL_CACHE_ENABLED", "true").lower() == "true"
+RETRIEVAL_CACHE_MAX_ENTRIES = int(os.getenv("LLM_RETRIEVAL_CACHE_MAX_ENTRIES", "10000"))
+RETRIEVAL_CACHE_TTL_SECONDS = float(os.getenv("LLM_RETRIEVAL_CACHE_TTL_SECONDS", "300"))
+KB_VERSION_POLL_SECONDS = float(os.getenv("LLM_KB_VERSION_POLL_SECONDS", "30"))
+
+retrieval_cache = RetrievalCache(
+    max_entries=RETRIEVAL_CACHE_MAX_ENTRIES,
+    ttl=RETRIEVAL_CACHE_TTL_SECONDS
+)
+
+def observe_kb_version(kb_version: int):
+    retrieval_cache.observe_version(kb_version)
+    semantic_cache.invalidate(kb_version)
+
+async def retrieve_context(query: str, k: int = 3) -> tuple:
+    """Return the retrieved documents and the knowledge base version they came from.
+
+    The version is None when the documents came from the local snapshot.
+    """
+    if RETRIEVAL_CACHE_ENABLED:
+        cached = retrieval_cache.get(query, k)
+        if cached is not None:
+            return cached
+
+    started = time.perf_counter()
+    try:
+        docs, kb_version = await retrieval_breaker.call(search_knowledge_base, query, k)
+    except CircuitOpenError:
+        reason = "circuit_open"
+    except (httpx.TimeoutException, DeadlineExceeded, asyncio.TimeoutError):
+        reason = "timeout"
+    except httpx.HTTPError:
+        reason = "error"
+    else:
+        retrieval_requests.labels(source="primary").inc()
+        if FALLBACK_ENABLED:
+            retrieval_snapshot.record(docs)
+        if RETRIEVAL_CACHE_ENABLED:
+            retrieval_cache.put(query, k, docs, kb_version, time.perf_counter() - started)
+        return docs, kb_version
+
+    if not FALLBACK_ENABLED:
+        raise HTTPException(status_code=503, detail="Knowledge base unavailable")
+    retrieval_requests.labels(source="fallback").inc()
+    retrieval_fallbacks.labels(reason=reason).inc()
+    return await run_blocking(retrieval_snapshot.search, query, k), None
+
+async def sync_retrieval_snapshot():
+    while True:
+        await asyncio.sleep(FALLBACK_SYNC_SECONDS)
+        try:
+            count = await run_blocking(retrieval_snapshot.sync)
+            Logging.info(f"Retrieval snapshot synced with {count} documents")
+        except Exception as e:
+            Logging.error(f"Retrieval snapshot sync failed: {e}")
+
+async def poll_kb_version():
+    # Safety net for a missed webhook; cheap compared to a search
+    while True:
+        await asyncio.sleep(KB_VERSION_POLL_SECONDS)
+        try:
+            resp = await service_clients["knowledge_ingestion"].get("/version", timeout=RETRIEVAL_TIMEOUT_SECONDS)
+            resp.raise_for_status()
+            observe_kb_version(resp.json()["kb_version"])
+        except Exception as e:
+            Logging.warning(f"Knowledge base version poll failed: {e}")
+
+background_tasks = []
+
+@app.on_event("startup")
+async def start_background_tasks():
+    if FALLBACK_ENABLED:
+        background_tasks.append(asyncio.create_task(sync_retrieval_snapshot()))
+    if KB_VERSION_POLL_SECONDS > 0:
+        background_tasks.append(asyncio.create_task(poll_kb_version()))
+
+@app.on_event("shutdown")
+async def stop_background_tasks():
+    for task in background_tasks:
+        task.cancel()
+    background_tasks.clear()
+
+class KnowledgeBaseChange(BaseModel):
+    kb_version: int
+
+@app.post("/cache/invalidate")
+async def invalidate_caches(change: KnowledgeBaseChange):
+    """Webhook called by knowledge-ingestion after every ingest or delete"""
+    observe_kb_version(change.kb_version)
+    return {"status": "ok", "kb_version": retrieval_cache.kb_version}
+
+def is_cacheable(request: "LLMRequest", kb_version) -> bool:
+    # Follow-up turns depend on the conversation, so only first turns are
+    # shared; fallback (snapshot) answers are never cached
+    history = request.context.get('conversation_history', {}).get('messages', [])
+    return SEMANTIC_CACHE_ENABLED and kb_version is not None and not history
+
+def cache_tier(request: "LLMRequest") -> str:
+    return request.context.get('user_profile', {}).get('tier', 'standard')
+
+def store_in_cache(request: "LLMRequest", vector, kb_version: int, generated: str, result: Dict):
+    # Only cache answers that passed validation and do not address the user by name
+    name = request.context.get('user_profile', {}).get('name')
+    if result["response"] != generated or (name and name.lower() in generated.lower()):
+        return
+    semantic_cache.put(vector, request.intent, kb_version, result, cache_tier(request))
 
 class LLMRequest(BaseModel):
     message: str
@@ -62,80 +311,134 @@ class LLMRequest(BaseModel):
     intent: str
     entities: List[Dict[str, Any]]
 
-def retrieve_context_old(query: str, k: int = 3) -> List[str]:
-    query_embedding = embedding_model.encode([query])
-    distances, indices = index.search(np.array(query_embedding).astype('float32'), k)
-    return [knowledge_base[i] for i in indices[0]]
+def build_prompt(message: str, context: Dict, retrieved_docs: List[str], intent: str = "other") -> str:
+    prompt, _ = prompt_builder.build(message, context, retrieved_docs, intent)
+    return prompt
 
-def build_prompt(message: str, context: Dict, retrieved_docs: List[str]) -> str:
-    user_profile = context.get('user_profile', {})
-    conversation = context.get('conversation_history', {}).get('messages', [])
-    
-    recent_conversation = "\n".join([
-        f"User: {msg.get('message', '')}\nBot: {msg.get('response', '')}"
-        for msg in conversation[-3:]
-    ])
+def follow_up_for(intent: str) -> str:
+    if intent == "order_status":
+        return "Please provide your order ID so I can check the status for you."
+    elif intent == "refund_request":
+        return "I'll help you process a refund. Can you share your order details?"
+    return "How can I assist you further?"
+
+def finalize_response(llm_response: str, message: str, retrieved_docs: List[str]) -> Dict:
+    # Validate response
+    validation_result = validate_response(llm_response, message)
     
-    retrieved_context = "\n".join(retrieved_docs)
+    if not validation_result['valid']:
+        llm_response = "I apologize, but I need to clarify some details. Could you rephrase your question?"
     
-    prompt = f"""You are a helpful customer service assistant for an e-commerce platform.
-
-User Profile:
-- Name: {user_profile.get('name', 'Customer')}
-- Tier: {user_profile.get('tier', 'standard')}
+    return {
+        "response": llm_response,
+        "confidence": validation_result.get('confidence', 0.8),
+        "sources": retrieved_docs
+    }
 
-Recent Conversation:
-{recent_conversation}
+# Identical concurrent first-turn requests share a single completion
+COALESCING_ENABLED = os.getenv("LLM_COALESCING_ENABLED", "true").lower() == "true"
+generation_flights = SingleFlight()
 
-Relevant Knowledge:
-{retrieved_context}
+def coalescing_key(request: LLMRequest, retrieved_docs: List[str]):
+    """Key of requests whose prompts differ only by the user's name, or None"""
+    history = request.context.get('conversation_history', {}).get('messages', [])
+    if not COALESCING_ENABLED or history:
+        return None
+    docs_digest = hashlib.sha256(json.dumps(retrieved_docs).encode()).hexdigest()
+    return (normalize_query(request.message), request.intent, docs_digest, cache_tier(request))
 
-Current User Message: {message}
+def profile_name(request: LLMRequest) -> str:
+    return request.context.get('user_profile', {}).get('name') or ''
 
-Provide a helpful, friendly, and accurate response. If you need more information, ask clarifying questions.
-Keep responses concise (2-3 sentences max).
+async def complete(prompt: str) -> str:
+    # Awaited (not invoke()) so identical requests arriving meanwhile can
+    # attach to this flight instead of queueing behind a blocked loop
+    try:
+        response, _ = await provider_router.ainvoke(prompt)
+    except NoProviderAvailable as e:
+        raise HTTPException(status_code=503, detail=str(e))
+    return response.content if hasattr(response, "content") else str(response)
 
-Response:"""
-    
-    return prompt
+async def complete_for(request: LLMRequest, prompt: str) -> tuple:
+    # The prompt carries the user's name, so the reply travels with it
+    return await complete(prompt), profile_name(request)
 
 @app.post("/generate")
 async def generate_response(request: LLMRequest):
     # Retrieve relevant context
-    retrieved_docs = await retrieve_context(request.message)
+    retrieved_docs, kb_version = await retrieve_context(request.message)
+
+    vector = None
+    if is_cacheable(request, kb_version):
+        vector = await run_blocking(semantic_cache.embed, request.message)
+        cached = semantic_cache.get(vector, request.intent, kb_version, cache_tier(request))
+        if cached is not None:
+            return cached
     
     # Build prompt with guardrails
-    prompt = build_prompt(request.message, request.context, retrieved_docs)
-    llm_strategy = get_llm_strategy(LLM_SERVICE, LLM_CONFIG)
-    llm = llm_strategy.initialize()
-    # Call LLM API (VertexAI, OpenAI, etc.)
-    # For this example, using a mock response
-    # In production, integrate with actual LLM endpoint
-    
-    # Mock LLM call
-    #llm_response = f"Based on your inquiry about '{request.intent}', I can help you with that. "
+    prompt = build_prompt(request.message, request.context, retrieved_docs, request.intent)
 
-    response = llm.invoke(prompt)
-    llm_response = response.content if hasattr(response, "content") else str(response)
-    
-    if request.intent == "order_status":
-        llm_response += "Please provide your order ID so I can check the status for you."
-    elif request.intent == "refund_request":
-        llm_response += "I'll help you process a refund. Can you share your order details?"
+    key = coalescing_key(request, retrieved_docs)
+    if key is None:
+        llm_response = await complete(prompt)
     else:
-        llm_response += "How can I assist you further?"
-    
-    # Validate response
-    validation_result = validate_response(llm_response, request.message)
-    
-    if not validation_result['valid']:
-        llm_response = "I apologize, but I need to clarify some details. Could you rephrase your question?"
+        (llm_response, leader_name), shared = await generation_flights.do(
+            key, lambda: complete_for(request, prompt)
+        )
+        # A reply that addresses the leader by name is not passed on
+        if shared and leader_name and leader_name != profile_name(request) \
+                and leader_name.lower() in llm_response.lower():
+            llm_response = await complete(prompt)
+    llm_response += follow_up_for(request.intent)
     
-    return {
-        "response": llm_response,
-        "confidence": validation_result.get('confidence', 0.8),
-        "sources": retrieved_docs
-    }
+    result = finalize_response(llm_response, request.message, retrieved_docs)
+    if vector is not None:
+        store_in_cache(request, vector, kb_version, llm_response, result)
+    return result
+
+@app.post("/generate/stream")
+async def generate_response_stream(request: LLMRequest):
+    """Stream tokens as Server-Sent Events, then a final validated "done" event"""
+    retrieved_docs, kb_version = await retrieve_context(request.message)
+
+    vector = cached = None
+    if is_cacheable(request, kb_version):
+        vector = await run_blocking(semantic_cache.embed, request.message)
+        cached = semantic_cache.get(vector, request.intent, kb_version, cache_tier(request))
+
+    prompt = build_prompt(request.message, request.context, retrieved_docs, request.intent)
+
+    async def events():
+        if cached is not None:
+            yield format_sse("token", {"token": cached["response"]})
+            yield format_sse("done", {**cached, "replaced": False})
+            return
+
+        parts = []
+        try:
+            async for chunk in provider_router.astream(prompt):
+                text = chunk.content if hasattr(chunk, "content") else str(chunk)
+                if text:
+                    parts.append(text)
+                    yield format_sse("token", {"token": text})
+        except Exception as e:
+            yield format_sse("error", {"detail": f"LLM stream failed: {e}"})
+            return
+
+        follow_up = follow_up_for(request.intent)
+        parts.append(follow_up)
+        yield format_sse("token", {"token": follow_up})
+
+        # Validation needs the complete text; if it fails, the final event
+        # carries the replacement the client should show instead
+        streamed = "".join(parts)
+        result = finalize_response(streamed, request.message, retrieved_docs)
+        if vector is not None:
+            store_in_cache(request, vector, kb_version, streamed, result)
+        result["replaced"] = result["response"] != streamed
+        yield format_sse("done", result)
+
+    return StreamingResponse(events(), media_type="text/event-stream")
 
 def validate_response(response: str, original_message: str) -> Dict:
     # Business rules validation
@@ -150,6 +453,28 @@ def validate_response(response: str, original_message: str) -> Dict:
     
     return {'valid': True, 'confidence': 0.85}
 
+def required_resources() -> List[LazyResource]:
+    """Heavy resources needed by the features enabled in this replica"""
+    resources = []
+    if SEMANTIC_CACHE_ENABLED or FALLBACK_ENABLED:
+        resources.append(embedding_model)
+    return resources
+
+@app.on_event("startup")
+async def report_startup():
+    if LLM_PRELOAD_MODELS:
+        for resource in required_resources():
+            resource.get()
+    startup_report.mark_ready()
+    Logging.info(f"LLM service startup:\n{startup_report.format()}")
+
+@app.get("/startup")
+async def startup_timings():
+    return {
+        **startup_report.as_dict(),
+        "resources": {r.name: r.loaded for r in [embedding_model]}
+    }
+
 @app.get("/health")
 async def health():
     return {"status": "healthy", "service": "llm_service"}
\ No newline at end of file
@@ -0,0 +1,185 @@
+# ============================================================================
+# TOKEN-BUDGETED PROMPT ASSEMBLY (llm/prompt_builder.py)
+# ============================================================================
+# The prompt starts with a static prefix that is identical on every request,
+# so providers with prompt caching can reuse it. The dynamic sections (user
+# profile, retrieved knowledge, recent conversation, current message) are
+# fitted into a configurable input-token budget measured with the model's
+# own tokenizer.
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from prometheus_client import Counter, Histogram
+
+prompt_tokens = Histogram(
+    'llm_prompt_tokens',
+    'Input tokens per assembled prompt',
+    ['intent'],
+    buckets=(128, 256, 512, 768, 1024, 1536, 2048, 3072, 4096, 8192)
+)
+prompt_truncations = Counter(
+    'llm_prompt_truncations_total',
+    'Prompt sections shortened or dropped to fit the token budget',
+    ['section']
+)
+
+STATIC_PREFIX = """You are a helpful customer service assistant for an e-commerce platform.
+Provide a helpful, friendly, and accurate response. If you need more information, ask clarifying questions.
+Keep responses concise (2-3 sentences max).
+Answer using the relevant knowledge below when it applies.
+
+"""
+
+PROFILE_TEMPLATE = """User Profile:
+- Name: {name}
+- Tier: {tier}
+
+"""
+KNOWLEDGE_HEADER = "Relevant Knowledge:\n"
+CONVERSATION_HEADER = "Recent Conversation:\n"
+TURN_TEMPLATE = "User: {message}\nBot: {response}\n"
+MESSAGE_TEMPLATE = """Current User Message: {message}
+
+Response:"""
+
+
+class TokenCounter:
+    """Counts and truncates text in model tokens.
+
+    Uses the model's tiktoken encoding when available and otherwise a
+    conservative ~4 characters per token estimate.
+    """
+
+    def __init__(self, encode: Optional[Callable[[str], List[int]]] = None,
+                 decode: Optional[Callable[[List[int]], str]] = None):
+        self._encode = encode
+        self._decode = decode
+
+    @classmethod
+    def for_model(cls, model: str) -> "TokenCounter":
+        try:
+            import tiktoken
+        except ImportError:
+            return cls()
+        try:
+            encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            encoding = tiktoken.get_encoding("o200k_base")
+        return cls(encoding.encode, encoding.decode)
+
+    def count(self, text: str) -> int:
+        if self._encode is None:
+            return (len(text) + 3) // 4
+        return len(self._encode(text))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        if max_tokens <= 0:
+            return ""
+        if self._encode is None:
+            return text[:max_tokens * 4]
+        tokens = self._encode(text)
+        return text if len(tokens) <= max_tokens else self._decode(tokens[:max_tokens])
+
+
+class PromptBuilder:
+    """Assembles prompts within ``input_budget`` tokens.
+
+    Retrieved documents keep their retrieval rank and may use up to
+    ``knowledge_share`` of the space left after the fixed sections; the most
+    recent conversation turns fill what remains, and any space history does
+    not use goes back to further documents. A section that does not fit
+    whole is truncated only if at least ``min_section_tokens`` remain.
+    """
+
+    def __init__(
+        self,
+        counter: TokenCounter,
+        input_budget: int = 2000,
+        max_history_turns: int = 3,
+        max_message_tokens: int = 512,
+        knowledge_share: float = 0.7,
+        min_section_tokens: int = 32,
+    ):
+        self.counter = counter
+        self.input_budget = input_budget
+        self.max_history_turns = max_history_turns
+        self.max_message_tokens = max_message_tokens
+        self.knowledge_share = knowledge_share
+        self.min_section_tokens = min_section_tokens
+
+        # Counted once; the prefix never changes between requests
+        self.prefix_tokens = counter.count(STATIC_PREFIX)
+        self._header_tokens = {
+            "knowledge": counter.count(KNOWLEDGE_HEADER + "\n"),
+            "conversation": counter.count(CONVERSATION_HEADER + "\n"),
+        }
+
+    def _fit(self, items: List[str], budget: int, section: str) -> Tuple[List[str], int]:
+        """Take items in order while they fit, truncating the first that does not"""
+        kept, used = [], 0
+        for item in items:
+            tokens = self.counter.count(item)
+            if used + tokens <= budget:
+                kept.append(item)
+                used += tokens
+                continue
+            prompt_truncations.labels(section=section).inc()
+            remaining = budget - used
+            if remaining >= self.min_section_tokens:
+                item = self.counter.truncate(item, remaining)
+                kept.append(item)
+                used += self.counter.count(item)
+            break
+        return kept, used
+
+    def build(self, message: str, context: Dict[str, Any], retrieved_docs: List[str],
+              intent: str = "other") -> Tuple[str, int]:
+        """Return the prompt and its size in tokens"""
+        user_profile = context.get('user_profile', {})
+        conversation = context.get('conversation_history', {}).get('messages', [])
+
+        if self.counter.count(message) > self.max_message_tokens:
+            prompt_truncations.labels(section="message").inc()
+            message = self.counter.truncate(message, self.max_message_tokens)
+
+        profile = PROFILE_TEMPLATE.format(
+            name=user_profile.get('name', 'Customer'),
+            tier=user_profile.get('tier', 'standard')
+        )
+        closing = MESSAGE_TEMPLATE.format(message=message)
+        fixed_tokens = self.prefix_tokens + self.counter.count(profile) + self.counter.count(closing)
+        available = max(0, self.input_budget - fixed_tokens)
+
+        docs = [f"{doc}\n" for doc in retrieved_docs]
+        turns = [
+            TURN_TEMPLATE.format(message=msg.get('message', ''), response=msg.get('response', ''))
+            for msg in conversation[-self.max_history_turns:]
+        ] if self.max_history_turns > 0 else []
+
+        knowledge_budget = int(available * self.knowledge_share) - self._header_tokens["knowledge"]
+        kept_docs, docs_used = self._fit(docs, knowledge_budget, "knowledge")
+        if docs_used:
+            available -= docs_used + self._header_tokens["knowledge"]
+
+        # Newest turns are the most useful, so they are kept first
+        history_budget = available - self._header_tokens["conversation"]
+        kept_turns, turns_used = self._fit(list(reversed(turns)), history_budget, "conversation")
+        kept_turns.reverse()
+        if turns_used:
+            available -= turns_used + self._header_tokens["conversation"]
+
+        # Space history did not need goes to the documents that were cut
+        if len(kept_docs) < len(docs) and available > self.min_section_tokens:
+            extra_budget = available - (0 if kept_docs else self._header_tokens["knowledge"])
+            extra, _ = self._fit(docs[len(kept_docs):], extra_budget, "knowledge")
+            kept_docs.extend(extra)
+
+        sections = [STATIC_PREFIX, profile]
+        if kept_docs:
+            sections.append(KNOWLEDGE_HEADER + "".join(kept_docs) + "\n")
+        if kept_turns:
+            sections.append(CONVERSATION_HEADER + "".join(kept_turns) + "\n")
+        sections.append(closing)
+
+        prompt = "".join(sections)
+        total = self.counter.count(prompt)
+        prompt_tokens.labels(intent=intent).observe(total)
+        return prompt, total
@@ -0,0 +1,277 @@
+# ============================================================================
+# LLM PROVIDER ROUTING, FAILOVER AND HEDGING (llm/provider_router.py)
+# ============================================================================
+# Routes each completion across the configured LLM backends:
+#   - latency-aware selection: the preferred provider is skipped while it is
+#     markedly slower than another healthy one
+#   - failover: errors and timeouts move the request to the next provider,
+#     and a per-provider circuit breaker keeps failing ones out of rotation
+#   - hedging (optional): if the chosen provider has not answered (or, when
+#     streaming, produced a first token) within its recent p95 latency, a
+#     backup request is raced against it and the first to respond wins
+import asyncio
+import time
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+from prometheus_client import Counter, Histogram
+from utils.circuit_breaker import CircuitBreaker
+
+provider_requests = Counter(
+    'llm_provider_requests_total',
+    'Provider attempts by outcome (success, error, timeout)',
+    ['provider', 'outcome']
+)
+provider_latency = Histogram(
+    'llm_provider_latency_seconds',
+    'Completion latency (invoke) or time to first token (stream) per provider',
+    ['provider', 'mode'],
+    buckets=(0.1, 0.25, 0.5, 1, 2, 3, 5, 8, 13, 21, 30)
+)
+provider_failovers = Counter(
+    'llm_provider_failovers_total',
+    'Requests moved to another provider after a failure',
+    ['from_provider']
+)
+provider_stream_errors = Counter(
+    'llm_provider_stream_errors_total',
+    'Streams that failed after their first token (already counted as a success)',
+    ['provider']
+)
+provider_hedges = Counter(
+    'llm_provider_hedges_total',
+    'Hedged requests by which attempt won (primary, backup, none)',
+    ['winner']
+)
+
+
+class NoProviderAvailable(Exception):
+    pass
+
+
+class ProviderStats:
+    def __init__(self, breaker: CircuitBreaker, window: int, smoothing: float):
+        self.breaker = breaker
+        self.smoothing = smoothing
+        self.window = window
+        self.samples: Dict[str, Deque[float]] = {}
+        self.ewma: Dict[str, float] = {}
+
+    def observe(self, mode: str, seconds: float):
+        self.samples.setdefault(mode, deque(maxlen=self.window)).append(seconds)
+        previous = self.ewma.get(mode)
+        self.ewma[mode] = seconds if previous is None else previous + self.smoothing * (seconds - previous)
+
+    def percentile(self, mode: str, q: float) -> Optional[float]:
+        samples = sorted(self.samples.get(mode, ()))
+        if not samples:
+            return None
+        return samples[min(len(samples) - 1, int(q * len(samples)))]
+
+
+class ProviderRouter:
+    """Completions over several providers with failover and optional hedging.
+
+    ``get_client(name)`` returns the initialized client for a provider and
+    ``providers()`` the provider names in order of preference; both are
+    called per request so configuration reloads take effect immediately.
+    """
+
+    def __init__(
+        self,
+        get_client: Callable[[str], Any],
+        providers: Callable[[], List[str]],
+        timeout: float = 30.0,
+        first_token_timeout: float = 10.0,
+        hedging: bool = False,
+        hedge_percentile: float = 0.95,
+        hedge_min_delay: float = 0.2,
+        hedge_max_delay: float = 5.0,
+        hedge_min_samples: int = 20,
+        latency_slack: float = 1.5,
+        breaker_failures: int = 5,
+        breaker_reset: int = 30,
+        window: int = 200,
+        smoothing: float = 0.2,
+    ):
+        self.get_client = get_client
+        self.providers = providers
+        self.timeout = timeout
+        self.first_token_timeout = first_token_timeout
+        self.hedging = hedging
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_delay = hedge_min_delay
+        self.hedge_max_delay = hedge_max_delay
+        self.hedge_min_samples = hedge_min_samples
+        self.latency_slack = latency_slack
+        self.breaker_failures = breaker_failures
+        self.breaker_reset = breaker_reset
+        self.window = window
+        self.smoothing = smoothing
+        self._stats: Dict[str, ProviderStats] = {}
+
+    def stats(self, provider: str) -> ProviderStats:
+        if provider not in self._stats:
+            breaker = CircuitBreaker(
+                failure_threshold=self.breaker_failures,
+                timeout=self.breaker_reset,
+                half_open_attempts=1
+            )
+            self._stats[provider] = ProviderStats(breaker, self.window, self.smoothing)
+        return self._stats[provider]
+
+    def candidates(self, mode: str) -> List[str]:
+        """Healthy providers, preferred ones first unless markedly slower"""
+        available = [p for p in self.providers() if self.stats(p).breaker.allow_request()]
+        known = [self.stats(p).ewma[mode] for p in available if mode in self.stats(p).ewma]
+        if not known:
+            return available
+        fast_enough = min(known) * self.latency_slack
+        preferred = [
+            p for p in available
+            if self.stats(p).ewma.get(mode, 0.0) <= fast_enough
+        ]
+        return preferred + [p for p in available if p not in preferred]
+
+    def hedge_delay(self, provider: str, mode: str) -> float:
+        stats = self.stats(provider)
+        if len(stats.samples.get(mode, ())) < self.hedge_min_samples:
+            return self.hedge_max_delay
+        delay = stats.percentile(mode, self.hedge_percentile)
+        return min(self.hedge_max_delay, max(self.hedge_min_delay, delay))
+
+    def _record(self, provider: str, mode: str, outcome: str, seconds: Optional[float] = None):
+        stats = self.stats(provider)
+        provider_requests.labels(provider=provider, outcome=outcome).inc()
+        if outcome == "success":
+            stats.breaker.record_success()
+            stats.observe(mode, seconds)
+            provider_latency.labels(provider=provider, mode=mode).observe(seconds)
+        else:
+            stats.breaker.record_failure()
+
+    async def _invoke(self, provider: str, prompt: Any) -> Any:
+        started = time.monotonic()
+        try:
+            result = await asyncio.wait_for(self.get_client(provider).ainvoke(prompt), self.timeout)
+        except asyncio.TimeoutError:
+            self._record(provider, "invoke", "timeout")
+            raise
+        except asyncio.CancelledError:
+            # Lost a hedge race; says nothing about the provider's health
+            raise
+        except Exception:
+            self._record(provider, "invoke", "error")
+            raise
+        self._record(provider, "invoke", "success", time.monotonic() - started)
+        return result
+
+    async def _open_stream(self, provider: str, prompt: Any) -> Tuple[AsyncIterator, Any]:
+        """Start streaming and wait for the first chunk"""
+        started = time.monotonic()
+        stream = self.get_client(provider).astream(prompt).__aiter__()
+        try:
+            first = await asyncio.wait_for(stream.__anext__(), self.first_token_timeout)
+        except StopAsyncIteration:
+            first = None
+        except asyncio.TimeoutError:
+            await stream.aclose()
+            self._record(provider, "stream", "timeout")
+            raise
+        except asyncio.CancelledError:
+            await stream.aclose()
+            raise
+        except Exception:
+            self._record(provider, "stream", "error")
+            raise
+        self._record(provider, "stream", "success", time.monotonic() - started)
+        return stream, first
+
+    async def _race(
+        self,
+        mode: str,
+        attempt: Callable[[str], Awaitable[Any]],
+        discard: Optional[Callable[[Any], Awaitable[None]]] = None,
+    ) -> Tuple[Any, str]:
+        """Run attempts in candidate order, failing over and hedging as configured"""
+        queue = self.candidates(mode)
+        if not queue:
+            raise NoProviderAvailable("Every LLM provider's circuit is open")
+
+        pending: Dict[asyncio.Task, str] = {}
+        primary = queue[0]
+        hedged = False
+        last_error: Optional[BaseException] = None
+
+        def launch():
+            provider = queue.pop(0)
+            pending[asyncio.ensure_future(attempt(provider))] = provider
+
+        launch()
+        try:
+            while pending:
+                delay = None
+                if self.hedging and not hedged and queue and len(pending) == 1:
+                    delay = self.hedge_delay(next(iter(pending.values())), mode)
+                done, _ = await asyncio.wait(pending, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+
+                if not done:
+                    hedged = True
+                    launch()
+                    continue
+
+                winner = None
+                for task in done:
+                    provider = pending.pop(task)
+                    if task.exception() is not None:
+                        last_error = task.exception()
+                        failed = provider
+                    elif winner is None:
+                        winner = (task.result(), provider)
+                    elif discard is not None:
+                        # Both hedged attempts answered at once; release the loser
+                        await discard(task.result())
+
+                if winner is not None:
+                    if hedged:
+                        provider_hedges.labels(winner="primary" if winner[1] == primary else "backup").inc()
+                    return winner
+                if queue and not pending:
+                    provider_failovers.labels(from_provider=failed).inc()
+                    launch()
+        finally:
+            for task in pending:
+                task.cancel()
+
+        if hedged:
+            provider_hedges.labels(winner="none").inc()
+        raise NoProviderAvailable(f"All LLM providers failed: {last_error}") from last_error
+
+    async def ainvoke(self, prompt: Any) -> Tuple[Any, str]:
+        """Return the completion and the provider that produced it"""
+        return await self._race("invoke", lambda provider: self._invoke(provider, prompt))
+
+    async def astream(self, prompt: Any) -> AsyncIterator[Any]:
+        """Yield chunks from the first provider to produce a token.
+
+        Failover and hedging only apply before the first token; an error
+        after that is raised to the caller. The attempt was counted as a
+        success at the first token, so such an error is only tallied in
+        ``llm_provider_stream_errors_total`` and does not also count against
+        the provider's circuit breaker.
+        """
+        async def close(opened):
+            await opened[0].aclose()
+
+        (stream, first), provider = await self._race(
+            "stream", lambda provider: self._open_stream(provider, prompt), close
+        )
+        try:
+            if first is not None:
+                yield first
+            async for chunk in stream:
+                yield chunk
+        except Exception:
+            provider_stream_errors.labels(provider=provider).inc()
+            raise
+        finally:
+            await stream.aclose()
@@ -0,0 +1,111 @@
+# ============================================================================
+# RETRIEVAL RESULT CACHE (llm/retrieval_cache.py)
+# ============================================================================
+# Serves repeated queries without a round trip to knowledge-ingestion (which
+# re-embeds the query and searches FAISS every time). Entries are tied to the
+# knowledge base version they were retrieved under and dropped as soon as a
+# newer version is seen, via search responses or the ingestion webhook.
+import re
+import threading
+import time
+import unicodedata
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+from prometheus_client import Counter, Gauge
+
+retrieval_cache_requests = Counter(
+    'llm_retrieval_cache_requests_total',
+    'Retrieval cache lookups by outcome (hit, miss)',
+    ['outcome']
+)
+retrieval_cache_saved_seconds = Counter(
+    'llm_retrieval_cache_saved_seconds_total',
+    'Estimated retrieval latency avoided by cache hits (average miss latency per hit)'
+)
+retrieval_cache_invalidations = Counter(
+    'llm_retrieval_cache_invalidations_total',
+    'Times the retrieval cache was emptied because the knowledge base changed'
+)
+retrieval_cache_entries = Gauge(
+    'llm_retrieval_cache_entries',
+    'Queries currently held by the retrieval cache'
+)
+
+_WHITESPACE = re.compile(r'\s+')
+_TRAILING_PUNCTUATION = re.compile(r'[\s?!.,;:]+$')
+
+
+def normalize_query(query: str) -> str:
+    """Fold case, width and spacing so trivially different queries share an entry"""
+    query = unicodedata.normalize("NFKC", query).casefold()
+    query = _WHITESPACE.sub(" ", query).strip()
+    return _TRAILING_PUNCTUATION.sub("", query)
+
+
+class RetrievalCache:
+    """LRU of search results with a TTL, scoped to one knowledge base version"""
+
+    def __init__(self, max_entries: int = 10000, ttl: float = 300.0, latency_smoothing: float = 0.1):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.latency_smoothing = latency_smoothing
+        self.kb_version: Optional[int] = None
+        self.average_fetch_seconds = 0.0
+        self._entries: "OrderedDict[Tuple[str, int], Tuple[List[str], int, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _observe_version(self, kb_version: int) -> bool:
+        if self.kb_version is not None and kb_version < self.kb_version:
+            return False
+        if kb_version != self.kb_version:
+            if self._entries:
+                self._entries.clear()
+                retrieval_cache_invalidations.inc()
+                retrieval_cache_entries.set(0)
+            self.kb_version = kb_version
+        return True
+
+    def observe_version(self, kb_version: int) -> bool:
+        """Record a knowledge base version; returns False if it is older than one already seen"""
+        with self._lock:
+            return self._observe_version(kb_version)
+
+    def get(self, query: str, k: int) -> Optional[Tuple[List[str], int]]:
+        key = (normalize_query(query), k)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[2] <= time.monotonic():
+                del self._entries[key]
+                retrieval_cache_entries.set(len(self._entries))
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(key)
+
+        if entry is None:
+            retrieval_cache_requests.labels(outcome="miss").inc()
+            return None
+        retrieval_cache_requests.labels(outcome="hit").inc()
+        retrieval_cache_saved_seconds.inc(self.average_fetch_seconds)
+        docs, kb_version, _ = entry
+        return list(docs), kb_version
+
+    def put(self, query: str, k: int, docs: List[str], kb_version: int, fetch_seconds: Optional[float] = None):
+        if fetch_seconds is not None:
+            if self.average_fetch_seconds == 0.0:
+                self.average_fetch_seconds = fetch_seconds
+            else:
+                self.average_fetch_seconds += self.latency_smoothing * (fetch_seconds - self.average_fetch_seconds)
+
+        key = (normalize_query(query), k)
+        with self._lock:
+            # Results retrieved under an older version than one already seen are stale
+            if not self._observe_version(kb_version):
+                return
+            self._entries[key] = (list(docs), kb_version, time.monotonic() + self.ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            retrieval_cache_entries.set(len(self._entries))
@@ -0,0 +1,152 @@
+# ============================================================================
+# LOCAL RETRIEVAL SNAPSHOT (llm/retrieval_snapshot.py)
+# ============================================================================
+# Fallback for when knowledge-ingestion is slow or down: the most-retrieved
+# documents and their embeddings are periodically written to disk and served
+# from a memory-mapped matrix, so replicas share the pages and a restart does
+# not need the ingestion service to answer from it.
+import glob
+import json
+import os
+import threading
+import uuid
+from collections import Counter as TallyCounter
+from typing import Any, Callable, List, Optional, Tuple
+import numpy as np
+from prometheus_client import Counter, Gauge
+
+retrieval_requests = Counter(
+    'llm_retrieval_requests_total',
+    'Context retrievals by the source that served them (primary, fallback)',
+    ['source']
+)
+retrieval_fallbacks = Counter(
+    'llm_retrieval_fallback_total',
+    'Retrievals served from the local snapshot, by why the primary was skipped',
+    ['reason']
+)
+snapshot_documents = Gauge(
+    'llm_retrieval_snapshot_documents',
+    'Documents held in the local retrieval snapshot'
+)
+
+
+class RetrievalSnapshot:
+    """Top-N most retrieved documents, searchable without knowledge-ingestion.
+
+    ``record()`` tallies the documents returned by live searches. ``sync()``
+    embeds the ``max_documents`` most frequent ones and writes them as a new
+    generation, ``<directory>/snapshot-<generation>.npy`` (embeddings) and
+    ``.json`` (texts), then atomically points ``manifest.json`` at it. The
+    manifest is the only file replaced in place, so a reader in any process
+    always opens a matching pair; the matrix is opened with
+    ``mmap_mode='r'``.
+    """
+
+    def __init__(self, directory: str, embed_fn: Callable[[List[str]], Any], max_documents: int = 500):
+        self.directory = directory
+        self.embed_fn = embed_fn
+        self.max_documents = max_documents
+        self._tally: TallyCounter = TallyCounter()
+        self._tally_lock = threading.Lock()
+        self._sync_lock = threading.Lock()
+        # (documents, matrix), replaced as one so a search never mixes snapshots
+        self._snapshot: Optional[Tuple[List[str], np.ndarray]] = None
+        self.load()
+
+    @property
+    def manifest_path(self) -> str:
+        return os.path.join(self.directory, "manifest.json")
+
+    def _paths(self, generation: str) -> Tuple[str, str]:
+        base = os.path.join(self.directory, f"snapshot-{generation}")
+        return f"{base}.json", f"{base}.npy"
+
+    def _current_generation(self) -> Optional[str]:
+        try:
+            with open(self.manifest_path, encoding="utf-8") as f:
+                return json.load(f)["generation"]
+        except (FileNotFoundError, ValueError, KeyError):
+            return None
+
+    def __len__(self) -> int:
+        return len(self._snapshot[0]) if self._snapshot else 0
+
+    def load(self) -> bool:
+        """Open the snapshot generation the manifest points at, if there is one"""
+        generation = self._current_generation()
+        if generation is None:
+            return False
+        documents_path, matrix_path = self._paths(generation)
+        try:
+            with open(documents_path, encoding="utf-8") as f:
+                documents = json.load(f)
+            matrix = np.load(matrix_path, mmap_mode='r')
+        except FileNotFoundError:
+            # Superseded and cleaned up by another writer since the manifest was read
+            return False
+        self._snapshot = (documents, matrix)
+        snapshot_documents.set(len(documents))
+        return True
+
+    def record(self, documents: List[str]):
+        with self._tally_lock:
+            self._tally.update(documents)
+            # Keep the tally bounded; rarely retrieved documents fall out first
+            if len(self._tally) > self.max_documents * 10:
+                self._tally = TallyCounter(dict(self._tally.most_common(self.max_documents * 5)))
+
+    def _write_atomically(self, path: str, write: Callable[[Any], None], mode: str):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, mode) as f:
+            write(f)
+        os.replace(tmp_path, path)
+
+    def sync(self) -> int:
+        """Embed the most retrieved documents and publish them as the new snapshot"""
+        with self._sync_lock:
+            with self._tally_lock:
+                top = [doc for doc, _ in self._tally.most_common(self.max_documents)]
+            if not top:
+                return len(self)
+
+            embeddings = np.asarray(self.embed_fn(top), dtype='float32')
+            norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+            embeddings = embeddings / np.where(norms == 0, 1, norms)
+
+            os.makedirs(self.directory, exist_ok=True)
+            previous = self._current_generation()
+            generation = uuid.uuid4().hex
+            documents_path, matrix_path = self._paths(generation)
+            self._write_atomically(matrix_path, lambda f: np.save(f, embeddings), "wb")
+            self._write_atomically(documents_path, lambda f: f.write(json.dumps(top)), "w")
+            # Publishing the new generation is this one replace
+            self._write_atomically(
+                self.manifest_path, lambda f: f.write(json.dumps({"generation": generation})), "w"
+            )
+            self.load()
+            self._remove_generations(keep={generation, previous})
+            return len(top)
+
+    def _remove_generations(self, keep):
+        """Delete older generations; the previous one stays for readers that just read the manifest"""
+        kept = {path for generation in keep if generation for path in self._paths(generation)}
+        for path in glob.glob(os.path.join(glob.escape(self.directory), "snapshot-*")):
+            if path not in kept:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def search(self, query: str, k: int = 3) -> List[str]:
+        snapshot = self._snapshot
+        if snapshot is None or not snapshot[0]:
+            return []
+        documents, matrix = snapshot
+        vector = np.asarray(self.embed_fn([query]), dtype='float32')[0]
+        norm = np.linalg.norm(vector)
+        if norm:
+            vector = vector / norm
+        scores = matrix @ vector
+        top = np.argsort(-scores)[:k]
+        return [documents[i] for i in top]
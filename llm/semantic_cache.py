@@ -0,0 +1,185 @@
+# ============================================================================
+# SEMANTIC RESPONSE CACHE (llm/semantic_cache.py)
+# ============================================================================
+# Answers near-duplicate questions ("What is your return policy?" / "whats
+# the return policy") from a previously validated response instead of a new
+# completion. Entries are scoped so a hit never crosses intents, customer
+# tiers or knowledge base versions.
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Any, Callable, Dict, Hashable, List, Optional, Tuple
+import numpy as np
+from prometheus_client import Counter, Gauge, Histogram
+
+cache_requests = Counter(
+    'llm_semantic_cache_requests_total',
+    'Semantic cache lookups by outcome (hit, miss)',
+    ['intent', 'outcome']
+)
+cache_evictions = Counter(
+    'llm_semantic_cache_evictions_total',
+    'Semantic cache entries dropped, by reason',
+    ['reason']
+)
+cache_entries = Gauge(
+    'llm_semantic_cache_entries',
+    'Responses currently held by the semantic cache'
+)
+cache_similarity = Histogram(
+    'llm_semantic_cache_best_similarity',
+    'Cosine similarity of the closest cached query at lookup time',
+    buckets=(0.5, 0.7, 0.8, 0.85, 0.9, 0.92, 0.94, 0.96, 0.98, 1.0)
+)
+
+Scope = Tuple[Hashable, ...]
+
+
+class _ScopeIndex:
+    """Normalized query embeddings of one scope, searched by inner product"""
+
+    def __init__(self):
+        self.ids: List[int] = []
+        self._matrix: Optional[np.ndarray] = None
+        self._vectors: Dict[int, np.ndarray] = {}
+
+    def add(self, entry_id: int, vector: np.ndarray):
+        self.ids.append(entry_id)
+        self._vectors[entry_id] = vector
+        self._matrix = None
+
+    def remove(self, entry_id: int):
+        if self._vectors.pop(entry_id, None) is not None:
+            self.ids.remove(entry_id)
+            self._matrix = None
+
+    def nearest(self, vector: np.ndarray) -> Tuple[Optional[int], float]:
+        if not self.ids:
+            return None, 0.0
+        if self._matrix is None:
+            self._matrix = np.stack([self._vectors[i] for i in self.ids])
+        scores = self._matrix @ vector
+        best = int(np.argmax(scores))
+        return self.ids[best], float(scores[best])
+
+
+class SemanticCache:
+    """Size-bounded, TTL-limited cache of validated responses keyed by meaning.
+
+    ``embed_fn`` maps a list of texts to an array of embeddings (e.g.
+    ``SentenceTransformer.encode``). Lookups compare the cosine similarity of
+    the new message against prior messages in the same scope and hit when it
+    reaches ``threshold``. Expired entries are purged on every lookup and
+    insert, and the least recently used entry is evicted once
+    ``max_entries`` is reached. Entries for an older knowledge base version
+    are dropped as soon as a newer version is seen.
+    """
+
+    def __init__(
+        self,
+        embed_fn: Callable[[List[str]], Any],
+        threshold: float = 0.92,
+        ttl: float = 3600.0,
+        max_entries: int = 5000,
+    ):
+        self.embed_fn = embed_fn
+        self.threshold = threshold
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+        self._entries: "OrderedDict[int, Tuple[Scope, Dict[str, Any], float]]" = OrderedDict()
+        self._scopes: Dict[Scope, _ScopeIndex] = {}
+        # (expires_at, entry_id) in insertion order, which with a fixed TTL
+        # is also expiry order
+        self._expiries: "deque[Tuple[float, int]]" = deque()
+        self._kb_version: Optional[int] = None
+        self._next_id = 0
+        self._lock = threading.Lock()
+
+    def embed(self, message: str) -> np.ndarray:
+        vector = np.asarray(self.embed_fn([message]), dtype='float32')[0]
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _drop(self, entry_id: int, reason: str):
+        scope, _, _ = self._entries.pop(entry_id)
+        index = self._scopes[scope]
+        index.remove(entry_id)
+        if not index.ids:
+            del self._scopes[scope]
+        cache_evictions.labels(reason=reason).inc()
+
+    def _purge_expired(self):
+        now = time.monotonic()
+        while self._expiries and self._expiries[0][0] <= now:
+            _, entry_id = self._expiries.popleft()
+            # Entries evicted for size or version are already gone
+            if entry_id in self._entries:
+                self._drop(entry_id, "expired")
+        cache_entries.set(len(self._entries))
+
+    def _is_current(self, kb_version: int) -> bool:
+        """Track the newest knowledge base version; False for an older one"""
+        if self._kb_version is not None and kb_version < self._kb_version:
+            return False
+        if kb_version != self._kb_version:
+            # Any answer built on an older knowledge base may now be wrong
+            self._kb_version = kb_version
+            for entry_id, (scope, _, _) in list(self._entries.items()):
+                if scope[0] != kb_version:
+                    self._drop(entry_id, "kb_version")
+            cache_entries.set(len(self._entries))
+        return True
+
+    def get(self, vector: np.ndarray, intent: str, kb_version: int, *scope: Hashable) -> Optional[Dict[str, Any]]:
+        key = (kb_version, intent, *scope)
+        with self._lock:
+            self._purge_expired()
+            index = self._scopes.get(key) if self._is_current(kb_version) else None
+            entry_id, similarity = index.nearest(vector) if index else (None, 0.0)
+            if entry_id is not None:
+                cache_similarity.observe(similarity)
+
+            response = None
+            if entry_id is not None and similarity >= self.threshold:
+                _, response, _ = self._entries[entry_id]
+                self._entries.move_to_end(entry_id)
+
+        cache_requests.labels(intent=intent, outcome="hit" if response else "miss").inc()
+        return dict(response) if response else None
+
+    def put(self, vector: np.ndarray, intent: str, kb_version: int, response: Dict[str, Any], *scope: Hashable):
+        key = (kb_version, intent, *scope)
+        with self._lock:
+            self._purge_expired()
+            if not self._is_current(kb_version):
+                return
+
+            entry_id = self._next_id
+            self._next_id += 1
+            expires_at = time.monotonic() + self.ttl
+            self._entries[entry_id] = (key, dict(response), expires_at)
+            self._expiries.append((expires_at, entry_id))
+            self._scopes.setdefault(key, _ScopeIndex()).add(entry_id, vector)
+
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)), "size")
+            if len(self._expiries) > 2 * self.max_entries:
+                # Mostly entries already evicted for size; keep the queue bounded too
+                self._expiries = deque(item for item in self._expiries if item[1] in self._entries)
+            cache_entries.set(len(self._entries))
+
+    def invalidate(self, kb_version: int):
+        """Drop entries built on knowledge base versions older than ``kb_version``"""
+        with self._lock:
+            self._is_current(kb_version)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._scopes.clear()
+            self._expiries.clear()
+            cache_entries.set(0)
+
+    def __len__(self) -> int:
+        return len(self._entries)
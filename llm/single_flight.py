@@ -0,0 +1,55 @@
+# ============================================================================
+# REQUEST COALESCING (llm/single_flight.py)
+# ============================================================================
+# When many users ask the same thing at once (e.g. during a shipping delay),
+# only the first request (the leader) calls the provider; identical requests
+# arriving while it is in flight wait for the leader's result.
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable, Tuple
+from prometheus_client import Counter, Gauge
+
+single_flight_requests = Counter(
+    'llm_single_flight_requests_total',
+    'Generations by role: leader (called the provider) or follower (coalesced)',
+    ['role']
+)
+single_flight_inflight = Gauge(
+    'llm_single_flight_inflight',
+    'Distinct generations currently in flight'
+)
+
+
+class SingleFlight:
+    """Deduplicates concurrent calls with the same key.
+
+    The shared call runs as its own task, so a leader whose client goes
+    away does not cancel the work its followers are waiting on.
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+
+    def __len__(self) -> int:
+        return len(self._inflight)
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Return ``fn()``'s result and whether it was shared from another caller"""
+        task = self._inflight.get(key)
+        shared = task is not None
+        if shared:
+            single_flight_requests.labels(role="follower").inc()
+        else:
+            single_flight_requests.labels(role="leader").inc()
+            task = asyncio.ensure_future(fn())
+            self._inflight[key] = task
+            single_flight_inflight.set(len(self._inflight))
+            task.add_done_callback(lambda _: self._forget(key, task))
+        return await asyncio.shield(task), shared
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        single_flight_inflight.set(len(self._inflight))
+        # Mark a failure as retrieved if every caller has gone away
+        if not task.cancelled():
+            task.exception()
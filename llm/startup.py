@@ -0,0 +1,79 @@
+# ============================================================================
+# STARTUP TIMING AND LAZY RESOURCES (llm/startup.py)
+# ============================================================================
+# Heavy models and indexes are wrapped in LazyResource so they load only when
+# a feature that needs them is enabled. Imports and loads are timed into a
+# StartupReport, logged once startup completes and served at /startup.
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Generic, List, Optional, TypeVar
+from prometheus_client import Gauge
+
+startup_phase_seconds = Gauge(
+    'llm_startup_phase_seconds',
+    'Time spent in each startup phase (imports, model loads)',
+    ['phase']
+)
+
+T = TypeVar("T")
+
+
+class StartupReport:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.phases: List[Dict[str, Any]] = []
+        self.ready_after: Optional[float] = None
+
+    @contextmanager
+    def phase(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - started
+            self.phases.append({"phase": name, "seconds": round(seconds, 4)})
+            startup_phase_seconds.labels(phase=name).set(seconds)
+
+    def mark_ready(self):
+        self.ready_after = time.perf_counter() - self.started
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "ready_after_seconds": round(self.ready_after, 4) if self.ready_after is not None else None,
+            "phases": list(self.phases)
+        }
+
+    def format(self) -> str:
+        lines = [f"{p['phase']:<40} {p['seconds']:>8.3f}s" for p in self.phases]
+        if self.ready_after is not None:
+            lines.append(f"{'ready after':<40} {self.ready_after:>8.3f}s")
+        return "\n".join(lines)
+
+
+class LazyResource(Generic[T]):
+    """Build an expensive object on first use, once, and time the load"""
+
+    def __init__(self, name: str, loader: Callable[[], T], report: Optional[StartupReport] = None):
+        self.name = name
+        self.loader = loader
+        self.report = report
+        self._value: Optional[T] = None
+        self._loaded = False
+        self._lock = threading.Lock()
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def get(self) -> T:
+        if not self._loaded:
+            with self._lock:
+                if not self._loaded:
+                    if self.report is not None:
+                        with self.report.phase(f"load {self.name}"):
+                            self._value = self.loader()
+                    else:
+                        self._value = self.loader()
+                    self._loaded = True
+        return self._value
@@ -0,0 +1,69 @@
+# ============================================================================
+# CIRCUIT BREAKER (utils/circuit_breaker.py)
+# ============================================================================
+from enum import Enum
+from datetime import datetime, timedelta
+import asyncio
+
+class CircuitState(Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+class CircuitOpenError(Exception):
+    pass
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int = 5, timeout: int = 60, half_open_attempts: int = 3):
+        self.failure_threshold = failure_threshold
+        self.timeout = timeout
+        self.half_open_attempts = half_open_attempts
+        self.failure_count = 0
+        self.last_failure_time = None
+        self.state = CircuitState.CLOSED
+        self.half_open_success_count = 0
+    
+    def allow_request(self) -> bool:
+        """False while open; moves to half-open once the reset timeout has passed"""
+        if self.state == CircuitState.OPEN:
+            if datetime.now() - self.last_failure_time > timedelta(seconds=self.timeout):
+                self.state = CircuitState.HALF_OPEN
+                self.half_open_success_count = 0
+            else:
+                return False
+        return True
+    
+    async def call(self, func, *args, **kwargs):
+        if not self.allow_request():
+            raise CircuitOpenError("Circuit breaker is OPEN")
+        
+        try:
+            result = await func(*args, **kwargs)
+            self._on_success()
+            return result
+        except Exception as e:
+            self._on_failure()
+            raise
+    
+    # For calls that cannot be wrapped by call(), e.g. streamed responses
+    def record_success(self):
+        self._on_success()
+    
+    def record_failure(self):
+        self._on_failure()
+    
+    def _on_success(self):
+        if self.state == CircuitState.HALF_OPEN:
+            self.half_open_success_count += 1
+            if self.half_open_success_count >= self.half_open_attempts:
+                self.state = CircuitState.CLOSED
+                self.failure_count = 0
+        else:
+            self.failure_count = 0
+    
+    def _on_failure(self):
+        self.failure_count += 1
+        self.last_failure_time = datetime.now()
+        
+        if self.failure_count >= self.failure_threshold:
+            self.state = CircuitState.OPEN
@@ -1,45 +1,446 @@
 # ============================================================================
 # RATE LIMITING MIDDLEWARE (middleware/rate_limiter.py)
 # ============================================================================
-from fastapi import Request, HTTPException
-from starlette.middleware.base import BaseHTTPMiddleware
-import redis
+import asyncio
+import math
 import time
+import uuid
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, NamedTuple, Optional, Tuple
+from prometheus_client import Counter, Gauge
+import redis.asyncio as redis
 
-class RateLimitMiddleware(BaseHTTPMiddleware):
-    def __init__(self, app, redis_client: redis.Redis, max_requests: int = 100, window: int = 60):
-        super().__init__(app)
+SLIDING_WINDOW_LOG = "sliding_log"
+SLIDING_WINDOW_COUNTER = "sliding_counter"
+TOKEN_BUCKET = "token_bucket"
+
+rate_limit_decisions = Counter(
+    'rate_limit_decisions_total',
+    'Rate limit decisions by outcome',
+    ['algorithm', 'outcome']
+)
+
+rate_limit_leases = Counter(
+    'rate_limit_leases_total',
+    'Token leases requested from Redis by the local quota tier',
+    ['mode', 'outcome']
+)
+
+rate_limit_leased_tokens = Counter(
+    'rate_limit_leased_tokens_total',
+    'Tokens granted to the local quota tier by Redis'
+)
+
+rate_limit_expired_tokens = Counter(
+    'rate_limit_expired_tokens_total',
+    'Leased tokens discarded unused when their lease expired'
+)
+
+rate_limit_over_admits = Counter(
+    'rate_limit_over_admits_total',
+    'Requests admitted locally ahead of a refill, repaid from the next lease'
+)
+
+rate_limit_local_keys = Gauge(
+    'rate_limit_local_keys',
+    'Keys holding a leased quota slice in this process'
+)
+
+# Every script reads the clock from Redis (TIME) so all replicas agree on "now",
+# and returns {allowed, remaining, retry_after_ms}.
+
+# Exact: one sorted-set member per admitted request inside the window
+SLIDING_WINDOW_LOG_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+
+redis.call('ZREMRANGEBYSCORE', KEYS[1], 0, now - window)
+local count = redis.call('ZCARD', KEYS[1])
+if count < limit then
+    redis.call('ZADD', KEYS[1], now, now .. '-' .. ARGV[3])
+    redis.call('PEXPIRE', KEYS[1], window)
+    return {1, limit - count - 1, 0}
+end
+
+local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+return {0, 0, tonumber(oldest[2]) + window - now}
+"""
+
+# Approximate: current fixed window plus the previous one weighted by overlap
+SLIDING_WINDOW_COUNTER_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+
+local current_window = math.floor(now / window)
+local current_key = KEYS[1] .. ':' .. current_window
+local previous_key = KEYS[1] .. ':' .. (current_window - 1)
+local current = tonumber(redis.call('GET', current_key) or '0')
+local previous = tonumber(redis.call('GET', previous_key) or '0')
+
+local elapsed = now - current_window * window
+local estimated = previous * ((window - elapsed) / window) + current
+if estimated + 1 > limit then
+    -- Full for this window: wait for the next one. Otherwise wait until the
+    -- previous window's weight has decayed enough to fit one more request
+    local retry_after = window - elapsed
+    if current + 1 <= limit then
+        retry_after = math.ceil(window - elapsed - (limit - current - 1) * window / previous)
+    end
+    return {0, 0, math.max(1, retry_after)}
+end
+
+redis.call('INCR', current_key)
+redis.call('PEXPIRE', current_key, window * 2)
+return {1, math.floor(limit - estimated - 1), 0}
+"""
+
+# Bursty: bucket of `limit` tokens refilled continuously over the window
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local rate = capacity / window
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+
+local allowed = 0
+local retry_after = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    retry_after = math.ceil((cost - tokens) / rate)
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], window)
+return {allowed, math.floor(tokens), retry_after}
+"""
+
+# Two-tier mode: take up to ARGV[3] tokens from the bucket in one go
+TOKEN_LEASE_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local window = tonumber(ARGV[2])
+local requested = tonumber(ARGV[3])
+local rate = capacity / window
+local t = redis.call('TIME')
+local now = tonumber(t[1]) * 1000 + math.floor(tonumber(t[2]) / 1000)
+
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+
+local granted = math.min(requested, math.floor(tokens))
+tokens = tokens - granted
+local retry_after = 0
+if granted == 0 then
+    retry_after = math.ceil((1 - tokens) / rate)
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], window)
+return {granted, math.floor(tokens), retry_after}
+"""
+
+SCRIPTS = {
+    SLIDING_WINDOW_LOG: SLIDING_WINDOW_LOG_SCRIPT,
+    SLIDING_WINDOW_COUNTER: SLIDING_WINDOW_COUNTER_SCRIPT,
+    TOKEN_BUCKET: TOKEN_BUCKET_SCRIPT,
+}
+
+
+class RateLimitResult(NamedTuple):
+    allowed: bool
+    limit: int
+    remaining: int
+    retry_after: float  # seconds until a request would be admitted
+
+
+class LocalRejectCache:
+    """Remembers clients Redis has rejected until their retry time.
+
+    Repeat requests from a client that is known to be over its limit are
+    rejected in-process, so a hammering client costs no Redis round trips.
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self._blocked_until: Dict[str, float] = {}
+
+    def retry_after(self, key: str) -> float:
+        until = self._blocked_until.get(key)
+        if until is None:
+            return 0.0
+        remaining = until - time.monotonic()
+        if remaining <= 0:
+            del self._blocked_until[key]
+            return 0.0
+        return remaining
+
+    def block(self, key: str, seconds: float):
+        if seconds <= 0:
+            return
+        if len(self._blocked_until) >= self.max_entries:
+            self._purge()
+        self._blocked_until[key] = time.monotonic() + seconds
+
+    def _purge(self):
+        now = time.monotonic()
+        self._blocked_until = {k: v for k, v in self._blocked_until.items() if v > now}
+        # Still full of live entries: drop the ones expiring soonest
+        overflow = len(self._blocked_until) - self.max_entries // 2
+        if overflow > 0:
+            for key in sorted(self._blocked_until, key=self._blocked_until.get)[:overflow]:
+                del self._blocked_until[key]
+
+
+class LocalQuota:
+    def __init__(self):
+        self.tokens = 0
+        self.debt = 0
+        self.remaining = 0
+        self.expires_at = 0.0
+        self.empty_until = 0.0
+        self.refill: Optional[asyncio.Task] = None
+
+
+# (key, tokens requested, limit, window) -> (granted, remaining in Redis, retry_after_ms)
+LeaseFunction = Callable[[str, int, int, float], Awaitable[Tuple[int, int, int]]]
+
+
+class TokenLeaseCache:
+    """Local tier holding a leased slice of each key's token bucket.
+
+    Requests are decided from the in-memory slice; Redis is only asked for
+    ``lease_size`` more tokens at a time, in the background once the slice
+    runs low. Accuracy across replicas is bounded:
+
+    * at most ``lease_size`` tokens per key are parked in a replica, and
+      unused ones are discarded after ``lease_ttl`` seconds (under-admission);
+    * while a refill is in flight up to ``max_over_admit`` requests per key
+      are admitted on credit and repaid from the next lease, so a replica can
+      exceed the global limit by at most ``max_over_admit`` (over-admission).
+    """
+
+    def __init__(
+        self,
+        lease_fn: LeaseFunction,
+        lease_size: int = 10,
+        lease_ttl: float = 1.0,
+        refill_threshold: float = 0.2,
+        max_over_admit: int = 0,
+        max_keys: int = 10000,
+    ):
+        self.lease_fn = lease_fn
+        self.lease_size = lease_size
+        self.lease_ttl = lease_ttl
+        self.refill_threshold = refill_threshold
+        self.max_over_admit = max_over_admit
+        self.max_keys = max_keys
+        self._quotas: "OrderedDict[str, LocalQuota]" = OrderedDict()
+
+    def _quota(self, key: str) -> LocalQuota:
+        quota = self._quotas.get(key)
+        if quota is None:
+            quota = self._quotas[key] = LocalQuota()
+            # Dropping a quota only strands its tokens (under-admission)
+            while len(self._quotas) > self.max_keys:
+                _, evicted = self._quotas.popitem(last=False)
+                if evicted.refill is not None:
+                    evicted.refill.cancel()
+            rate_limit_local_keys.set(len(self._quotas))
+        else:
+            self._quotas.move_to_end(key)
+        return quota
+
+    async def _refill(self, key: str, quota: LocalQuota, limit: int, window: float, mode: str):
+        requested = min(self.lease_size, limit) + quota.debt
+        try:
+            granted, remaining, retry_after_ms = await self.lease_fn(key, requested, limit, window)
+        except Exception:
+            rate_limit_leases.labels(mode=mode, outcome="error").inc()
+            raise
+
+        now = time.monotonic()
+        if quota.expires_at <= now and quota.tokens:
+            rate_limit_expired_tokens.inc(quota.tokens)
+            quota.tokens = 0
+
+        repaid = min(granted, quota.debt)
+        quota.debt -= repaid
+        quota.tokens += granted - repaid
+        quota.remaining = remaining
+        quota.expires_at = now + self.lease_ttl
+        if granted == 0:
+            quota.empty_until = now + retry_after_ms / 1000.0
+
+        rate_limit_leases.labels(mode=mode, outcome="granted" if granted else "empty").inc()
+        rate_limit_leased_tokens.inc(granted)
+
+    def _start_refill(self, key: str, quota: LocalQuota, limit: int, window: float, mode: str) -> asyncio.Task:
+        if quota.refill is None or quota.refill.done():
+            quota.refill = asyncio.create_task(self._refill(key, quota, limit, window, mode))
+            # A failed prefetch is surfaced to whoever next waits on a refill
+            quota.refill.add_done_callback(lambda task: task.cancelled() or task.exception())
+        return quota.refill
+
+    async def acquire(self, key: str, limit: int, window: float) -> RateLimitResult:
+        quota = self._quota(key)
+        now = time.monotonic()
+
+        if now < quota.empty_until:
+            return RateLimitResult(False, limit, 0, quota.empty_until - now)
+
+        if quota.tokens and quota.expires_at <= now:
+            rate_limit_expired_tokens.inc(quota.tokens)
+            quota.tokens = 0
+
+        if quota.tokens == 0:
+            refilling = quota.refill is not None and not quota.refill.done()
+            if refilling and quota.debt < self.max_over_admit:
+                quota.debt += 1
+                rate_limit_over_admits.inc()
+                return RateLimitResult(True, limit, quota.remaining, 0.0)
+
+            # Callers arriving together share one lease round trip
+            await asyncio.shield(self._start_refill(key, quota, limit, window, "blocking"))
+            if quota.tokens == 0:
+                return RateLimitResult(False, limit, 0, max(0.0, quota.empty_until - time.monotonic()))
+
+        quota.tokens -= 1
+        if quota.tokens <= self.lease_size * self.refill_threshold:
+            self._start_refill(key, quota, limit, window, "prefetch")
+        return RateLimitResult(True, limit, quota.remaining + quota.tokens, 0.0)
+
+
+class RateLimiter:
+    """Redis-backed rate limiter deciding each request in one round trip"""
+
+    def __init__(
+        self,
+        redis_client: redis.Redis,
+        algorithm: str = SLIDING_WINDOW_COUNTER,
+        limit: int = 100,
+        window: float = 60,
+        tier_limits: Optional[Dict[str, Tuple[int, float]]] = None,
+        local_precheck: bool = True,
+        key_prefix: str = "rate_limit",
+        fail_open: bool = True,
+        lease_size: int = 0,
+        lease_ttl: float = 1.0,
+        max_over_admit: int = 0,
+    ):
+        if algorithm not in SCRIPTS:
+            raise ValueError(f"Unsupported rate limit algorithm: {algorithm}")
+        if lease_size and algorithm != TOKEN_BUCKET:
+            raise ValueError("Leased local quotas require the token_bucket algorithm")
         self.redis = redis_client
-        self.max_requests = max_requests
-        self.window = window
-    
-    async def dispatch(self, request: Request, call_next):
-        # Extract user identifier
-        user_id = request.headers.get("X-User-ID", request.client.host)
-        key = f"rate_limit:{user_id}"
-        
-        # Get current count
-        pipe = self.redis.pipeline()
-        pipe.incr(key)
-        pipe.expire(key, self.window)
-        results = pipe.execute()
-        
-        current_count = results[0]
-        
-        # Check limit
-        if current_count > self.max_requests:
-            raise HTTPException(
-                status_code=429,
-                detail={
-                    "error": "Rate limit exceeded",
-                    "retry_after": self.window
-                }
+        self.algorithm = algorithm
+        self.default_limit = (limit, window)
+        self.tier_limits = tier_limits or {}
+        self.key_prefix = key_prefix
+        self.fail_open = fail_open
+        self.local = LocalRejectCache() if local_precheck else None
+        self._script = redis_client.register_script(SCRIPTS[algorithm])
+
+        # Optional two-tier mode: decide most requests from a leased local slice
+        self.leases = None
+        if lease_size:
+            self._lease_script = redis_client.register_script(TOKEN_LEASE_SCRIPT)
+            self.leases = TokenLeaseCache(
+                self._lease,
+                lease_size=lease_size,
+                lease_ttl=lease_ttl,
+                max_over_admit=max_over_admit
             )
-        
-        # Add rate limit headers
-        response = await call_next(request)
-        response.headers["X-RateLimit-Limit"] = str(self.max_requests)
-        response.headers["X-RateLimit-Remaining"] = str(max(0, self.max_requests - current_count))
-        response.headers["X-RateLimit-Reset"] = str(int(time.time()) + self.window)
-        
-        return response
+
+    async def _lease(self, key: str, requested: int, limit: int, window: float) -> Tuple[int, int, int]:
+        granted, remaining, retry_after_ms = await self._lease_script(
+            keys=[key], args=[limit, int(window * 1000), requested]
+        )
+        return int(granted), int(remaining), int(retry_after_ms)
+
+    def tier_of(self, tier: Optional[str]) -> str:
+        """Configured tier name; anything else shares the default bucket"""
+        return tier if tier in self.tier_limits else "default"
+
+    def limits_for(self, tier: Optional[str]) -> Tuple[int, float]:
+        return self.tier_limits.get(self.tier_of(tier), self.default_limit)
+
+    def key_for(self, identifier: str, tier: Optional[str] = None) -> str:
+        # Unknown tiers must not get a bucket of their own, or a caller could
+        # reset their limit by naming a new tier. The hash tag keeps the
+        # sliding counter's per-window keys on one cluster slot
+        return f"{self.key_prefix}:{self.algorithm}:{self.tier_of(tier)}:{{{identifier}}}"
+
+    async def hit(self, identifier: str, tier: Optional[str] = None) -> RateLimitResult:
+        limit, window = self.limits_for(tier)
+        key = self.key_for(identifier, tier)
+
+        if self.local is not None:
+            blocked_for = self.local.retry_after(key)
+            if blocked_for > 0:
+                rate_limit_decisions.labels(algorithm=self.algorithm, outcome="local_rejected").inc()
+                return RateLimitResult(False, limit, 0, blocked_for)
+
+        if self.leases is not None:
+            try:
+                result = await self.leases.acquire(key, limit, window)
+            except redis.RedisError:
+                rate_limit_decisions.labels(algorithm=self.algorithm, outcome="error").inc()
+                if not self.fail_open:
+                    raise
+                return RateLimitResult(True, limit, limit, 0.0)
+            rate_limit_decisions.labels(
+                algorithm=self.algorithm,
+                outcome="leased_allowed" if result.allowed else "leased_rejected"
+            ).inc()
+            return result
+
+        window_ms = int(window * 1000)
+        if self.algorithm == SLIDING_WINDOW_LOG:
+            args = [limit, window_ms, uuid.uuid4().hex]
+        elif self.algorithm == TOKEN_BUCKET:
+            args = [limit, window_ms, 1]
+        else:
+            args = [limit, window_ms]
+
+        try:
+            allowed, remaining, retry_after_ms = await self._script(keys=[key], args=args)
+        except redis.RedisError:
+            # A limiter outage should not take the API down with it
+            rate_limit_decisions.labels(algorithm=self.algorithm, outcome="error").inc()
+            if not self.fail_open:
+                raise
+            return RateLimitResult(True, limit, limit, 0.0)
+        result = RateLimitResult(bool(allowed), limit, int(remaining), int(retry_after_ms) / 1000.0)
+
+        if not result.allowed and self.local is not None:
+            self.local.block(key, result.retry_after)
+        rate_limit_decisions.labels(
+            algorithm=self.algorithm,
+            outcome="allowed" if result.allowed else "rejected"
+        ).inc()
+        return result
+
+
+def rate_limit_headers(result: RateLimitResult) -> Dict[str, str]:
+    headers = {
+        "X-RateLimit-Limit": str(result.limit),
+        "X-RateLimit-Remaining": str(max(0, result.remaining)),
+    }
+    if not result.allowed:
+        headers["Retry-After"] = str(math.ceil(result.retry_after))
+        headers["X-RateLimit-Reset"] = str(int(time.time() + math.ceil(result.retry_after)))
+    return headers
+
@@ -0,0 +1,161 @@
+# ============================================================================
+# DYNAMIC MICRO-BATCHING (nlu/batching.py)
+# ============================================================================
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, List, Optional, Sequence
+from prometheus_client import Gauge, Histogram
+
+batch_queue_depth = Gauge(
+    'nlu_batch_queue_depth',
+    'Number of requests waiting to be batched',
+    ['batcher']
+)
+
+batch_size = Histogram(
+    'nlu_batch_size',
+    'Number of requests per executed batch',
+    ['batcher'],
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128)
+)
+
+batch_wait_time = Histogram(
+    'nlu_batch_wait_seconds',
+    'Time a request spends queued before its batch starts',
+    ['batcher'],
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0)
+)
+
+batch_duration = Histogram(
+    'nlu_batch_duration_seconds',
+    'Time spent running one batch',
+    ['batcher']
+)
+
+
+class MicroBatcher:
+    """Groups concurrent submissions into batches for a batch function.
+
+    ``batch_fn`` takes a list of inputs and returns one result per input, in
+    order. It runs on a worker thread so the event loop keeps serving requests
+    while a batch is in flight; requests arriving meanwhile form the next batch.
+    """
+
+    def __init__(
+        self,
+        batch_fn: Callable[[List[Any]], Sequence[Any]],
+        max_batch_size: int = 16,
+        max_wait_ms: float = 5.0,
+        name: str = "default",
+        workers: int = 1,
+    ):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.batch_fn = batch_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self.name = name
+        self.workers = workers
+        self._queue: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+
+    @property
+    def running(self) -> bool:
+        return bool(self._tasks)
+
+    async def start(self):
+        if self.running:
+            return
+        self._queue = asyncio.Queue()
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.workers,
+            thread_name_prefix=f"batcher-{self.name}"
+        )
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+        # Fail anything still queued so callers are not left waiting
+        while self._queue is not None and not self._queue.empty():
+            _, future, _ = self._queue.get_nowait()
+            if not future.done():
+                future.set_exception(RuntimeError(f"Batcher '{self.name}' stopped"))
+        batch_queue_depth.labels(batcher=self.name).set(0)
+
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+
+    async def submit(self, item: Any) -> Any:
+        """Queue one input and wait for its result"""
+        if not self.running:
+            raise RuntimeError(f"Batcher '{self.name}' is not running")
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future, time.perf_counter()))
+        batch_queue_depth.labels(batcher=self.name).set(self._queue.qsize())
+        return await future
+
+    async def _collect(self) -> list:
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+            except asyncio.CancelledError:
+                for _, future, _ in batch:
+                    future.cancel()
+                raise
+
+        batch_queue_depth.labels(batcher=self.name).set(self._queue.qsize())
+        return batch
+
+    async def _worker(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+
+            # Callers that gave up (e.g. request timeout) do not need a slot
+            batch = [entry for entry in batch if not entry[1].done()]
+            if not batch:
+                continue
+
+            started = time.perf_counter()
+            for _, _, enqueued in batch:
+                batch_wait_time.labels(batcher=self.name).observe(started - enqueued)
+            batch_size.labels(batcher=self.name).observe(len(batch))
+
+            inputs = [item for item, _, _ in batch]
+            try:
+                results = await loop.run_in_executor(self._executor, self.batch_fn, inputs)
+                if len(results) != len(inputs):
+                    raise RuntimeError(
+                        f"Batch function returned {len(results)} results for {len(inputs)} inputs"
+                    )
+            except asyncio.CancelledError:
+                for _, future, _ in batch:
+                    future.cancel()
+                raise
+            except Exception as e:
+                for _, future, _ in batch:
+                    if not future.done():
+                        future.set_exception(e)
+            else:
+                for (_, future, _), result in zip(batch, results):
+                    if not future.done():
+                        future.set_result(result)
+            finally:
+                batch_duration.labels(batcher=self.name).observe(time.perf_counter() - started)
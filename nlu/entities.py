@@ -0,0 +1,59 @@
+# ============================================================================
+# ENTITY EXTRACTION (nlu/entities.py)
+# ============================================================================
+import re
+from typing import Any, Dict, List
+import spacy
+
+# Custom entities (order IDs, etc.)
+ORDER_ID_PATTERN = re.compile(r'\b[A-Z]{2}\d{8,10}\b')
+
+
+def load_ner_pipeline(model_name: str = "en_core_web_sm"):
+    """Load a spaCy pipeline trimmed down to what NER needs.
+
+    Only ``doc.ents`` is read, so the tagger, parser, lemmatizer etc. are
+    removed. The shared tok2vec is kept only if NER listens to it (in
+    ``en_core_web_sm`` NER carries its own embedding layer).
+    """
+    nlp = spacy.load(model_name)
+
+    needed = {"ner"}
+    if "tok2vec" in nlp.pipe_names and "ner" in nlp.get_pipe("tok2vec").listening_components:
+        needed.add("tok2vec")
+
+    for name in list(nlp.pipe_names):
+        if name not in needed:
+            nlp.remove_pipe(name)
+    return nlp
+
+
+def find_order_ids(text: str) -> List[Dict[str, Any]]:
+    return [
+        {
+            "text": match.group(),
+            "label": "ORDER_ID",
+            "start": match.start(),
+            "end": match.end()
+        }
+        for match in ORDER_ID_PATTERN.finditer(text)
+    ]
+
+
+def doc_entities(doc) -> List[Dict[str, Any]]:
+    entities = [
+        {
+            "text": ent.text,
+            "label": ent.label_,
+            "start": ent.start_char,
+            "end": ent.end_char
+        }
+        for ent in doc.ents
+    ]
+    entities.extend(find_order_ids(doc.text))
+    return entities
+
+
+def extract_entities_batch(nlp, texts: List[str], batch_size: int = 64) -> List[List[Dict[str, Any]]]:
+    """Run NER over many messages with a single ``nlp.pipe`` call"""
+    return [doc_entities(doc) for doc in nlp.pipe(texts, batch_size=batch_size)]
@@ -0,0 +1,206 @@
+# ============================================================================
+# INTENT MODEL INFERENCE BACKENDS (nlu/inference.py)
+# ============================================================================
+import logging
+import os
+from typing import Dict, List, Optional
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+
+def softmax(logits: np.ndarray) -> np.ndarray:
+    shifted = logits - logits.max(axis=-1, keepdims=True)
+    exp = np.exp(shifted)
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+
+class IntentBackend:
+    def __init__(self, tokenizer, labels: List[str]):
+        self.tokenizer = tokenizer
+        self.labels = labels
+
+    def logits(self, texts: List[str]) -> np.ndarray:
+        raise NotImplementedError("Must implement logits method")
+
+    def predict(self, texts: List[str]) -> List[tuple]:
+        """Return (intent, confidence) for each text"""
+        probs = softmax(self.logits(texts))
+        predicted = probs.argmax(axis=-1)
+        return [
+            (self.labels[class_id], float(probs[row, class_id]))
+            for row, class_id in enumerate(predicted)
+        ]
+
+
+class TorchIntentBackend(IntentBackend):
+    def __init__(self, tokenizer, labels: List[str], model):
+        super().__init__(tokenizer, labels)
+        self.model = model.eval()
+
+    def logits(self, texts: List[str]) -> np.ndarray:
+        import torch
+
+        inputs = self.tokenizer(texts, return_tensors="pt", truncation=True, padding=True)
+        with torch.no_grad():
+            return self.model(**inputs).logits.numpy()
+
+
+class OnnxIntentBackend(IntentBackend):
+    def __init__(self, tokenizer, labels: List[str], model_path: str, intra_op_threads: int = 0):
+        import onnxruntime as ort
+
+        super().__init__(tokenizer, labels)
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if intra_op_threads:
+            options.intra_op_num_threads = intra_op_threads
+        self.session = ort.InferenceSession(
+            model_path,
+            sess_options=options,
+            providers=["CPUExecutionProvider"]
+        )
+        self.input_names = [i.name for i in self.session.get_inputs()]
+
+    def logits(self, texts: List[str]) -> np.ndarray:
+        inputs = self.tokenizer(texts, return_tensors="np", truncation=True, padding=True)
+        feed = {name: inputs[name].astype(np.int64) for name in self.input_names}
+        return self.session.run(None, feed)[0]
+
+
+def export_onnx(model, tokenizer, path: str, opset: int = 14):
+    """Export a sequence classification model to ONNX with dynamic batch/sequence axes"""
+    import torch
+
+    class LogitsOnly(torch.nn.Module):
+        def __init__(self, wrapped):
+            super().__init__()
+            self.wrapped = wrapped
+
+        def forward(self, input_ids, attention_mask):
+            return self.wrapped(input_ids=input_ids, attention_mask=attention_mask).logits
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    sample = tokenizer(["export sample"], return_tensors="pt")
+    torch.onnx.export(
+        LogitsOnly(model.eval()),
+        (sample["input_ids"], sample["attention_mask"]),
+        path,
+        input_names=["input_ids", "attention_mask"],
+        output_names=["logits"],
+        dynamic_axes={
+            "input_ids": {0: "batch", 1: "sequence"},
+            "attention_mask": {0: "batch", 1: "sequence"},
+            "logits": {0: "batch"},
+        },
+        opset_version=opset,
+    )
+
+
+def quantize_onnx(path: str, quantized_path: str):
+    """Apply int8 dynamic quantization to the weights of an exported model"""
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    quantize_dynamic(
+        model_input=path,
+        model_output=quantized_path,
+        weight_type=QuantType.QInt8
+    )
+
+
+def compare_logits(reference: np.ndarray, candidate: np.ndarray) -> Dict[str, float]:
+    """Compare two backends' logits for the same inputs"""
+    ref_probs = softmax(reference)
+    cand_probs = softmax(candidate)
+    return {
+        "max_prob_diff": float(np.abs(ref_probs - cand_probs).max()),
+        "argmax_agreement": float(
+            (ref_probs.argmax(axis=-1) == cand_probs.argmax(axis=-1)).mean()
+        ),
+    }
+
+
+# Messages used to check an ONNX backend against the PyTorch reference
+PARITY_SAMPLES = [
+    "Where is my order AB12345678?",
+    "I want to return this product and get my money back",
+    "Tell me about this product",
+    "My payment failed twice",
+    "How long does shipping take to Canada?",
+    "Cancel my order please",
+    "I can't log into my account",
+    "This is the worst service I have ever had",
+]
+
+
+def load_intent_backend(
+    backend: str,
+    model_name: str,
+    labels: List[str],
+    onnx_path: str = "models/intent.onnx",
+    quantize: bool = False,
+    parity_check: bool = True,
+    parity_tolerance: Optional[float] = None,
+    intra_op_threads: int = 0,
+) -> IntentBackend:
+    """Build the configured intent backend.
+
+    The PyTorch model is only loaded when it is needed: to serve directly, to
+    export the ONNX file the first time, or to check parity. Once the ONNX
+    backend is verified the PyTorch weights are dropped.
+    """
+    from transformers import AutoTokenizer, AutoModelForSequenceClassification
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+
+    # The weights an ONNX file was exported from are kept next to it, so a later
+    # parity check compares against exactly the same (possibly fine-tuned) head
+    reference_dir = f"{onnx_path}.reference"
+
+    def load_torch_model():
+        source = reference_dir if os.path.isdir(reference_dir) else model_name
+        return AutoModelForSequenceClassification.from_pretrained(
+            source,
+            num_labels=len(labels)
+        )
+
+    backend = backend.lower()
+    if backend == "torch":
+        return TorchIntentBackend(tokenizer, labels, load_torch_model())
+    if backend != "onnx":
+        raise ValueError(f"Unsupported NLU inference backend: {backend}")
+
+    model_path = onnx_path
+    if quantize:
+        base, ext = os.path.splitext(onnx_path)
+        model_path = f"{base}.int8{ext or '.onnx'}"
+
+    torch_model = None
+    if not os.path.exists(onnx_path):
+        torch_model = load_torch_model()
+        logger.info("Exporting intent model to %s", onnx_path)
+        export_onnx(torch_model, tokenizer, onnx_path)
+        torch_model.save_pretrained(reference_dir)
+    if quantize and not os.path.exists(model_path):
+        logger.info("Quantizing intent model to %s", model_path)
+        quantize_onnx(onnx_path, model_path)
+
+    onnx_backend = OnnxIntentBackend(tokenizer, labels, model_path, intra_op_threads)
+
+    if parity_check:
+        if torch_model is None:
+            torch_model = load_torch_model()
+        reference = TorchIntentBackend(tokenizer, labels, torch_model)
+        report = compare_logits(
+            reference.logits(PARITY_SAMPLES),
+            onnx_backend.logits(PARITY_SAMPLES)
+        )
+        # int8 weights shift probabilities slightly; fp32 export should match closely.
+        # Argmax agreement is reported but not enforced: near-tied classes may flip
+        # within tolerance without the probabilities meaningfully changing.
+        tolerance = parity_tolerance if parity_tolerance is not None else (0.05 if quantize else 1e-3)
+        logger.info("ONNX parity check: %s (tolerance %s)", report, tolerance)
+        if report["max_prob_diff"] > tolerance:
+            raise RuntimeError(f"ONNX intent model failed parity check: {report}")
+
+    return onnx_backend
@@ -2,27 +2,30 @@
 # NLU PIPELINE SERVICE (nlu/main.py)
 # ============================================================================
 from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Dict, Any, List, Optional
-from transformers import AutoTokenizer, AutoModelForSequenceClassification
-import torch
-import spacy
-import httpx
+import asyncio
+import os
+import queue
 import numpy as np
 from middleware.metrics import setup_metrics_endpoint
+from middleware.event_loop import setup_event_loop
+from batching import MicroBatcher
+from inference import load_intent_backend
+from entities import extract_entities_batch, load_ner_pipeline
+from utils.service_client import ServiceClients, format_sse, iter_sse
 
 app = FastAPI(title="NLU Service")
 
 setup_metrics_endpoint(app)
 
-# Load models
-nlp = spacy.load("en_core_web_sm")
-
-# Intent classification model (DistilBERT)
-intent_tokenizer = AutoTokenizer.from_pretrained("distilbert-base-uncased")
-intent_model = AutoModelForSequenceClassification.from_pretrained(
-    "distilbert-base-uncased",
-    num_labels=10  # Adjust based on your intents
+# Blocking work goes to a bounded pool; handlers that block the loop are flagged
+setup_event_loop(
+    app,
+    "nlu",
+    threads=int(os.getenv("EVENT_LOOP_THREADS", "8")),
+    block_threshold_ms=float(os.getenv("EVENT_LOOP_BLOCK_THRESHOLD_MS", "100"))
 )
 
 # Intent labels
@@ -39,6 +42,68 @@ INTENT_LABELS = [
     "other"
 ]
 
+# Intent classification model (DistilBERT), served through PyTorch or ONNX Runtime
+INTENT_MODEL_NAME = "distilbert-base-uncased"
+NLU_INFERENCE_BACKEND = os.getenv("NLU_INFERENCE_BACKEND", "torch")  # "torch" or "onnx"
+NLU_ONNX_PATH = os.getenv("NLU_ONNX_PATH", "models/intent.onnx")
+NLU_ONNX_QUANTIZE = os.getenv("NLU_ONNX_QUANTIZE", "false").lower() == "true"
+NLU_ONNX_PARITY_CHECK = os.getenv("NLU_ONNX_PARITY_CHECK", "true").lower() == "true"
+NLU_INFERENCE_THREADS = int(os.getenv("NLU_INFERENCE_THREADS", "0"))
+
+intent_backend = load_intent_backend(
+    NLU_INFERENCE_BACKEND,
+    INTENT_MODEL_NAME,
+    INTENT_LABELS,
+    onnx_path=NLU_ONNX_PATH,
+    quantize=NLU_ONNX_QUANTIZE,
+    parity_check=NLU_ONNX_PARITY_CHECK,
+    intra_op_threads=NLU_INFERENCE_THREADS
+)
+
+# Micro-batching of intent classification across concurrent requests
+INTENT_BATCH_MAX_SIZE = int(os.getenv("NLU_INTENT_BATCH_MAX_SIZE", "16"))
+INTENT_BATCH_MAX_WAIT_MS = float(os.getenv("NLU_INTENT_BATCH_MAX_WAIT_MS", "5"))
+ENTITY_BATCH_MAX_SIZE = int(os.getenv("NLU_ENTITY_BATCH_MAX_SIZE", "64"))
+ENTITY_BATCH_MAX_WAIT_MS = float(os.getenv("NLU_ENTITY_BATCH_MAX_WAIT_MS", "5"))
+ENTITY_WORKERS = int(os.getenv("NLU_ENTITY_WORKERS", "1"))
+
+# Load models (NER-only spaCy pipeline). A pipeline must not run nlp.pipe
+# from two threads at once, so each entity worker checks out its own
+ner_pipelines: "queue.SimpleQueue" = queue.SimpleQueue()
+for _ in range(max(1, ENTITY_WORKERS)):
+    ner_pipelines.put(load_ner_pipeline("en_core_web_sm"))
+
+# Upstream services. HTTP/2 is only negotiated with upstreams that support it.
+HTTP_POOL_OPTIONS = {
+    "max_connections": int(os.getenv("NLU_HTTP_MAX_CONNECTIONS", "100")),
+    "max_keepalive_connections": int(os.getenv("NLU_HTTP_MAX_KEEPALIVE", "20")),
+    "keepalive_expiry": float(os.getenv("NLU_HTTP_KEEPALIVE_EXPIRY", "30")),
+}
+
+service_clients = ServiceClients()
+service_clients.register(
+    "user_profile",
+    os.getenv("USER_PROFILE_SERVICE_URL", "http://user-profile-service:8002"),
+    http2=os.getenv("USER_PROFILE_SERVICE_HTTP2", "false").lower() == "true",
+    timeout=5.0,
+    **HTTP_POOL_OPTIONS
+)
+service_clients.register(
+    "conversation",
+    os.getenv("CONVERSATION_SERVICE_URL", "http://conversation-service:8003"),
+    http2=os.getenv("CONVERSATION_SERVICE_HTTP2", "false").lower() == "true",
+    timeout=5.0,
+    **HTTP_POOL_OPTIONS
+)
+service_clients.register(
+    "orchestrator",
+    os.getenv("ORCHESTRATOR_SERVICE_URL", "http://orchestrator-service:8004"),
+    http2=os.getenv("ORCHESTRATOR_SERVICE_HTTP2", "false").lower() == "true",
+    timeout=60.0,
+    **HTTP_POOL_OPTIONS
+)
+service_clients.setup(app)
+
 class NLURequest(BaseModel):
     message: str
     user_id: str
@@ -52,73 +117,70 @@ class NLUResponse(BaseModel):
     requires_llm: bool
     orchestrator_response:Optional[Dict[str, Any]] = None
 
+def classify_intents(texts: List[str]) -> List[tuple]:
+    # Pad the whole batch to its longest message and run a single forward pass
+    return intent_backend.predict(texts)
+
 def classify_intent(text: str) -> tuple:
-    inputs = intent_tokenizer(text, return_tensors="pt", truncation=True, padding=True)
-    
-    with torch.no_grad():
-        outputs = intent_model(**inputs)
-        logits = outputs.logits
-        probs = torch.nn.functional.softmax(logits, dim=-1)
-        confidence, predicted_class = torch.max(probs, dim=-1)
-    
-    intent = INTENT_LABELS[predicted_class.item()]
-    confidence_score = confidence.item()
-    
-    return intent, confidence_score
+    return classify_intents([text])[0]
+
+intent_batcher = MicroBatcher(
+    classify_intents,
+    max_batch_size=INTENT_BATCH_MAX_SIZE,
+    max_wait_ms=INTENT_BATCH_MAX_WAIT_MS,
+    name="intent"
+)
+
+def extract_entities_many(texts: List[str]) -> List[List[Dict[str, Any]]]:
+    nlp = ner_pipelines.get()
+    try:
+        return extract_entities_batch(nlp, texts, batch_size=ENTITY_BATCH_MAX_SIZE)
+    finally:
+        ner_pipelines.put(nlp)
 
 def extract_entities(text: str) -> List[Dict[str, Any]]:
-    doc = nlp(text)
-    entities = []
-    
-    for ent in doc.ents:
-        entities.append({
-            "text": ent.text,
-            "label": ent.label_,
-            "start": ent.start_char,
-            "end": ent.end_char
-        })
-    
-    # Extract custom entities (order IDs, etc.)
-    # Simple pattern matching for order IDs
-    import re
-    order_pattern = r'\b[A-Z]{2}\d{8,10}\b'
-    for match in re.finditer(order_pattern, text):
-        entities.append({
-            "text": match.group(),
-            "label": "ORDER_ID",
-            "start": match.start(),
-            "end": match.end()
-        })
-    
-    return entities
+    return extract_entities_many([text])[0]
 
-@app.post("/process", response_model=NLUResponse)
-async def process_message(request: NLURequest):
-    # Classify intent
-    intent, confidence = classify_intent(request.message)
-    
-    # Extract entities
-    entities = extract_entities(request.message)
+entity_batcher = MicroBatcher(
+    extract_entities_many,
+    max_batch_size=ENTITY_BATCH_MAX_SIZE,
+    max_wait_ms=ENTITY_BATCH_MAX_WAIT_MS,
+    name="entities",
+    workers=ENTITY_WORKERS
+)
+
+@app.on_event("startup")
+async def start_batchers():
+    await intent_batcher.start()
+    await entity_batcher.start()
+
+@app.on_event("shutdown")
+async def stop_batchers():
+    await intent_batcher.stop()
+    await entity_batcher.stop()
+
+async def fetch_user_profile(user_id: str) -> Dict[str, Any]:
+    response = await service_clients["user_profile"].get(f"/profile/{user_id}")
+    return response.json()
+
+async def fetch_conversation_history(session_id: str) -> Dict[str, Any]:
+    response = await service_clients["conversation"].get(f"/conversation/{session_id}")
+    return response.json()
+
+async def understand(request: NLURequest) -> Dict[str, Any]:
+    # Classify intent, extract entities and fetch context concurrently.
+    # Intent and entities are batched with other requests off the event loop.
+    (intent, confidence), entities, user_profile, conversation_history = await asyncio.gather(
+        intent_batcher.submit(request.message),
+        entity_batcher.submit(request.message),
+        fetch_user_profile(request.user_id),
+        fetch_conversation_history(request.session_id)
+    )
     
     # Determine if LLM is needed
     requires_llm = confidence < 0.7 or intent == "other"
     
-    # Get context
-    async with httpx.AsyncClient() as client:
-        # Fetch user profile
-        profile_response = await client.get(
-            f"http://user-profile-service:8002/profile/{request.user_id}"
-        )
-        user_profile = profile_response.json()
-        
-        # Fetch conversation history
-        conv_response = await client.get(
-            f"http://conversation-service:8003/conversation/{request.session_id}"
-        )
-        conversation_history = conv_response.json()
-    
-    # Route to orchestrator
-    orchestrator_request = {
+    return {
         "message": request.message,
         "user_id": request.user_id,
         "session_id": request.session_id,
@@ -131,24 +193,57 @@ async def process_message(request: NLURequest):
             "conversation_history": conversation_history
         }
     }
+
+@app.post("/process", response_model=NLUResponse)
+async def process_message(request: NLURequest):
+    orchestrator_request = await understand(request)
     
-    async with httpx.AsyncClient() as client:
-        orchestrator_response = await client.post(
-            "http://orchestrator-service:8004/orchestrate",
-            json=orchestrator_request,
-            timeout=60.0
-        )
-        orchestrator_data = orchestrator_response.json()
+    # Route to orchestrator
+    orchestrator_response = await service_clients["orchestrator"].post(
+        "/orchestrate",
+        json=orchestrator_request
+    )
+    orchestrator_data = orchestrator_response.json()
     
     # Map back to NLUResponse
     return NLUResponse(
-        intent=intent,
-        confidence=confidence,
-        entities=entities,
-        requires_llm=requires_llm,
+        intent=orchestrator_request["intent"],
+        confidence=orchestrator_request["confidence"],
+        entities=orchestrator_request["entities"],
+        requires_llm=orchestrator_request["requires_llm"],
         orchestrator_response= orchestrator_data
     )
 
+@app.post("/process/stream")
+async def process_message_stream(request: NLURequest):
+    """Send the NLU result first, then relay the orchestrator's event stream"""
+    orchestrator_request = await understand(request)
+
+    async def events():
+        yield format_sse("nlu", {
+            key: orchestrator_request[key]
+            for key in ("intent", "confidence", "entities", "requires_llm")
+        })
+        finished = False
+        try:
+            async with service_clients["orchestrator"].stream(
+                "POST", "/orchestrate/stream", json=orchestrator_request
+            ) as response:
+                if response.status_code != 200:
+                    await response.aread()
+                    raise RuntimeError(f"Orchestrator returned {response.status_code}: {response.text[:200]}")
+                async for event, data in iter_sse(response):
+                    finished = finished or event in ("done", "error")
+                    yield format_sse(event, data)
+            if not finished:
+                raise RuntimeError("Orchestrator stream ended without a final answer")
+        except Exception as e:
+            # Always end the stream with a terminal event the client can act on
+            if not finished:
+                yield format_sse("error", {"detail": f"Response failed: {e}"})
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
 @app.get("/health")
 async def health():
     return {"status": "healthy", "service": "nlu"}
\ No newline at end of file
@@ -0,0 +1,163 @@
+# ============================================================================
+# EVENT LOOP EXECUTION MODEL (middleware/event_loop.py)
+# ============================================================================
+# One execution model for every service:
+#   - async handlers never block: blocking I/O and CPU work go through
+#     run_blocking() (a bounded thread pool installed as the loop's default
+#     executor) or run_in_process() (an optional bounded process pool)
+#   - the loop's scheduling lag is exported as a histogram
+#   - a watchdog thread notices when the loop has not run for longer than
+#     the threshold and logs the blocking stack and the handler it is in
+import asyncio
+import functools
+import logging
+import sys
+import threading
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+from fastapi import FastAPI
+from prometheus_client import Counter, Histogram
+
+logger = logging.getLogger(__name__)
+
+event_loop_lag = Histogram(
+    'event_loop_lag_seconds',
+    'Delay between when a loop callback was due and when it ran',
+    ['service'],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+)
+event_loop_blocked = Counter(
+    'event_loop_blocked_total',
+    'Times the event loop was blocked past the watchdog threshold, by handler',
+    ['service', 'handler']
+)
+
+_process_pool: Optional[ProcessPoolExecutor] = None
+
+
+async def run_blocking(func: Callable, *args: Any, **kwargs: Any) -> Any:
+    """Run blocking I/O or GIL-releasing CPU work in the bounded thread pool"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(None, functools.partial(func, *args, **kwargs))
+
+
+async def run_in_process(func: Callable, *args: Any) -> Any:
+    """Run pure-Python CPU work in the process pool (threads if none is configured).
+
+    ``func`` and its arguments must be picklable.
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_process_pool, functools.partial(func, *args))
+
+
+class LoopWatchdog:
+    """Measures loop lag and reports handlers that block the loop.
+
+    A heartbeat coroutine wakes every ``interval`` seconds and records how
+    late it ran. A separate thread checks the heartbeat; if the loop has
+    been stuck for more than ``threshold`` seconds it captures the loop
+    thread's stack, attributes it to the route endpoint on that stack, and
+    logs it once per stall.
+    """
+
+    def __init__(self, service: str, threshold: float = 0.1, interval: float = 0.05):
+        self.service = service
+        self.threshold = threshold
+        self.interval = interval
+        self.endpoints: Dict[Any, str] = {}
+        self._last_beat = time.monotonic()
+        self._loop_thread_id: Optional[int] = None
+        self._heartbeat_task: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def register_endpoints(self, app: FastAPI):
+        for route in app.routes:
+            endpoint = getattr(route, "endpoint", None)
+            code = getattr(endpoint, "__code__", None)
+            if code is not None:
+                self.endpoints[code] = getattr(route, "path", endpoint.__name__)
+
+    async def _heartbeat(self):
+        while True:
+            due = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            event_loop_lag.labels(service=self.service).observe(max(0.0, now - due))
+            self._last_beat = now
+
+    def _blocking_handler(self, frame) -> str:
+        while frame is not None:
+            path = self.endpoints.get(frame.f_code)
+            if path is not None:
+                return path
+            frame = frame.f_back
+        return "unknown"
+
+    def _watch(self):
+        reported_beat = None
+        while not self._stopped.wait(self.threshold / 2):
+            last_beat = self._last_beat
+            stalled = time.monotonic() - last_beat - self.interval
+            if stalled <= self.threshold or reported_beat == last_beat:
+                continue
+            reported_beat = last_beat
+
+            frame = sys._current_frames().get(self._loop_thread_id)
+            handler = self._blocking_handler(frame)
+            event_loop_blocked.labels(service=self.service, handler=handler).inc()
+            stack = "".join(traceback.format_stack(frame)) if frame is not None else ""
+            logger.warning(
+                f"{self.service}: event loop blocked for {stalled * 1000:.0f}ms in {handler}\n{stack}"
+            )
+
+    def start(self):
+        self._loop_thread_id = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._heartbeat_task = asyncio.create_task(self._heartbeat())
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._watch, name=f"{self.service}-loop-watchdog", daemon=True)
+        self._thread.start()
+
+    async def stop(self):
+        self._stopped.set()
+        if self._heartbeat_task is not None:
+            self._heartbeat_task.cancel()
+            try:
+                await self._heartbeat_task
+            except asyncio.CancelledError:
+                pass
+            self._heartbeat_task = None
+
+
+def setup_event_loop(
+    app: FastAPI,
+    service: str,
+    threads: Optional[int] = None,
+    processes: int = 0,
+    block_threshold_ms: float = 100.0,
+) -> LoopWatchdog:
+    """Install the bounded pools and the loop watchdog for the app's lifetime"""
+    watchdog = LoopWatchdog(service, threshold=block_threshold_ms / 1000.0)
+
+    async def start():
+        global _process_pool
+        loop = asyncio.get_running_loop()
+        loop.set_default_executor(ThreadPoolExecutor(max_workers=threads, thread_name_prefix=f"{service}-blocking"))
+        if processes > 0:
+            _process_pool = ProcessPoolExecutor(max_workers=processes)
+        watchdog.register_endpoints(app)
+        watchdog.start()
+
+    async def stop():
+        global _process_pool
+        await watchdog.stop()
+        if _process_pool is not None:
+            _process_pool.shutdown(wait=False, cancel_futures=True)
+            _process_pool = None
+
+    app.add_event_handler("startup", start)
+    app.add_event_handler("shutdown", stop)
+    return watchdog
@@ -2,16 +2,42 @@
 # ORCHESTRATOR SERVICE (orchestrator/main.py)
 # ============================================================================
 from fastapi import FastAPI
+from fastapi.responses import StreamingResponse
 from pydantic import BaseModel
 from typing import Dict, Any, List, Optional
-import httpx
+import logging
+import os
 from enum import Enum
 from middleware.metrics import setup_metrics_endpoint
+from middleware.event_loop import setup_event_loop
+from utils.service_client import ServiceClients, format_sse, iter_sse
 
 app = FastAPI(title="Orchestrator Service")
+logger = logging.getLogger(__name__)
 
 setup_metrics_endpoint(app)
 
+# Blocking work goes to a bounded pool; handlers that block the loop are flagged
+setup_event_loop(
+    app,
+    "orchestrator",
+    threads=int(os.getenv("EVENT_LOOP_THREADS", "8")),
+    block_threshold_ms=float(os.getenv("EVENT_LOOP_BLOCK_THRESHOLD_MS", "100"))
+)
+
+# Upstream services
+service_clients = ServiceClients()
+service_clients.register("order", os.getenv("ORDER_SERVICE_URL", "http://order-service:8005"), timeout=10.0)
+service_clients.register("refund", os.getenv("REFUND_SERVICE_URL", "http://refund-service:8006"), timeout=10.0)
+service_clients.register("llm", os.getenv("LLM_SERVICE_URL", "http://llm-service:8007"), timeout=60.0)
+service_clients.register("handoff", os.getenv("HANDOFF_SERVICE_URL", "http://handoff-service:8008"), timeout=5.0)
+service_clients.register(
+    "conversation",
+    os.getenv("CONVERSATION_SERVICE_URL", "http://conversation-service:8003"),
+    timeout=5.0
+)
+service_clients.setup(app)
+
 class IntentType(str, Enum):
     ORDER_STATUS = "order_status"
     REFUND_REQUEST = "refund_request"
@@ -45,12 +71,8 @@ async def handle_order_status(entities: List[Dict], context: Dict) -> Dict:
         }
     
     # Call order tracking service
-    async with httpx.AsyncClient() as client:
-        response = await client.get(
-            f"http://order-service:8005/order/{order_id}",
-            timeout=10.0
-        )
-        order_data = response.json()
+    response = await service_clients["order"].get(f"/order/{order_id}")
+    order_data = response.json()
     
     if order_data.get('error'):
         return {
@@ -65,73 +87,129 @@ async def handle_order_status(entities: List[Dict], context: Dict) -> Dict:
     }
 
 async def handle_refund_request(entities: List[Dict], context: Dict) -> Dict:
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            "http://refund-service:8006/refund/initiate",
-            json={"user_id": context.get("user_id"), "entities": entities},
-            timeout=10.0
-        )
-        return response.json()
+    response = await service_clients["refund"].post(
+        "/refund/initiate",
+        json={"user_id": context.get("user_id"), "entities": entities}
+    )
+    return response.json()
 
 async def handle_with_llm(request: OrchestratorRequest) -> Dict:
-    async with httpx.AsyncClient() as client:
-        response = await client.post(
-            "http://llm-service:8007/generate",
-            json={
-                "message": request.message,
-                "context": request.context,
-                "intent": request.intent,
-                "entities": request.entities
-            },
-            timeout=60.0
-        )
-        return response.json()
+    response = await service_clients["llm"].post("/generate", json=llm_payload(request))
+    return response.json()
 
-@app.post("/orchestrate")
-async def orchestrate(request: OrchestratorRequest):
-    # State machine logic
+def llm_payload(request: OrchestratorRequest) -> Dict:
+    return {
+        "message": request.message,
+        "context": request.context,
+        "intent": request.intent,
+        "entities": request.entities
+    }
+
+def needs_llm(request: OrchestratorRequest) -> bool:
+    # State machine logic; complex queries default to the LLM
     if request.requires_llm or request.confidence < 0.7:
-        result = await handle_with_llm(request)
-    elif request.intent == IntentType.ORDER_STATUS:
-        result = await handle_order_status(request.entities, request.context)
-    elif request.intent == IntentType.REFUND_REQUEST:
-        result = await handle_refund_request(request.entities, request.context)
-    else:
-        # Default to LLM for complex queries
-        result = await handle_with_llm(request)
-    
+        return True
+    return request.intent not in (IntentType.ORDER_STATUS, IntentType.REFUND_REQUEST)
+
+async def handle_with_rules(request: OrchestratorRequest) -> Dict:
+    if request.intent == IntentType.ORDER_STATUS:
+        return await handle_order_status(request.entities, request.context)
+    return await handle_refund_request(request.entities, request.context)
+
+async def complete_turn(request: OrchestratorRequest, result: Dict) -> Dict:
     # Check if human handoff is needed
     escalation_keywords = ['speak to human', 'agent', 'representative', 'manager']
     if any(keyword in request.message.lower() for keyword in escalation_keywords):
-        async with httpx.AsyncClient() as client:
-            await client.post(
-                "http://handoff-service:8008/escalate",
-                json={
-                    "user_id": request.user_id,
-                    "session_id": request.session_id,
-                    "message": request.message,
-                    "context": request.context
-                }
-            )
-        result['escalated'] = True
-        result['response'] = "I'm connecting you with a human agent. Please wait..."
-    
-    # Store conversation
-    async with httpx.AsyncClient() as client:
-        await client.post(
-            "http://conversation-service:8003/conversation/add",
+        await service_clients["handoff"].post(
+            "/escalate",
             json={
-                "session_id": request.session_id,
                 "user_id": request.user_id,
+                "session_id": request.session_id,
                 "message": request.message,
-                "response": result.get('response', ''),
-                "intent": request.intent,
-                "confidence": request.confidence
+                "context": request.context
             }
         )
+        result['escalated'] = True
+        result['response'] = "I'm connecting you with a human agent. Please wait..."
+    
+    # Store conversation
+    await service_clients["conversation"].post(
+        "/conversation/add",
+        json={
+            "session_id": request.session_id,
+            "user_id": request.user_id,
+            "message": request.message,
+            "response": result.get('response', ''),
+            "intent": request.intent,
+            "confidence": request.confidence
+        }
+    )
     
     return result
 
+@app.post("/orchestrate")
+async def orchestrate(request: OrchestratorRequest):
+    if needs_llm(request):
+        result = await handle_with_llm(request)
+    else:
+        result = await handle_with_rules(request)
+    
+    return await complete_turn(request, result)
+
+STREAM_ERROR_RESPONSE = "Sorry, something went wrong while answering. Please try again."
+
+@app.post("/orchestrate/stream")
+async def orchestrate_stream(request: OrchestratorRequest):
+    """Relay LLM tokens as Server-Sent Events; handoff and persistence run once the stream completes.
+
+    The stream always ends with a ``done`` or an ``error`` event, and the
+    turn is saved either way.
+    """
+    async def events():
+        result = None
+        error = None
+        try:
+            if needs_llm(request):
+                async with service_clients["llm"].stream(
+                    "POST", "/generate/stream", json=llm_payload(request)
+                ) as response:
+                    if response.status_code != 200:
+                        await response.aread()
+                        raise RuntimeError(f"LLM service returned {response.status_code}: {response.text[:200]}")
+                    async for event, data in iter_sse(response):
+                        if event == "done":
+                            result = data
+                        elif event == "error":
+                            error = data.get("detail", "LLM stream failed")
+                        else:
+                            yield format_sse(event, data)
+                if result is None and error is None:
+                    error = "LLM stream ended without a final answer"
+            else:
+                result = await handle_with_rules(request)
+        except Exception as e:
+            error = f"Response failed: {e}"
+
+        if result is None:
+            # Save the turn with an apology so the history shows what the user saw
+            try:
+                await complete_turn(request, {"response": STREAM_ERROR_RESPONSE, "error": error})
+            except Exception as e:
+                logger.error(f"Saving failed turn for session {request.session_id} failed: {e}")
+            yield format_sse("error", {"detail": error})
+            return
+
+        streamed = result.get('response', '')
+        try:
+            result = await complete_turn(request, result)
+        except Exception as e:
+            yield format_sse("error", {"detail": f"Completing the turn failed: {e}"})
+            return
+        result['replaced'] = result.get('replaced', False) or result.get('response', '') != streamed
+        yield format_sse("done", result)
+
+    return StreamingResponse(events(), media_type="text/event-stream")
+
 @app.get("/health")
 async def health():
     return {"status": "healthy", "service": "orchestrator"}
\ No newline at end of file
@@ -0,0 +1,266 @@
+# ============================================================================
+# SERVICE CLIENTS (utils/service_client.py)
+# ============================================================================
+# One pooled httpx.AsyncClient per upstream, opened at app startup and closed
+# at shutdown. Calls carry the remaining request budget to the next hop in the
+# X-Request-Budget-Ms header, and idempotent calls are retried with jitter.
+# Streamed (Server-Sent Events) responses are relayed with stream().
+import asyncio
+import contextvars
+import json
+import random
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Dict, Optional, Tuple
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+BUDGET_HEADER = "X-Request-Budget-Ms"
+IDEMPOTENT_METHODS = {"GET", "HEAD", "OPTIONS", "PUT", "DELETE"}
+RETRYABLE_STATUS_CODES = {502, 503, 504}
+
+# Absolute deadline (time.monotonic()) of the request being handled, if any
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar(
+    "request_deadline", default=None
+)
+
+
+class DeadlineExceeded(Exception):
+    pass
+
+
+def remaining_budget() -> Optional[float]:
+    """Seconds left before the current request's deadline, or None if unbounded"""
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+@contextmanager
+def request_deadline(seconds: Optional[float]):
+    """Bound the enclosed calls to ``seconds`` (never extends an outer deadline)"""
+    if seconds is None:
+        yield
+        return
+    deadline = time.monotonic() + seconds
+    current = _deadline.get()
+    if current is not None:
+        deadline = min(deadline, current)
+    token = _deadline.set(deadline)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def setup_deadline_propagation(app: FastAPI, default_budget: Optional[float] = None):
+    """Read the incoming budget header (or apply a default) for every request"""
+    @app.middleware("http")
+    async def propagate_deadline(request: Request, call_next):
+        budget = default_budget
+        header = request.headers.get(BUDGET_HEADER)
+        if header is not None:
+            try:
+                budget = max(0.0, float(header) / 1000.0)
+            except ValueError:
+                pass
+        with request_deadline(budget):
+            return await call_next(request)
+
+    @app.exception_handler(DeadlineExceeded)
+    async def deadline_exceeded(request: Request, exc: DeadlineExceeded):
+        return JSONResponse(status_code=504, content={"detail": str(exc)})
+
+
+def format_sse(event: str, data: Any) -> str:
+    """Encode one Server-Sent Event with a JSON payload"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+async def iter_sse(response: httpx.Response) -> AsyncIterator[Tuple[str, Any]]:
+    """Yield (event, data) pairs from a streamed text/event-stream response"""
+    event, data_lines = "message", []
+    async for line in response.aiter_lines():
+        if not line:
+            if data_lines:
+                yield event, json.loads("\n".join(data_lines))
+            event, data_lines = "message", []
+        elif line.startswith("event:"):
+            event = line[len("event:"):].strip()
+        elif line.startswith("data:"):
+            data_lines.append(line[len("data:"):].strip())
+    if data_lines:
+        yield event, json.loads("\n".join(data_lines))
+
+
+class ServiceClient:
+    def __init__(
+        self,
+        name: str,
+        base_url: str,
+        timeout: float = 10.0,
+        http2: bool = False,
+        max_connections: int = 100,
+        max_keepalive_connections: int = 20,
+        keepalive_expiry: float = 30.0,
+        retries: int = 2,
+        backoff_base: float = 0.05,
+        backoff_max: float = 1.0,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.name = name
+        self.base_url = base_url
+        self.timeout = timeout
+        self.http2 = http2
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.retries = retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.transport = transport
+        self._client: Optional[httpx.AsyncClient] = None
+
+    async def start(self):
+        if self._client is None:
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                http2=self.http2,
+                limits=self.limits,
+                timeout=self.timeout,
+                transport=self.transport
+            )
+
+    async def close(self):
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    @property
+    def client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            raise RuntimeError(f"Service client '{self.name}' is not started")
+        return self._client
+
+    def _call_timeout(self, timeout: Optional[float]) -> float:
+        timeout = self.timeout if timeout is None else timeout
+        budget = remaining_budget()
+        if budget is not None:
+            if budget <= 0:
+                raise DeadlineExceeded(f"No time budget left to call {self.name}")
+            timeout = min(timeout, budget)
+        return timeout
+
+    def _backoff(self, attempt: int) -> float:
+        # Full jitter: spreads retries from many callers over the window
+        return random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt)))
+
+    async def request(
+        self,
+        method: str,
+        path: str,
+        *,
+        idempotent: Optional[bool] = None,
+        timeout: Optional[float] = None,
+        retries: Optional[int] = None,
+        **kwargs: Any
+    ) -> httpx.Response:
+        """Send a request, retrying transient failures when it is safe to.
+
+        Idempotent calls are retried on transport errors and 502/503/504.
+        Any call is retried when the connection could not be established,
+        since the upstream never saw the request.
+        """
+        method = method.upper()
+        if idempotent is None:
+            idempotent = method in IDEMPOTENT_METHODS
+        retries = self.retries if retries is None else retries
+
+        base_headers = dict(kwargs.pop("headers", None) or {})
+        attempt = 0
+        while True:
+            call_timeout = self._call_timeout(timeout)
+            headers = {**base_headers, BUDGET_HEADER: str(int(call_timeout * 1000))}
+            try:
+                response = await self.client.request(
+                    method, path, headers=headers, timeout=call_timeout, **kwargs
+                )
+            except (httpx.ConnectError, httpx.ConnectTimeout):
+                if attempt >= retries:
+                    raise
+            except httpx.TransportError:
+                if not idempotent or attempt >= retries:
+                    raise
+            else:
+                if not (idempotent and response.status_code in RETRYABLE_STATUS_CODES and attempt < retries):
+                    return response
+                await response.aclose()
+
+            delay = self._backoff(attempt)
+            budget = remaining_budget()
+            if budget is not None and budget <= delay:
+                raise DeadlineExceeded(f"Deadline reached while retrying {self.name}")
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    @asynccontextmanager
+    async def stream(
+        self,
+        method: str,
+        path: str,
+        *,
+        timeout: Optional[float] = None,
+        **kwargs: Any
+    ) -> AsyncIterator[httpx.Response]:
+        """Open a streamed response; the timeout bounds each read, not the whole stream"""
+        call_timeout = self._call_timeout(timeout)
+        headers = {**(kwargs.pop("headers", None) or {}), BUDGET_HEADER: str(int(call_timeout * 1000))}
+        async with self.client.stream(
+            method.upper(), path, headers=headers, timeout=call_timeout, **kwargs
+        ) as response:
+            yield response
+
+    async def get(self, path: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("GET", path, **kwargs)
+
+    async def post(self, path: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("POST", path, **kwargs)
+
+    async def put(self, path: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("PUT", path, **kwargs)
+
+    async def delete(self, path: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("DELETE", path, **kwargs)
+
+
+class ServiceClients:
+    """Registry of upstream clients tied to the application lifecycle"""
+
+    def __init__(self):
+        self._clients: Dict[str, ServiceClient] = {}
+
+    def register(self, name: str, base_url: str, **options: Any) -> ServiceClient:
+        client = ServiceClient(name, base_url, **options)
+        self._clients[name] = client
+        return client
+
+    def __getitem__(self, name: str) -> ServiceClient:
+        return self._clients[name]
+
+    async def start(self):
+        for client in self._clients.values():
+            await client.start()
+
+    async def close(self):
+        for client in self._clients.values():
+            await client.close()
+
+    def setup(self, app: FastAPI, default_budget: Optional[float] = None):
+        """Open clients on startup, close them on shutdown, propagate deadlines"""
+        app.add_event_handler("startup", self.start)
+        app.add_event_handler("shutdown", self.close)
+        setup_deadline_propagation(app, default_budget)
@@ -0,0 +1,75 @@
+# ============================================================================
+# BENCHMARK - CHUNKING AND EMBEDDING THROUGHPUT (tests/benchmark_chunking.py)
+# ============================================================================
+# Chunks a synthetic product manual with the same settings as the service,
+# then embeds the chunks at several batch sizes and reports chunks/sec.
+# Embedding needs sentence-transformers; without it only chunking is measured.
+# Run with: python tests/benchmark_chunking.py [--pages 200] [--batch-sizes 16,64,256]
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'knowledge-ingestion'))
+
+from chunking import Chunker, Section, token_counter_for
+
+WORDS = (
+    "order refund shipping warranty device battery charge replace return policy days customer "
+    "support account payment delivery tracking package setting screen reset button cable"
+).split()
+
+
+def synthetic_manual(pages, seed=0):
+    rng = random.Random(seed)
+
+    def sentence():
+        return " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 24))).capitalize() + "."
+
+    sections = []
+    for page in range(pages):
+        for heading in range(3):
+            paragraphs = [" ".join(sentence() for _ in range(rng.randint(3, 7))) for _ in range(rng.randint(2, 4))]
+            sections.append(Section(f"Chapter {page + 1}.{heading + 1}", "\n\n".join(paragraphs)))
+    return sections
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--pages", type=int, default=200)
+    parser.add_argument("--chunk-tokens", type=int, default=200)
+    parser.add_argument("--overlap-tokens", type=int, default=40)
+    parser.add_argument("--batch-sizes", default="16,64,256")
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    args = parser.parse_args()
+
+    try:
+        from sentence_transformers import SentenceTransformer
+        model = SentenceTransformer(args.model)
+    except ImportError:
+        model = None
+        print("sentence-transformers is not installed: estimating tokens from words, skipping embedding\n")
+
+    sections = synthetic_manual(args.pages)
+    chunker = Chunker(token_counter_for(model), args.chunk_tokens, args.overlap_tokens)
+
+    started = time.perf_counter()
+    chunks = chunker.split(sections)
+    elapsed = time.perf_counter() - started
+    print(f"{args.pages} pages, {len(sections)} sections -> {len(chunks)} chunks")
+    print(f"{'chunking':<28} {len(chunks) / elapsed:>12.0f} chunks/sec")
+
+    if model is None:
+        return
+    texts = [chunk.text for chunk in chunks]
+    model.encode(texts[:32])  # warm up
+    for batch_size in (int(size) for size in args.batch_sizes.split(",")):
+        started = time.perf_counter()
+        model.encode(texts, batch_size=batch_size)
+        elapsed = time.perf_counter() - started
+        print(f"{f'embedding batch_size={batch_size}':<28} {len(texts) / elapsed:>12.0f} chunks/sec")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+# ============================================================================
+# BENCHMARK - ENTITY EXTRACTION THROUGHPUT (tests/benchmark_entities.py)
+# ============================================================================
+# Run with: python tests/benchmark_entities.py [--messages 2000] [--batch-size 64]
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'nlu'))
+
+import spacy
+from entities import extract_entities_batch, load_ner_pipeline
+
+SAMPLE_MESSAGES = [
+    "Where is my order AB12345678?",
+    "I ordered a blender from Amazon last Tuesday and it never arrived in London",
+    "Can John Smith pick up order CD9876543210 on Friday?",
+    "I was charged $49.99 twice for the same purchase",
+    "What is your return policy for items bought in December?",
+    "My package to New York has been stuck since Monday",
+    "Please cancel order EF11223344 and refund my Visa card",
+    "How do I contact support?",
+]
+
+
+def baseline_extract(nlp, text):
+    """Entity extraction as it was before: full pipeline, regex rebuilt per call"""
+    doc = nlp(text)
+    entities = [
+        {"text": ent.text, "label": ent.label_, "start": ent.start_char, "end": ent.end_char}
+        for ent in doc.ents
+    ]
+    import re
+    order_pattern = r'\b[A-Z]{2}\d{8,10}\b'
+    for match in re.finditer(order_pattern, text):
+        entities.append({
+            "text": match.group(), "label": "ORDER_ID",
+            "start": match.start(), "end": match.end()
+        })
+    return entities
+
+
+def measure(label, func, messages):
+    started = time.perf_counter()
+    func(messages)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<40} {len(messages) / elapsed:>10.1f} msg/s  ({elapsed:.2f}s)")
+    return len(messages) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--batch-size", type=int, default=64)
+    parser.add_argument("--model", default="en_core_web_sm")
+    args = parser.parse_args()
+
+    random.seed(0)
+    messages = [random.choice(SAMPLE_MESSAGES) for _ in range(args.messages)]
+
+    full_nlp = spacy.load(args.model)
+    ner_nlp = load_ner_pipeline(args.model)
+    print(f"full pipeline: {full_nlp.pipe_names}")
+    print(f"ner pipeline:  {ner_nlp.pipe_names}\n")
+
+    # Warm up both pipelines so model loading is not measured
+    baseline_extract(full_nlp, messages[0])
+    extract_entities_batch(ner_nlp, messages[:1])
+
+    before = measure(
+        "before: full pipeline, nlp(text) each",
+        lambda msgs: [baseline_extract(full_nlp, m) for m in msgs],
+        messages
+    )
+    measure(
+        "trimmed pipeline, nlp(text) each",
+        lambda msgs: [extract_entities_batch(ner_nlp, [m]) for m in msgs],
+        messages
+    )
+    after = measure(
+        f"after: trimmed pipeline, pipe({args.batch_size})",
+        lambda msgs: extract_entities_batch(ner_nlp, msgs, batch_size=args.batch_size),
+        messages
+    )
+    print(f"\nspeedup: {after / before:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+# ============================================================================
+# BENCHMARK - LLM CLIENT SETUP OVERHEAD (tests/benchmark_llm_clients.py)
+# ============================================================================
+# Measures the per-request cost of obtaining an LLM client, before (strategy
+# initialized on every request) and after (client reused from the registry).
+# No completion is sent, so dummy credentials are enough.
+# Run with: python tests/benchmark_llm_clients.py [--requests 500] [--service azure_openai]
+import argparse
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'llm'))
+
+DUMMY_ENV = {
+    "AZURE-DEPLOYMENT-NAME": "bench",
+    "OPENAI-API-VERSION": "2024-02-01",
+    "AZURE-OPENAI-API-KEY": "bench-key",
+    "AZURE-OPENAI-ENDPOINT": "https://bench.openai.azure.com",
+    "OPENAI-KEY": "bench-key",
+    "BASE_URL": "http://localhost:11434",
+}
+for name, value in DUMMY_ENV.items():
+    os.environ.setdefault(name, value)
+
+from LLMStrategies.factory import get_llm_strategy
+from LLMStrategies.registry import LLMRegistry, load_llm_config
+
+LLM_CONFIG = {"temperature": 0.3, "model": "gpt-4o-mini", "max_tokens": 3000}
+
+
+def measure(label, func, requests):
+    started = time.perf_counter()
+    for _ in range(requests):
+        func()
+    elapsed = time.perf_counter() - started
+    per_request_us = elapsed / requests * 1e6
+    print(f"{label:<40} {per_request_us:>12.1f} us/request")
+    return per_request_us
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--service", default="azure_openai")
+    args = parser.parse_args()
+
+    registry = LLMRegistry(get_llm_strategy, lambda: load_llm_config(None, args.service, LLM_CONFIG))
+    registry.reload()
+
+    before = measure(
+        "before: initialize() per request",
+        lambda: get_llm_strategy(args.service, LLM_CONFIG).initialize(),
+        args.requests
+    )
+    after = measure("after: registry.get()", registry.get, args.requests)
+    print(f"\noverhead removed per request: {before - after:.1f} us ({before / max(after, 1e-9):.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+# ============================================================================
+# BENCHMARK - KNOWLEDGE BASE ANN RECALL VS LATENCY (tests/benchmark_vector_index.py)
+# ============================================================================
+# Builds each index type on a synthetic clustered corpus of MiniLM-sized
+# vectors and compares it with the exact flat index: build time, recall@k,
+# and single-query latency (as the /search endpoint issues them) across the
+# nprobe / efSearch settings.
+# Run with: python tests/benchmark_vector_index.py [--documents 100000] [--queries 500] [--k 5]
+import argparse
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'knowledge-ingestion'))
+
+from ann_index import IndexSettings, build_index, tune_index
+
+
+def synthetic_corpus(documents, queries, dimension, clusters, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(clusters, dimension))
+
+    def sample(n):
+        labels = rng.integers(0, clusters, size=n)
+        vectors = centers[labels] + 0.5 * rng.normal(size=(n, dimension))
+        # Sentence embeddings are normalized
+        return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype('float32')
+
+    return sample(documents), sample(queries)
+
+
+def measure(label, index, queries, truth, k):
+    latencies = []
+    found = []
+    for query in queries:
+        started = time.perf_counter()
+        _, ids = index.search(query[None, :], k)
+        latencies.append(time.perf_counter() - started)
+        found.append(ids[0])
+    recall = np.mean([len(set(t) & set(f)) / k for t, f in zip(truth, found)])
+    p50, p95 = np.percentile(latencies, [50, 95]) * 1000
+    print(f"{label:<32} {recall:>8.3f} {p50:>10.3f} {p95:>10.3f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--documents", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--dimension", type=int, default=384)
+    parser.add_argument("--clusters", type=int, default=200)
+    parser.add_argument("--k", type=int, default=5)
+    args = parser.parse_args()
+
+    corpus, queries = synthetic_corpus(args.documents, args.queries, args.dimension, args.clusters)
+    sweeps = {
+        "flat": [IndexSettings(index_type="flat")],
+        "ivf_flat": [IndexSettings(index_type="ivf_flat", nprobe=n) for n in (1, 4, 8, 16, 32, 64)],
+        "ivf_pq": [IndexSettings(index_type="ivf_pq", nprobe=n) for n in (4, 8, 16, 32, 64)],
+        "hnsw": [IndexSettings(index_type="hnsw", ef_search=ef) for ef in (16, 32, 64, 128, 256)],
+    }
+
+    truth = None
+    print(f"{args.documents} documents, {args.queries} queries, dimension {args.dimension}, k={args.k}\n")
+    print(f"{'index':<32} {'recall':>8} {'p50 ms':>10} {'p95 ms':>10}")
+    for index_type, settings_list in sweeps.items():
+        started = time.perf_counter()
+        index = build_index(settings_list[0], args.dimension, corpus)
+        print(f"-- {index_type}: built in {time.perf_counter() - started:.1f}s")
+        if truth is None:
+            _, truth = index.search(queries, args.k)
+        for settings in settings_list:
+            tune_index(index, settings)
+            knob = {
+                "ivf_flat": f"nprobe={settings.nprobe}",
+                "ivf_pq": f"nprobe={settings.nprobe}",
+                "hnsw": f"efSearch={settings.ef_search}",
+            }.get(index_type, "exact")
+            measure(f"{index_type} ({knob})", index, queries, truth, args.k)
+
+
+if __name__ == "__main__":
+    main()
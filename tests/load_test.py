@@ -2,7 +2,8 @@
 # TESTING - LOAD TESTS (tests/load_test.py)
 # ============================================================================
 # Run with: locust -f tests/load_test.py --host=http://localhost:8000
-from locust import HttpUser, task, between
+# Compare runs (e.g. before/after a change) with the latency summary printed at the end
+from locust import HttpUser, task, between, events
 import random
 
 class ChatbotUser(HttpUser):
@@ -60,4 +61,16 @@ class ChatbotUser(HttpUser):
                 "session_id": self.session_id
             },
             headers={"Authorization": f"Bearer {self.token}"}
-        )
\ No newline at end of file
+        )
+
+@events.test_stop.add_listener
+def print_latency_summary(environment, **kwargs):
+    """Print p50/p95/p99 per endpoint so runs can be compared side by side"""
+    print(f"{'endpoint':<30} {'requests':>9} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for (method, name), entry in sorted(environment.stats.entries.items()):
+        print(
+            f"{method + ' ' + name:<30} {entry.num_requests:>9} "
+            f"{entry.get_response_time_percentile(0.5):>8.0f} "
+            f"{entry.get_response_time_percentile(0.95):>8.0f} "
+            f"{entry.get_response_time_percentile(0.99):>8.0f}"
+        )
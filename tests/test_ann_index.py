@@ -0,0 +1,59 @@
+# ============================================================================
+# TESTING - KNOWLEDGE BASE ANN INDEXES (tests/test_ann_index.py)
+# ============================================================================
+import os
+import sys
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'knowledge-ingestion'))
+
+from ann_index import IndexSettings, build_index, index_type_of
+
+DIMENSION = 32
+
+
+def clustered_corpus(n, seed=0):
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(20, DIMENSION))
+    labels = rng.integers(0, len(centers), size=n)
+    return (centers[labels] + 0.3 * rng.normal(size=(n, DIMENSION))).astype('float32')
+
+
+def recall_at(index, corpus, queries, k=10):
+    exact = build_index(IndexSettings(index_type="flat"), DIMENSION, corpus)
+    _, truth = exact.search(queries, k)
+    _, found = index.search(queries, k)
+    return np.mean([len(set(t) & set(f)) / k for t, f in zip(truth, found)])
+
+
+def test_auto_switches_to_ann_past_threshold():
+    settings = IndexSettings(index_type="auto", ann_type="hnsw", ann_threshold=1000)
+    assert settings.resolve(1000) == "flat"
+    assert settings.resolve(1001) == "hnsw"
+    assert index_type_of(build_index(settings, DIMENSION, clustered_corpus(500))) == "flat"
+    assert index_type_of(build_index(settings, DIMENSION, clustered_corpus(1500))) == "hnsw"
+
+
+def test_ivf_stays_flat_until_it_can_be_trained():
+    settings = IndexSettings(index_type="ivf_pq", pq_m=8, pq_bits=8)
+    assert settings.resolve(100) == "flat"
+    assert settings.resolve(5000) == "ivf_pq"
+    assert settings.nlist_for(10000) == 256  # min(4 * sqrt(n), n // 39)
+    assert index_type_of(build_index(settings, DIMENSION)) == "flat"
+
+
+@pytest.mark.parametrize("index_type", ["ivf_flat", "ivf_pq", "hnsw"])
+def test_ann_indexes_keep_recall(index_type):
+    corpus = clustered_corpus(4000)
+    queries = clustered_corpus(50, seed=1)
+    settings = IndexSettings(index_type=index_type, nprobe=16, pq_m=8, ef_search=64)
+    index = build_index(settings, DIMENSION, corpus)
+    assert index_type_of(index) == index_type
+    assert index.ntotal == len(corpus)
+    assert recall_at(index, corpus, queries) >= (0.5 if index_type == "ivf_pq" else 0.9)
+
+
+def test_rejects_unknown_index_type():
+    with pytest.raises(ValueError):
+        IndexSettings(index_type="annoy")
@@ -0,0 +1,79 @@
+# ============================================================================
+# TESTING - MICRO-BATCHING (tests/test_batching.py)
+# ============================================================================
+import asyncio
+import os
+import sys
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'nlu'))
+
+from batching import MicroBatcher
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_a_batch():
+    """Concurrent submissions are grouped and each caller gets its own result"""
+    seen_batches = []
+
+    def double(items):
+        seen_batches.append(list(items))
+        return [item * 2 for item in items]
+
+    batcher = MicroBatcher(double, max_batch_size=8, max_wait_ms=50, name="test_share")
+    await batcher.start()
+    try:
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(5)))
+    finally:
+        await batcher.stop()
+
+    assert results == [0, 2, 4, 6, 8]
+    assert seen_batches == [[0, 1, 2, 3, 4]]
+
+
+@pytest.mark.asyncio
+async def test_max_batch_size_is_respected():
+    """No batch exceeds the configured size"""
+    sizes = []
+
+    def identity(items):
+        sizes.append(len(items))
+        return items
+
+    batcher = MicroBatcher(identity, max_batch_size=3, max_wait_ms=20, name="test_size")
+    await batcher.start()
+    try:
+        results = await asyncio.gather(*(batcher.submit(i) for i in range(7)))
+    finally:
+        await batcher.stop()
+
+    assert results == list(range(7))
+    assert max(sizes) <= 3
+    assert sum(sizes) == 7
+
+
+@pytest.mark.asyncio
+async def test_batch_errors_reach_every_caller():
+    """A failing batch function raises in every waiting request"""
+    def fail(items):
+        raise ValueError("model exploded")
+
+    batcher = MicroBatcher(fail, max_batch_size=4, max_wait_ms=20, name="test_error")
+    await batcher.start()
+    try:
+        results = await asyncio.gather(
+            *(batcher.submit(i) for i in range(3)),
+            return_exceptions=True
+        )
+    finally:
+        await batcher.stop()
+
+    assert all(isinstance(r, ValueError) for r in results)
+
+
+@pytest.mark.asyncio
+async def test_submit_requires_running_batcher():
+    """Submitting before start is an error rather than a hang"""
+    batcher = MicroBatcher(lambda items: items, name="test_stopped")
+    with pytest.raises(RuntimeError):
+        await batcher.submit(1)
@@ -0,0 +1,59 @@
+# ============================================================================
+# TESTING - DOCUMENT CHUNKING (tests/test_chunking.py)
+# ============================================================================
+import os
+import sys
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'knowledge-ingestion'))
+
+from chunking import Chunker, Section, chunk_document
+
+
+def count_words(text):
+    return len(text.split())
+
+
+def test_chunks_fit_budget_and_overlap():
+    sentences = [f"Sentence {i} has five words." for i in range(20)]
+    chunker = Chunker(count_words, chunk_tokens=20, overlap_tokens=5)
+    chunks = chunker.split([Section("Returns", " ".join(sentences))])
+
+    assert len(chunks) > 1
+    for chunk in chunks:
+        assert chunk.text.startswith("Returns\n")
+        assert count_words(chunk.text) <= 20
+    # The last sentence of a chunk opens the next one
+    for previous, current in zip(chunks, chunks[1:]):
+        last_sentence = previous.text.rsplit(". ", 1)[-1]
+        assert current.text.split("\n", 1)[1].startswith(last_sentence)
+    assert [chunk.index for chunk in chunks] == list(range(len(chunks)))
+
+
+def test_sections_are_not_merged_and_long_sentences_are_split():
+    chunker = Chunker(count_words, chunk_tokens=10, overlap_tokens=2)
+    chunks = chunker.split([
+        Section("Shipping", "Ships in three days."),
+        Section(None, " ".join(["word"] * 25)),
+    ])
+    assert chunks[0].text == "Shipping\nShips in three days."
+    assert all(count_words(chunk.text) <= 10 for chunk in chunks[1:])
+    assert sum(count_words(chunk.text) for chunk in chunks[1:]) >= 25
+
+
+def test_chunk_document_links_chunks_to_parent():
+    chunker = Chunker(count_words, chunk_tokens=8, overlap_tokens=0)
+    parent = {"id": "manual.pdf", "title": "Manual", "content": "", "category": "docs", "metadata": {"filename": "manual.pdf"}}
+
+    short = chunk_document(parent, [Section(None, "One short line.")], chunker)
+    assert short == [parent]
+
+    records = chunk_document(parent, [Section("Setup", "Plug it in. Turn it on. Wait for the light.")], chunker)
+    assert [r["id"] for r in records] == ["manual.pdf#0", "manual.pdf#1"]
+    assert all(r["parent_id"] == "manual.pdf" for r in records)
+    assert records[1]["metadata"] == {"filename": "manual.pdf", "chunk": 1, "heading": "Setup"}
+
+
+def test_rejects_overlap_as_large_as_chunk():
+    with pytest.raises(ValueError):
+        Chunker(count_words, chunk_tokens=10, overlap_tokens=10)
@@ -0,0 +1,61 @@
+# ============================================================================
+# TESTING - MEMORY-MAPPED DOCUMENT STORE (tests/test_document_store.py)
+# ============================================================================
+import glob
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'knowledge-ingestion'))
+
+from document_store import DocumentStore
+
+
+def doc(doc_id, content):
+    return {"id": doc_id, "title": doc_id, "content": content, "category": "faq", "metadata": {}}
+
+
+def test_checkpointed_documents_are_read_from_disk(tmp_path):
+    path = str(tmp_path / "documents")
+    store = DocumentStore(path)
+    for vector_id, name in enumerate(["alpha", "beta", "gamma"]):
+        store.put(vector_id, doc(name, f"{name} content"))
+    store.remove(1)
+    snapshot = store.snapshot()
+    store.write(snapshot, 1)
+    store.swap(snapshot, 1)
+
+    assert store._added == {} and store._removed == set()
+    assert store.get(2) == doc("gamma", "gamma content")
+    assert store.get(1) is None and 1 not in store
+
+    reopened = DocumentStore(path)
+    reopened.open(1)
+    assert reopened.get(0) == doc("alpha", "alpha content")
+    assert list(reopened._rows['vector_id']) == [0, 2]
+
+
+def test_changes_during_a_checkpoint_stay_in_the_overlay(tmp_path):
+    path = str(tmp_path / "documents")
+    store = DocumentStore(path)
+    store.put(0, doc("alpha", "v1"))
+    store.put(1, doc("beta", "v1"))
+    snapshot = store.snapshot()
+
+    # Arrive while the snapshot is being written
+    store.remove(0)
+    store.put(2, doc("gamma", "v1"))
+
+    store.write(snapshot, 1)
+    store.swap(snapshot, 1)
+    assert store.get(0) is None
+    assert store.get(1) == doc("beta", "v1")
+    assert store.get(2) == doc("gamma", "v1")
+
+    snapshot = store.snapshot()
+    store.write(snapshot, 2)
+    store.swap(snapshot, 2)
+    store.remove_other_generations(2)
+    assert sorted(os.path.basename(p) for p in glob.glob(path + ".*")) == [
+        "documents.00000002", "documents.00000002.rows"
+    ]
+    assert list(store._rows['vector_id']) == [1, 2]
@@ -0,0 +1,83 @@
+# ============================================================================
+# TESTING - GATEWAY TOKEN VERIFICATION (tests/test_gateway_auth.py)
+# ============================================================================
+import os
+import sys
+import time
+import jwt
+import pytest
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from gateway.auth import TokenVerifier
+
+SECRET = "test-secret"
+
+
+def make_token(exp_in: float = 3600, key=SECRET, algorithm="HS256", **claims):
+    payload = {"user_id": "test_user", "exp": int(time.time() + exp_in), **claims}
+    return jwt.encode(payload, key, algorithm=algorithm)
+
+
+def test_verified_claims_are_cached():
+    """A reused token is only decoded once"""
+    verifier = TokenVerifier(secret_key=SECRET)
+    token = make_token()
+
+    decodes = []
+    original = verifier._decode
+    verifier._decode = lambda t: decodes.append(t) or original(t)
+
+    assert verifier.verify(token)["user_id"] == "test_user"
+    assert verifier.verify(token)["user_id"] == "test_user"
+    assert len(decodes) == 1
+
+
+def test_cache_never_outlives_token_expiry():
+    """Cached claims expire with the token"""
+    verifier = TokenVerifier(secret_key=SECRET, cache_ttl=3600)
+    token = make_token(exp_in=1)
+
+    verifier.verify(token)
+    time.sleep(1.1)
+    with pytest.raises(jwt.ExpiredSignatureError):
+        verifier.verify(token)
+
+
+def test_invalid_tokens_are_rejected():
+    """Tokens signed with another key fail verification"""
+    verifier = TokenVerifier(secret_key=SECRET)
+    with pytest.raises(jwt.InvalidTokenError):
+        verifier.verify(make_token(key="other-secret"))
+
+
+def test_cache_is_bounded():
+    """The least recently used entries are evicted past cache_size"""
+    verifier = TokenVerifier(secret_key=SECRET, cache_size=2)
+    for i in range(5):
+        verifier.verify(make_token(session=i))
+    assert len(verifier._cache) == 2
+
+
+def test_asymmetric_public_key():
+    """RS256 tokens verify against a configured public key"""
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    public_pem = private_key.public_key().public_bytes(
+        serialization.Encoding.PEM,
+        serialization.PublicFormat.SubjectPublicKeyInfo
+    ).decode()
+
+    verifier = TokenVerifier(algorithms=["RS256"], public_key=public_pem)
+    token = make_token(key=private_key, algorithm="RS256")
+    assert verifier.verify(token)["user_id"] == "test_user"
+
+
+def test_single_key_rejects_mixed_key_types():
+    """One key cannot verify algorithms from different families"""
+    with pytest.raises(ValueError):
+        TokenVerifier(secret_key=SECRET, algorithms=["HS256", "RS256"])
+
+    verifier = TokenVerifier(secret_key=SECRET, algorithms=["HS256", "HS512"])
+    assert verifier.verify(make_token(algorithm="HS512"))["user_id"] == "test_user"
@@ -0,0 +1,101 @@
+# ============================================================================
+# TESTING - BULK INGESTION JOBS (tests/test_ingestion_jobs.py)
+# ============================================================================
+import io
+import json
+import os
+import sys
+import tarfile
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'knowledge-ingestion'))
+
+from chunking import Chunker, Section
+from jobs import JobManager, iter_jsonl, iter_upload
+
+
+def count_words(text):
+    return len(text.split())
+
+
+def extract_text(filename, content):
+    if filename.endswith(".bin"):
+        raise ValueError("unsupported file")
+    return [Section(None, content.decode("utf-8"))]
+
+
+def jsonl(*docs):
+    return "\n".join(json.dumps(doc) for doc in docs).encode() + b"\n"
+
+
+def test_iter_jsonl_reports_bad_lines():
+    lines = jsonl({"id": 1, "content": "Refunds take 5 days."}, {"title": "no id"}).splitlines() + [b"{oops"]
+    items = list(iter_jsonl(lines, "faq"))
+
+    assert items[0] == {"id": "1", "title": "1", "content": "Refunds take 5 days.", "category": "faq", "metadata": {}}
+    assert [item["id"] for item in items[1:]] == ["line 2", "line 3"]
+    assert all("error" in item for item in items[1:])
+
+
+def test_iter_upload_reads_tar_members_and_removes_spool(tmp_path):
+    path = tmp_path / "upload"
+    with tarfile.open(path, "w:gz") as archive:
+        for name, data in [("docs/faq.jsonl", jsonl({"id": "a", "content": "x"})), ("docs/guide.txt", b"Guide")]:
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            archive.addfile(info, io.BytesIO(data))
+
+    items = list(iter_upload(str(path), "kb.tar.gz", "manuals"))
+
+    assert items[0]["id"] == "a" and items[0]["category"] == "manuals"
+    assert items[1] == {"id": "docs/guide.txt", "filename": "docs/guide.txt", "file_content": b"Guide", "category": "manuals"}
+    assert not path.exists()
+
+
+@pytest.mark.asyncio
+async def test_job_indexes_in_windows_and_records_failures():
+    indexed = []
+    notified = []
+
+    async def on_indexed():
+        notified.append(len(indexed))
+
+    def index(records):
+        indexed.append(records)
+        return {"added": len(records), "updated": 0, "unchanged": 0, "removed": 0, "embedded": len(records)}
+
+    manager = JobManager(Chunker(count_words, chunk_tokens=8, overlap_tokens=2), extract_text, index,
+                         on_indexed=on_indexed, window=2)
+    items = [
+        {"id": "short", "title": "Short", "content": "Ships in three days.", "category": "faq", "metadata": {}},
+        {"id": "long", "title": "Long", "content": "One two three four five. " * 4, "category": "faq", "metadata": {}},
+        {"id": "guide.txt", "filename": "guide.txt", "file_content": b"A plain guide.", "category": "faq"},
+        {"id": "blob.bin", "filename": "blob.bin", "file_content": b"\x00", "category": "faq"},
+        {"id": "line 5", "error": "Invalid document"},
+    ]
+    job = manager.submit(iter(items), "test", total=len(items))
+    await manager._tasks[job.id]
+    await manager.shutdown()
+
+    status = job.as_dict()
+    assert status["status"] == "completed"
+    assert (status["documents_seen"], status["documents_indexed"], status["documents_failed"]) == (5, 3, 2)
+    assert [error["id"] for error in status["errors"]] == ["blob.bin", "line 5"]
+    assert [len(window) for window in indexed] == [1 + 4, 1]
+    assert status["chunks_indexed"] == 6
+    assert notified == [1, 2]
+    assert indexed[1][0]["id"] == "guide.txt"
+
+
+@pytest.mark.asyncio
+async def test_failed_index_window_fails_its_documents():
+    def index(records):
+        raise RuntimeError("disk full")
+
+    manager = JobManager(Chunker(count_words), extract_text, index)
+    job = manager.submit(iter([{"id": "a", "title": "A", "content": "x", "category": "faq", "metadata": {}}]), "test")
+    await manager._tasks[job.id]
+    await manager.shutdown()
+
+    assert job.status == "failed"
+    assert job.failed == 1 and job.indexed == 0
@@ -0,0 +1,84 @@
+# ============================================================================
+# TESTING - LLM CLIENT REGISTRY (tests/test_llm_registry.py)
+# ============================================================================
+import json
+import os
+import sys
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'llm'))
+
+from LLMStrategies.registry import LLMRegistry, load_llm_config
+
+
+class StubStrategy:
+    builds = []
+
+    def __init__(self, service, config):
+        self.service = service
+        self.config = config
+
+    def initialize(self):
+        if self.config.get("fail"):
+            raise RuntimeError("missing credentials")
+        StubStrategy.builds.append(self.service)
+        return {"service": self.service, **self.config}
+
+
+@pytest.fixture(autouse=True)
+def reset_builds():
+    StubStrategy.builds = []
+
+
+def make_registry(config_holder):
+    return LLMRegistry(StubStrategy, lambda: config_holder["config"])
+
+
+def test_clients_are_built_once_and_reused():
+    holder = {"config": {"default": "openai", "backends": {"openai": {"temperature": 0.3}}}}
+    registry = make_registry(holder)
+    registry.reload()
+
+    assert registry.get() is registry.get()
+    assert StubStrategy.builds == ["openai"]
+
+
+def test_reload_rebuilds_only_changed_backends():
+    holder = {"config": {"default": "openai", "backends": {"openai": {"t": 0.3}, "llama": {"t": 0}}}}
+    registry = make_registry(holder)
+    registry.reload()
+    llama = registry.get("llama")
+
+    holder["config"] = {"default": "llama", "backends": {"openai": {"t": 0.7}, "llama": {"t": 0}}}
+    outcome = registry.reload()
+
+    assert outcome == {"openai": "initialized", "llama": "unchanged"}
+    assert registry.get("llama") is llama
+    assert registry.get("openai")["t"] == 0.7
+    assert registry.default == "llama"
+
+
+def test_failed_reload_keeps_previous_client():
+    holder = {"config": {"default": "openai", "backends": {"openai": {"t": 0.3}}}}
+    registry = make_registry(holder)
+    registry.reload()
+    previous = registry.get()
+
+    holder["config"] = {"default": "openai", "backends": {"openai": {"t": 0.5, "fail": True}}}
+    assert registry.reload() == {"openai": "failed"}
+    assert registry.get() is previous
+
+    # A backend that never initialized cannot be served, so startup fails loudly
+    holder["config"] = {"default": "gemini", "backends": {"gemini": {"fail": True}}}
+    with pytest.raises(RuntimeError):
+        make_registry(holder).reload()
+
+
+def test_load_llm_config_from_file(tmp_path):
+    default = load_llm_config(None, "azure_openai", {"max_tokens": 3000})
+    assert default == {"default": "azure_openai", "backends": {"azure_openai": {"max_tokens": 3000}}}
+
+    path = tmp_path / "llm.json"
+    path.write_text(json.dumps({"default": "llama", "backends": {"openai": {}}}))
+    with pytest.raises(ValueError):
+        load_llm_config(str(path), "azure_openai", {})
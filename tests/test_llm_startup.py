@@ -0,0 +1,36 @@
+# ============================================================================
+# TESTING - LLM LAZY RESOURCES AND STARTUP REPORT (tests/test_llm_startup.py)
+# ============================================================================
+import os
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from llm.startup import LazyResource, StartupReport
+
+
+def test_lazy_resource_loads_once_on_first_use():
+    report = StartupReport()
+    loads = []
+    resource = LazyResource("model", lambda: loads.append(1) or object(), report)
+
+    assert not resource.loaded and loads == []
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        values = list(pool.map(lambda _: resource.get(), range(32)))
+
+    assert len(loads) == 1
+    assert all(value is values[0] for value in values)
+    assert [p["phase"] for p in report.phases] == ["load model"]
+
+
+def test_startup_report_lists_phases():
+    report = StartupReport()
+    with report.phase("import fastapi"):
+        pass
+    report.mark_ready()
+
+    summary = report.as_dict()
+    assert summary["phases"][0]["phase"] == "import fastapi"
+    assert summary["ready_after_seconds"] >= summary["phases"][0]["seconds"]
+    assert "ready after" in report.format()
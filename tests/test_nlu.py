@@ -1,10 +1,12 @@
 # ============================================================================
 # TESTING - UNIT TESTS (tests/test_nlu.py)
 # ============================================================================
+import os
 import pytest
 from fastapi.testclient import TestClient
 import sys
 sys.path.append('..')
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'nlu'))
 
 @pytest.fixture
 def nlu_client():
@@ -48,4 +50,20 @@ def test_nlu_endpoint(nlu_client):
     data = response.json()
     assert 'intent' in data
     assert 'confidence' in data
-    assert 'entities' in data
\ No newline at end of file
+    assert 'entities' in data
+
+
+def test_backend_parity_report():
+    """Parity report flags diverging backends"""
+    import numpy as np
+    from inference import compare_logits
+    
+    reference = np.array([[2.0, 0.5, -1.0], [0.1, 0.3, 0.2]])
+    
+    same = compare_logits(reference, reference.copy())
+    assert same["max_prob_diff"] < 1e-9
+    assert same["argmax_agreement"] == 1.0
+    
+    drifted = compare_logits(reference, reference[:, ::-1].copy())
+    assert drifted["max_prob_diff"] > 0.1
+    assert drifted["argmax_agreement"] < 1.0
@@ -0,0 +1,58 @@
+# ============================================================================
+# TESTING - LLM PROMPT BUILDER (tests/test_prompt_builder.py)
+# ============================================================================
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from llm.prompt_builder import STATIC_PREFIX, PromptBuilder, TokenCounter
+
+
+def word_counter():
+    """One token per whitespace-separated word keeps budgets easy to reason about"""
+    return TokenCounter(encode=lambda text: text.split(), decode=lambda tokens: " ".join(tokens))
+
+
+CONTEXT = {
+    "user_profile": {"name": "Ada", "tier": "premium"},
+    "conversation_history": {"messages": [
+        {"message": f"question {i}", "response": f"answer {i}"} for i in range(5)
+    ]},
+}
+DOCS = [f"doc{i} " + "word " * 40 for i in range(5)]
+
+
+def test_prompt_starts_with_static_prefix_and_ends_with_message():
+    builder = PromptBuilder(word_counter(), input_budget=10000)
+    prompt, tokens = builder.build("Where is my order?", CONTEXT, DOCS, "order_status")
+
+    assert prompt.startswith(STATIC_PREFIX)
+    assert prompt.endswith("Current User Message: Where is my order?\n\nResponse:")
+    assert all(doc.strip() in prompt for doc in DOCS)
+    # Only the configured number of most recent turns
+    assert "question 1" not in prompt and "question 2" in prompt and "question 4" in prompt
+    assert tokens == len(prompt.split())
+
+
+def test_prompt_fits_budget_keeping_top_docs_and_newest_turns():
+    builder = PromptBuilder(word_counter(), input_budget=200, min_section_tokens=8)
+    prompt, tokens = builder.build("Where is my order?", CONTEXT, DOCS, "order_status")
+
+    assert tokens <= 200
+    assert "doc0" in prompt
+    assert "doc4" not in prompt
+    assert "question 4" in prompt
+
+
+def test_long_message_is_truncated():
+    builder = PromptBuilder(word_counter(), input_budget=1000, max_message_tokens=5)
+    prompt, _ = builder.build("one two three four five six seven", {}, [])
+    assert "one two three four five\n" in prompt
+    assert "six" not in prompt
+
+
+def test_fallback_counter_estimates_without_tokenizer():
+    counter = TokenCounter()
+    assert counter.count("x" * 40) == 10
+    assert counter.truncate("x" * 40, 2) == "xxxxxxxx"
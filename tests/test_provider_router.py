@@ -0,0 +1,123 @@
+# ============================================================================
+# TESTING - LLM PROVIDER ROUTING (tests/test_provider_router.py)
+# ============================================================================
+import asyncio
+import os
+import sys
+import time
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from llm.provider_router import NoProviderAvailable, ProviderRouter
+
+
+class StubLLM:
+    """Stands in for a LangChain chat model"""
+
+    def __init__(self, name, delay=0.0, fail=False):
+        self.name = name
+        self.delay = delay
+        self.fail = fail
+        self.calls = 0
+
+    async def ainvoke(self, prompt):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError(f"{self.name} unavailable")
+        return f"{self.name}: answer"
+
+    async def astream(self, prompt):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        if self.fail:
+            raise RuntimeError(f"{self.name} unavailable")
+        for token in (self.name, ": ", "answer"):
+            yield token
+
+
+def make_router(clients, **options):
+    return ProviderRouter(clients.__getitem__, lambda: list(clients), **options)
+
+
+@pytest.mark.asyncio
+async def test_failover_and_circuit_breaker():
+    clients = {"azure_openai": StubLLM("azure_openai", fail=True), "openai": StubLLM("openai")}
+    router = make_router(clients, breaker_failures=2)
+
+    for _ in range(2):
+        assert await router.ainvoke("prompt") == ("openai: answer", "openai")
+
+    # The failing provider's circuit is open, so it is no longer tried
+    assert router.candidates("invoke") == ["openai"]
+    await router.ainvoke("prompt")
+    assert clients["azure_openai"].calls == 2
+
+
+@pytest.mark.asyncio
+async def test_all_providers_failing_raises():
+    router = make_router({"a": StubLLM("a", fail=True), "b": StubLLM("b", fail=True)})
+    with pytest.raises(NoProviderAvailable):
+        await router.ainvoke("prompt")
+
+
+@pytest.mark.asyncio
+async def test_timeout_fails_over():
+    clients = {"slow": StubLLM("slow", delay=1.0), "fast": StubLLM("fast")}
+    router = make_router(clients, timeout=0.05)
+    assert (await router.ainvoke("prompt"))[1] == "fast"
+
+
+@pytest.mark.asyncio
+async def test_hedged_request_to_backup_wins_when_primary_lags():
+    clients = {"primary": StubLLM("primary", delay=1.0), "backup": StubLLM("backup", delay=0.01)}
+    router = make_router(clients, hedging=True, hedge_max_delay=0.05)
+
+    started = time.monotonic()
+    result, provider = await router.ainvoke("prompt")
+
+    assert provider == "backup"
+    assert time.monotonic() - started < 0.5
+    assert clients["primary"].calls == 1
+
+
+@pytest.mark.asyncio
+async def test_stream_fails_over_before_first_token():
+    clients = {"primary": StubLLM("primary", delay=1.0), "backup": StubLLM("backup")}
+    router = make_router(clients, first_token_timeout=0.05)
+
+    tokens = [token async for token in router.astream("prompt")]
+    assert "".join(tokens) == "backup: answer"
+
+
+@pytest.mark.asyncio
+async def test_stream_error_after_first_token_counts_once():
+    class BrokenStream(StubLLM):
+        async def astream(self, prompt):
+            yield "partial"
+            raise RuntimeError("connection dropped")
+
+    router = make_router({"primary": BrokenStream("primary")})
+    with pytest.raises(RuntimeError):
+        async for _ in router.astream("prompt"):
+            pass
+    # Recorded as a success at the first token, not also as a failure
+    assert router.stats("primary").breaker.failure_count == 0
+
+
+def test_latency_aware_selection_prefers_much_faster_provider():
+    router = make_router({"primary": StubLLM("primary"), "backup": StubLLM("backup")})
+    assert router.candidates("invoke") == ["primary", "backup"]
+
+    for _ in range(5):
+        router.stats("primary").observe("invoke", 3.0)
+        router.stats("backup").observe("invoke", 1.0)
+    assert router.candidates("invoke") == ["backup", "primary"]
+
+    # p95-derived hedge delay, clamped to the configured bounds
+    assert router.hedge_delay("primary", "invoke") == router.hedge_max_delay  # too few samples
+    router.hedge_min_samples = 5
+    assert router.hedge_delay("primary", "invoke") == 3.0
+    router.hedge_max_delay = 2.0
+    assert router.hedge_delay("primary", "invoke") == 2.0
@@ -0,0 +1,183 @@
+# ============================================================================
+# TESTING - RATE LIMITING (tests/test_rate_limiter.py)
+# ============================================================================
+import asyncio
+import os
+import sys
+import time
+import fakeredis.aioredis
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from middleware.rate_limiter import (
+    SLIDING_WINDOW_COUNTER, SLIDING_WINDOW_LOG, TOKEN_BUCKET, LocalRejectCache, RateLimiter, TokenLeaseCache
+)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Fixes the time Redis reports to the scripts (TIME); advance with clock.now += seconds"""
+    class Clock:
+        now = 6000.0  # a multiple of every window below
+
+    monkeypatch.setattr(time, "time", lambda: Clock.now)
+    return Clock
+
+
+def limiter(algorithm, limit, window, **kwargs):
+    return RateLimiter(fakeredis.aioredis.FakeRedis(), algorithm=algorithm, limit=limit, window=window, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_sliding_log_admits_up_to_limit(clock):
+    rl = limiter(SLIDING_WINDOW_LOG, 3, 10, local_precheck=False)
+    for _ in range(3):
+        assert (await rl.hit("user")).allowed
+        clock.now += 1
+
+    rejected = await rl.hit("user")
+    assert not rejected.allowed
+    assert rejected.retry_after == 7  # the first request leaves the window at 6010
+
+    clock.now = 6010.001
+    assert (await rl.hit("user")).allowed
+
+
+@pytest.mark.asyncio
+async def test_sliding_counter_retry_after_follows_previous_window_decay(clock):
+    rl = limiter(SLIDING_WINDOW_COUNTER, 10, 60, local_precheck=False)
+    clock.now = 5940.0
+    assert all([(await rl.hit("user")).allowed for _ in range(10)])
+    full = await rl.hit("user")
+    assert not full.allowed and full.retry_after == 60
+
+    # A full previous window weighs 10 at the start of this one and decays to 9 after 6s
+    clock.now = 6000.0
+    rejected = await rl.hit("user")
+    assert not rejected.allowed and rejected.retry_after == 6
+
+    clock.now = 6006.001
+    assert (await rl.hit("user")).allowed
+
+
+@pytest.mark.asyncio
+async def test_token_bucket_refills_over_window(clock):
+    rl = limiter(TOKEN_BUCKET, 2, 10, local_precheck=False)
+    assert (await rl.hit("user")).allowed
+    assert (await rl.hit("user")).remaining == 0
+
+    rejected = await rl.hit("user")
+    assert not rejected.allowed and rejected.retry_after == 5
+
+    clock.now += 5
+    assert (await rl.hit("user")).allowed
+
+
+@pytest.mark.asyncio
+async def test_tiers_get_their_limits_and_unknown_tiers_share_default(clock):
+    rl = limiter(TOKEN_BUCKET, 2, 60, tier_limits={"pro": (5, 60)}, local_precheck=False)
+
+    assert sum([(await rl.hit("user", "pro")).allowed for _ in range(6)]) == 5
+    # Naming a new tier per request must not open a fresh bucket
+    assert sum([(await rl.hit("other", f"tier-{i}")).allowed for i in range(4)]) == 2
+    assert rl.key_for("other", "tier-1") == rl.key_for("other")
+
+
+@pytest.mark.asyncio
+async def test_rejections_are_then_decided_locally(clock):
+    rl = limiter(SLIDING_WINDOW_COUNTER, 1, 60)
+    assert (await rl.hit("user")).allowed
+    assert not (await rl.hit("user")).allowed
+
+    # Redis would admit again, but the local cache remembers the rejection
+    await rl.redis.flushall()
+    blocked = await rl.hit("user")
+    assert not blocked.allowed and blocked.retry_after > 0
+    assert (await rl.hit("someone-else")).allowed
+
+
+def test_local_reject_cache_expires_and_stays_bounded():
+    cache = LocalRejectCache(max_entries=4)
+    cache.block("gone", 0.0)
+    assert cache.retry_after("gone") == 0.0
+
+    for i in range(10):
+        cache.block(f"user-{i}", 60 + i)
+    assert len(cache._blocked_until) <= 4
+    assert cache.retry_after("user-9") > 60
+
+
+class SharedBucket:
+    """Stands in for the Redis bucket that several replicas lease from"""
+
+    def __init__(self, tokens: int, delay: float = 0.0):
+        self.tokens = tokens
+        self.delay = delay
+        self.calls = 0
+
+    async def lease(self, key, requested, limit, window):
+        self.calls += 1
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        granted = min(requested, self.tokens)
+        self.tokens -= granted
+        return granted, self.tokens, 0 if granted else 1000
+
+
+@pytest.mark.asyncio
+async def test_most_decisions_are_local():
+    """Requests are served from leased slices, one round trip per lease"""
+    bucket = SharedBucket(tokens=1000)
+    cache = TokenLeaseCache(bucket.lease, lease_size=20, lease_ttl=60)
+
+    results = [await cache.acquire("user", 1000, 60) for _ in range(100)]
+    await asyncio.sleep(0)
+
+    assert all(r.allowed for r in results)
+    assert bucket.calls <= 100 // 20 + 2
+
+
+@pytest.mark.asyncio
+async def test_replicas_never_exceed_global_quota_without_over_admit():
+    """Two replicas sharing one bucket admit no more than the bucket holds"""
+    bucket = SharedBucket(tokens=50)
+    replicas = [TokenLeaseCache(bucket.lease, lease_size=8, lease_ttl=60) for _ in range(2)]
+
+    admitted = 0
+    for i in range(200):
+        result = await replicas[i % 2].acquire("user", 50, 60)
+        admitted += result.allowed
+
+    assert admitted == 50
+
+
+@pytest.mark.asyncio
+async def test_over_admission_is_bounded_per_replica():
+    """Requests admitted on credit during a slow refill stay within max_over_admit"""
+    bucket = SharedBucket(tokens=12, delay=0.05)
+    cache = TokenLeaseCache(bucket.lease, lease_size=5, lease_ttl=60, max_over_admit=3)
+
+    # Bursts keep arriving while refills are in flight
+    admitted = 0
+    for _ in range(6):
+        burst = await asyncio.gather(*(cache.acquire("user", 12, 60) for _ in range(10)))
+        admitted += sum(r.allowed for r in burst)
+
+    assert admitted > 12
+    assert admitted <= 12 + 3
+
+
+@pytest.mark.asyncio
+async def test_empty_bucket_is_remembered_locally():
+    """Once Redis reports an empty bucket, rejections need no round trip"""
+    bucket = SharedBucket(tokens=0)
+    cache = TokenLeaseCache(bucket.lease, lease_size=5, lease_ttl=60)
+
+    first = await cache.acquire("user", 5, 60)
+    calls = bucket.calls
+    second = await cache.acquire("user", 5, 60)
+
+    assert not first.allowed and not second.allowed
+    assert second.retry_after > 0
+    assert bucket.calls == calls
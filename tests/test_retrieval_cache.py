@@ -0,0 +1,52 @@
+# ============================================================================
+# TESTING - LLM RETRIEVAL CACHE (tests/test_retrieval_cache.py)
+# ============================================================================
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from llm.retrieval_cache import RetrievalCache, normalize_query
+
+DOCS = ["Our return policy allows returns within 30 days of delivery."]
+
+
+def test_normalize_query():
+    assert normalize_query("  What is your   RETURN policy?? ") == "what is your return policy"
+    assert normalize_query("ｗｈａｔ is your return policy") == "what is your return policy"
+
+
+def test_near_identical_queries_share_an_entry():
+    cache = RetrievalCache()
+    assert cache.get("What is your return policy?", 3) is None
+
+    cache.put("What is your return policy?", 3, DOCS, kb_version=1, fetch_seconds=0.2)
+    assert cache.get("what is your return policy", 3) == (DOCS, 1)
+    assert cache.get("what is your return policy", 5) is None
+
+
+def test_newer_kb_version_invalidates_and_stale_results_are_ignored():
+    cache = RetrievalCache()
+    cache.put("return policy", 3, DOCS, kb_version=1)
+
+    assert cache.observe_version(2)
+    assert cache.get("return policy", 3) is None
+
+    # A search that started before the change must not repopulate the cache
+    cache.put("return policy", 3, DOCS, kb_version=1)
+    assert len(cache) == 0
+    assert not cache.observe_version(1)
+
+
+def test_lru_bound_and_ttl():
+    cache = RetrievalCache(max_entries=2, ttl=0.05)
+    cache.put("a", 3, DOCS, 1)
+    cache.put("b", 3, DOCS, 1)
+    cache.get("a", 3)
+    cache.put("c", 3, DOCS, 1)
+
+    assert cache.get("b", 3) is None
+    assert cache.get("a", 3) is not None
+    time.sleep(0.06)
+    assert cache.get("a", 3) is None
@@ -0,0 +1,73 @@
+# ============================================================================
+# TESTING - LLM FALLBACK RETRIEVAL (tests/test_retrieval_snapshot.py)
+# ============================================================================
+import os
+import sys
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from llm.retrieval_snapshot import RetrievalSnapshot
+from utils.circuit_breaker import CircuitBreaker, CircuitOpenError, CircuitState
+
+VECTORS = {
+    "Returns are accepted within 30 days.": [1.0, 0.0],
+    "Shipping takes 3-5 business days.": [0.0, 1.0],
+    "Refunds take 5-7 business days.": [0.6, 0.8],
+    "return policy": [0.9, 0.1],
+    "shipping time": [0.1, 0.9],
+}
+
+
+def embed(texts):
+    return np.array([VECTORS[text] for text in texts])
+
+
+def test_snapshot_keeps_most_retrieved_and_survives_restart(tmp_path):
+    snapshot = RetrievalSnapshot(str(tmp_path), embed, max_documents=2)
+    assert snapshot.search("return policy") == []
+
+    snapshot.record(["Returns are accepted within 30 days.", "Shipping takes 3-5 business days."])
+    snapshot.record(["Returns are accepted within 30 days.", "Shipping takes 3-5 business days."])
+    snapshot.record(["Refunds take 5-7 business days."])
+    assert snapshot.sync() == 2
+
+    restarted = RetrievalSnapshot(str(tmp_path), embed, max_documents=2)
+    assert len(restarted) == 2
+    assert isinstance(restarted._snapshot[1], np.memmap)
+    assert restarted.search("return policy", k=1) == ["Returns are accepted within 30 days."]
+    assert restarted.search("shipping time", k=1) == ["Shipping takes 3-5 business days."]
+
+
+def test_sync_publishes_matching_generations(tmp_path):
+    writer = RetrievalSnapshot(str(tmp_path), embed, max_documents=1)
+    writer.record(["Returns are accepted within 30 days."])
+    writer.sync()
+    reader = RetrievalSnapshot(str(tmp_path), embed, max_documents=1)
+
+    for _ in range(2):
+        writer.record(["Shipping takes 3-5 business days."] * 2)
+        writer.sync()
+    # The current and previous generations are kept, one .json and .npy each
+    assert len(list(tmp_path.glob("snapshot-*"))) == 4
+
+    assert reader.search("shipping time", k=1) == ["Returns are accepted within 30 days."]
+    assert reader.load()
+    assert reader.search("shipping time", k=1) == ["Shipping takes 3-5 business days."]
+
+
+@pytest.mark.asyncio
+async def test_open_circuit_raises_circuit_open_error():
+    breaker = CircuitBreaker(failure_threshold=2, timeout=60)
+
+    async def slow_search():
+        raise TimeoutError("knowledge-ingestion timed out")
+
+    for _ in range(2):
+        with pytest.raises(TimeoutError):
+            await breaker.call(slow_search)
+    assert breaker.state == CircuitState.OPEN
+
+    with pytest.raises(CircuitOpenError):
+        await breaker.call(slow_search)
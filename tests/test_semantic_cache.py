@@ -0,0 +1,73 @@
+# ============================================================================
+# TESTING - LLM SEMANTIC CACHE (tests/test_semantic_cache.py)
+# ============================================================================
+import os
+import sys
+import time
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from llm.semantic_cache import SemanticCache
+
+VECTORS = {
+    "What is your return policy?": [1.0, 0.0, 0.0],
+    "whats the return policy": [0.98, 0.2, 0.0],
+    "How do I track my order?": [0.0, 1.0, 0.0],
+}
+RESPONSE = {"response": "Returns are accepted within 30 days.", "confidence": 0.85, "sources": []}
+
+
+def embed(texts):
+    return np.array([VECTORS[text] for text in texts])
+
+
+def test_near_duplicate_hits_within_scope():
+    cache = SemanticCache(embed, threshold=0.95)
+    cache.put(cache.embed("What is your return policy?"), "other", 1, RESPONSE, "standard")
+
+    paraphrase = cache.embed("whats the return policy")
+    assert cache.get(paraphrase, "other", 1, "standard") == RESPONSE
+    # Different question, intent or tier never hits
+    assert cache.get(cache.embed("How do I track my order?"), "other", 1, "standard") is None
+    assert cache.get(paraphrase, "refund_request", 1, "standard") is None
+    assert cache.get(paraphrase, "other", 1, "premium") is None
+
+
+def test_newer_kb_version_invalidates_entries():
+    cache = SemanticCache(embed)
+    vector = cache.embed("What is your return policy?")
+    cache.put(vector, "other", 1, RESPONSE)
+
+    assert cache.get(vector, "other", 2) is None
+    assert len(cache) == 0
+    # A slow request still holding the old version cannot repopulate the cache
+    cache.put(vector, "other", 1, RESPONSE)
+    assert len(cache) == 0
+
+
+def test_ttl_and_size_bound():
+    cache = SemanticCache(embed, ttl=0.05, max_entries=1)
+    policy = cache.embed("What is your return policy?")
+    track = cache.embed("How do I track my order?")
+
+    cache.put(policy, "other", 1, RESPONSE)
+    cache.put(track, "other", 1, {"response": "Use the tracking link."})
+    assert len(cache) == 1
+    assert cache.get(policy, "other", 1) is None
+
+    assert cache.get(track, "other", 1) is not None
+    time.sleep(0.06)
+    assert cache.get(track, "other", 1) is None
+
+
+def test_expired_entries_are_purged_on_insert():
+    cache = SemanticCache(embed, ttl=0.05)
+    cache.put(cache.embed("What is your return policy?"), "other", 1, RESPONSE)
+    cache.put(cache.embed("whats the return policy"), "refund_request", 1, RESPONSE)
+    time.sleep(0.06)
+
+    # Neither expired entry was ever the nearest hit, yet both are gone
+    cache.put(cache.embed("How do I track my order?"), "order_status", 1, {"response": "Use the tracking link."})
+    assert len(cache) == 1
+    assert set(cache._scopes) == {(1, "order_status")}
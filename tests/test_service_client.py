@@ -0,0 +1,125 @@
+# ============================================================================
+# TESTING - SERVICE CLIENTS (tests/test_service_client.py)
+# ============================================================================
+import os
+import sys
+import httpx
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from utils.service_client import BUDGET_HEADER, DeadlineExceeded, ServiceClient, request_deadline
+
+
+def make_client(handler, **options):
+    return ServiceClient(
+        "upstream",
+        "http://upstream",
+        transport=httpx.MockTransport(handler),
+        backoff_base=0.001,
+        **options
+    )
+
+
+@pytest.mark.asyncio
+async def test_idempotent_calls_are_retried():
+    """GET is retried on 503 until it succeeds"""
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(503 if len(calls) < 3 else 200, json={"ok": True})
+
+    client = make_client(handler, retries=2)
+    await client.start()
+    try:
+        response = await client.get("/profile/1")
+    finally:
+        await client.close()
+
+    assert response.status_code == 200
+    assert len(calls) == 3
+
+
+@pytest.mark.asyncio
+async def test_non_idempotent_calls_are_not_retried():
+    """POST returns the upstream error instead of replaying the request"""
+    calls = []
+
+    def handler(request):
+        calls.append(request)
+        return httpx.Response(503)
+
+    client = make_client(handler, retries=3)
+    await client.start()
+    try:
+        response = await client.post("/conversation/add", json={})
+    finally:
+        await client.close()
+
+    assert response.status_code == 503
+    assert len(calls) == 1
+
+
+@pytest.mark.asyncio
+async def test_budget_header_reflects_remaining_deadline():
+    """Outgoing calls carry the smaller of the client timeout and the request budget"""
+    seen = []
+
+    def handler(request):
+        seen.append(int(request.headers[BUDGET_HEADER]))
+        return httpx.Response(200)
+
+    client = make_client(handler, timeout=60.0)
+    await client.start()
+    try:
+        await client.get("/a")
+        with request_deadline(2.0):
+            await client.get("/b")
+    finally:
+        await client.close()
+
+    assert seen[0] == 60000
+    assert 0 < seen[1] <= 2000
+
+
+@pytest.mark.asyncio
+async def test_exhausted_budget_fails_fast():
+    """No upstream call is made once the deadline has passed"""
+    def handler(request):
+        raise AssertionError("upstream should not be called")
+
+    client = make_client(handler)
+    await client.start()
+    try:
+        with request_deadline(0.0):
+            with pytest.raises(DeadlineExceeded):
+                await client.get("/late")
+    finally:
+        await client.close()
+
+
+@pytest.mark.asyncio
+async def test_server_sent_events_round_trip():
+    """Events encoded with format_sse are parsed back by iter_sse"""
+    from utils.service_client import format_sse, iter_sse
+
+    body = format_sse("token", {"token": "Hel"}) + format_sse("token", {"token": "lo"}) + \
+        format_sse("done", {"response": "Hello"})
+
+    def handler(request):
+        return httpx.Response(200, content=body.encode(), headers={"content-type": "text/event-stream"})
+
+    client = make_client(handler)
+    await client.start()
+    try:
+        async with client.stream("POST", "/generate/stream") as response:
+            events = [event async for event in iter_sse(response)]
+    finally:
+        await client.close()
+
+    assert events == [
+        ("token", {"token": "Hel"}),
+        ("token", {"token": "lo"}),
+        ("done", {"response": "Hello"}),
+    ]
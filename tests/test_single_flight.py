@@ -0,0 +1,55 @@
+# ============================================================================
+# TESTING - LLM REQUEST COALESCING (tests/test_single_flight.py)
+# ============================================================================
+import asyncio
+import os
+import sys
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from llm.single_flight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_calls_share_one_execution():
+    flights = SingleFlight()
+    calls = []
+
+    async def generate():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "Shipping is delayed by two days."
+
+    results = await asyncio.gather(*[flights.do("shipping", generate) for _ in range(10)])
+
+    assert len(calls) == 1
+    assert {text for text, _ in results} == {"Shipping is delayed by two days."}
+    assert sum(shared for _, shared in results) == 9
+    assert len(flights) == 0
+
+    # Once the flight lands, the next call executes again
+    await flights.do("shipping", generate)
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_errors_reach_followers_and_leader_cancellation_does_not():
+    flights = SingleFlight()
+    release = asyncio.Event()
+
+    async def failing():
+        await release.wait()
+        raise RuntimeError("provider rate limited")
+
+    leader = asyncio.ensure_future(flights.do("k", failing))
+    follower = asyncio.ensure_future(flights.do("k", failing))
+    await asyncio.sleep(0)
+
+    # The leader's client disconnects; the follower still gets the outcome
+    leader.cancel()
+    release.set()
+    with pytest.raises(RuntimeError):
+        await follower
+    with pytest.raises(asyncio.CancelledError):
+        await leader
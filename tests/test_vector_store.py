@@ -0,0 +1,289 @@
+# ============================================================================
+# TESTING - KNOWLEDGE BASE VECTOR STORE (tests/test_vector_store.py)
+# ============================================================================
+import os
+import pickle
+import sys
+import zlib
+import faiss
+import numpy as np
+import pytest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'knowledge-ingestion'))
+
+from ann_index import IndexSettings
+import vector_store
+from vector_store import VectorStore
+
+DIMENSION = 8
+
+
+class CountingEmbedder:
+    def __init__(self):
+        self.encoded = []
+
+    def encode(self, texts, batch_size=32):
+        self.encoded.extend(texts)
+        return np.array([
+            np.random.default_rng(zlib.crc32(text.encode())).normal(size=DIMENSION)
+            for text in texts
+        ])
+
+
+def doc(doc_id, content):
+    return {"id": doc_id, "title": doc_id, "content": content, "category": "faq", "metadata": {}}
+
+
+@pytest.fixture
+def embedder():
+    return CountingEmbedder()
+
+
+def open_store(tmp_path, embedder, index_type="flat"):
+    return VectorStore(
+        dimension=DIMENSION,
+        index_path=str(tmp_path / "index.faiss"),
+        settings=IndexSettings(index_type=index_type),
+        embedding_model=embedder
+    )
+
+
+@pytest.mark.parametrize("index_type", ["flat", "hnsw"])
+def test_delete_and_upsert_do_not_reembed(tmp_path, embedder, index_type):
+    store = open_store(tmp_path, embedder, index_type)
+    store.add_documents([doc("returns", "Returns within 30 days"), doc("shipping", "Ships in 3 days")])
+    embedder.encoded.clear()
+
+    store.delete_by_id(["returns"])
+    assert embedder.encoded == []
+    assert store.index.ntotal - len(store.tombstones) == 1
+
+    store.add_documents([doc("shipping", "Ships in 5 days")])
+    assert embedder.encoded == ["Ships in 5 days"]
+    assert store.index.ntotal - len(store.tombstones) == 1
+    results = store.search("Ships in 5 days", k=5)
+    assert [r["content"] for r in results] == ["Ships in 5 days"]
+
+
+def test_hnsw_removals_are_tombstoned_then_compacted_in_background(tmp_path, embedder, monkeypatch):
+    store = VectorStore(
+        dimension=DIMENSION,
+        index_path=str(tmp_path / "index.faiss"),
+        settings=IndexSettings(index_type="hnsw"),
+        embedding_model=embedder,
+        max_tombstone_ratio=1.0
+    )
+    store.add_documents([doc(str(i), f"document {i}") for i in range(8)])
+    store.wait_for_rebuild()  # from the empty store's flat index
+    index = store.index
+
+    store.delete_by_id(["0", "1"])
+    assert store.index is index and store.tombstones == {0, 1}
+    assert {r["id"] for r in store.search("document 0", k=8)} == {str(i) for i in range(2, 8)}
+
+    # Changes made while the replacement is being built are replayed onto it
+    build_index = vector_store.build_index
+
+    def build_during_changes(*args):
+        built = build_index(*args)
+        store.add_documents([doc("8", "document 8")])
+        store.delete_by_id(["2"])
+        return built
+
+    monkeypatch.setattr(vector_store, "build_index", build_during_changes)
+    store.rebuild()
+    monkeypatch.setattr(vector_store, "build_index", build_index)
+    assert store.index is not index and store.tombstones == {2}
+    assert store.index.ntotal == 7
+    assert {r["id"] for r in store.search("document 8", k=8)} == {str(i) for i in range(3, 9)}
+
+    # Past the tombstone ratio a rebuild is scheduled on the background thread
+    store.max_tombstone_ratio = 0.1
+    store.delete_by_id(["3"])
+    store.wait_for_rebuild()
+    assert store.tombstones == set() and store.index.ntotal == 5
+
+
+def test_reingest_embeds_only_changed_chunks(tmp_path, embedder):
+    store = open_store(tmp_path, embedder)
+    pages = [f"page {i}" for i in range(5)]
+
+    def manual(texts, title="Manual"):
+        return [
+            {**doc(f"manual#{i}", text), "title": title, "parent_id": "manual", "metadata": {"chunk": i}}
+            for i, text in enumerate(texts)
+        ]
+
+    store.add_documents(manual(pages))
+    version = store.version
+    embedder.encoded.clear()
+
+    counts = store.add_documents(manual(pages))
+    assert counts == {"added": 0, "updated": 0, "unchanged": 5, "removed": 0, "embedded": 0}
+    assert store.version == version
+
+    # An inserted page shifts the later chunks; only the new text is embedded
+    edited = pages[:2] + ["new page"] + pages[2:4]
+    counts = store.add_documents(manual(edited))
+    assert embedder.encoded == ["new page"]
+    assert counts == {"added": 0, "updated": 3, "unchanged": 2, "removed": 0, "embedded": 1}
+    assert store.search("page 3", k=1)[0]["chunk_id"] == "manual#4"
+    assert store.index.ntotal == 5
+
+    # Title-only changes rewrite records in place, and removed text stays cached
+    embedder.encoded.clear()
+    vector_ids = dict(store.vector_ids)
+    store.add_documents(manual(edited, title="Manual v2"))
+    assert store.vector_ids == vector_ids
+    store.add_documents(manual(pages))
+    assert embedder.encoded == []
+    assert store.search("page 4", k=1)[0]["title"] == "Manual"
+
+
+def test_reload_keeps_ids_and_embeddings(tmp_path, embedder):
+    store = open_store(tmp_path, embedder)
+    store.add_documents([doc("a", "alpha"), doc("b", "beta")])
+    store.delete_by_id(["a"])
+    store.add_documents([doc("c", "gamma")])
+
+    store.close()
+
+    reopened = open_store(tmp_path, embedder)
+    assert reopened.vector_ids == {"b": 1, "c": 2}
+    embedder.encoded.clear()
+    assert reopened.add_documents([doc("b", "beta")])["unchanged"] == 1
+    assert embedder.encoded == []
+    assert reopened.next_id == 3
+    assert reopened.version == store.version
+    assert reopened.search("gamma", k=1)[0]["id"] == "c"
+
+
+def test_migrates_position_keyed_metadata(tmp_path, embedder):
+    index_path = tmp_path / "index.faiss"
+    legacy = faiss.IndexFlatL2(DIMENSION)
+    legacy.add(embedder.encode(["alpha", "beta"]).astype('float32'))
+    faiss.write_index(legacy, str(index_path))
+    with open(f"{index_path}.metadata", "wb") as f:
+        pickle.dump([doc("a", "alpha"), doc("b", "beta")], f)
+    embedder.encoded.clear()
+
+    store = open_store(tmp_path, embedder)
+    assert embedder.encoded == []  # vectors were read back from the index
+    assert store.vector_ids == {"a": 0, "b": 1}
+    assert store.search("beta", k=1)[0]["id"] == "b"
+
+
+def test_switches_to_ann_past_threshold(tmp_path, embedder):
+    store = VectorStore(
+        dimension=DIMENSION,
+        index_path=str(tmp_path / "index.faiss"),
+        settings=IndexSettings(index_type="auto", ann_type="hnsw", ann_threshold=3),
+        embedding_model=embedder
+    )
+    store.add_documents([doc(str(i), f"document {i}") for i in range(3)])
+    assert store.index_type == "flat"
+    store.add_documents([doc("3", "document 3")])
+    # The flat index keeps serving until the background build is swapped in
+    assert store.search("document 3", k=1)[0]["id"] == "3"
+    store.wait_for_rebuild()
+    assert store.index_type == "hnsw"
+    assert store.search("document 2", k=1)[0]["id"] == "2"
+
+
+def test_changes_survive_a_crash_before_checkpoint(tmp_path, embedder):
+    store = open_store(tmp_path, embedder)
+    store.add_documents([doc("a", "alpha"), doc("b", "beta")])
+    store.delete_by_id(["a"])
+    assert not os.path.exists(tmp_path / "index.faiss.metadata")  # nothing rewritten per request
+
+    # No close(): the process died with the changes only in the log
+    recovered = open_store(tmp_path, embedder)
+    assert recovered.vector_ids == {"b": 1}
+    assert recovered.version == store.version == 2
+    assert recovered.search("beta", k=5)[0]["id"] == "b"
+
+
+def test_checkpoint_truncates_log_and_ignores_torn_tail(tmp_path, embedder):
+    store = open_store(tmp_path, embedder)
+    store.add_documents([doc("a", "alpha")])
+    assert store.checkpoint()
+    assert not store.checkpoint()
+    assert store.wal.segments() == []
+
+    store.add_documents([doc("b", "beta")])
+    segment = store.wal.segments()[-1]
+    with open(store.wal._segment_path(segment), "ab") as f:
+        f.write(b"\x00\x00\x01\x00partial")
+
+    recovered = open_store(tmp_path, embedder)
+    assert set(recovered.vector_ids) == {"a", "b"}
+    assert recovered.version == 2
+    # Recovery checkpoints what it replayed
+    assert recovered.wal.segments() == []
+
+
+def test_crash_mid_checkpoint_reopens_from_previous_checkpoint(tmp_path, embedder, monkeypatch):
+    store = open_store(tmp_path, embedder)
+    store.add_documents([doc("a", "alpha"), doc("b", "beta")])
+    assert store.checkpoint()
+    store.delete_by_id(["a"])
+    store.add_documents([doc("c", "gamma")])
+
+    atomic_write = vector_store.atomic_write
+
+    def crash_before_metadata(path, data, fsync=True):
+        if path.endswith(".metadata"):
+            raise OSError("killed")
+        atomic_write(path, data, fsync)
+
+    monkeypatch.setattr(vector_store, "atomic_write", crash_before_metadata)
+    with pytest.raises(OSError):
+        store.checkpoint()
+    monkeypatch.undo()
+
+    # The new index and embeddings are on disk, but the metadata still names the old ones
+    recovered = open_store(tmp_path, embedder)
+    assert recovered.vector_ids == {"b": 1, "c": 2}
+    assert sorted(recovered.embeddings) == [1, 2]
+    assert recovered.search("gamma", k=1)[0]["id"] == "c"
+    recovered.close()
+    # Only the files of the checkpoint written on recovery are left
+    generation = f"{recovered.wal.generation:08d}"
+    assert sorted(os.listdir(tmp_path)) == [
+        f"index.faiss.{generation}", f"index.faiss.{generation}.embeddings",
+        f"index.faiss.documents.{generation}", f"index.faiss.documents.{generation}.rows", "index.faiss.metadata",
+    ]
+
+
+def test_search_reads_checkpointed_documents(tmp_path, embedder):
+    store = open_store(tmp_path, embedder)
+    store.add_documents([doc("a", "alpha"), doc("b", "beta")])
+    store.close()
+
+    reopened = open_store(tmp_path, embedder)
+    assert reopened.documents._added == {}
+    result = reopened.search("beta", k=1)[0]
+    assert result["id"] == "b" and "score" in result
+    assert reopened.search("beta", k=1)[0] == result  # results are independent copies
+
+
+def test_chunked_documents_are_returned_once_per_parent(tmp_path, embedder):
+    store = open_store(tmp_path, embedder)
+    chunks = [
+        {**doc(f"manual#{i}", f"manual part {i}"), "parent_id": "manual", "metadata": {"chunk": i}}
+        for i in range(3)
+    ]
+    store.add_documents(chunks + [doc("faq", "faq answer")])
+
+    results = store.search("manual part 1", k=2)
+    assert [r["id"] for r in results] == ["manual", "faq"]
+    assert results[0]["chunk_id"] == "manual#1"
+
+    # Re-ingesting a shorter version drops the chunks it no longer has
+    store.add_documents([doc("manual", "short manual")])
+    assert set(store.vector_ids) == {"manual", "faq"}
+    assert store.chunks == {}
+
+    store.add_documents(chunks[:2])
+    store.delete_by_id(["manual"])
+    assert set(store.vector_ids) == {"faq"}
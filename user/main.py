@@ -4,11 +4,30 @@
 from fastapi import FastAPI
 from pydantic import BaseModel
 from typing import Optional, Dict, Any
-import psycopg2
-from psycopg2.extras import RealDictCursor
+import asyncpg
 import json
+import os
+from middleware.metrics import setup_metrics_endpoint
+from middleware.event_loop import setup_event_loop
 
 app = FastAPI(title="User Profile Service")
+setup_metrics_endpoint(app)
+
+# Database access goes through an asyncpg pool so queries never block the loop
+setup_event_loop(
+    app,
+    "user_profile",
+    threads=int(os.getenv("EVENT_LOOP_THREADS", "8")),
+    block_threshold_ms=float(os.getenv("EVENT_LOOP_BLOCK_THRESHOLD_MS", "100"))
+)
+
+POSTGRES_HOST = os.getenv("POSTGRES_HOST", "postgres")
+POSTGRES_DB = os.getenv("POSTGRES_DB", "chatbot_db")
+POSTGRES_USER = os.getenv("POSTGRES_USER", "chatbot_user")
+POSTGRES_PASSWORD = os.getenv("POSTGRES_PASSWORD", "chatbot_password")
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+
+db_pool: Optional[asyncpg.Pool] = None
 
 class UserProfile(BaseModel):
     user_id: str
@@ -18,23 +37,34 @@ class UserProfile(BaseModel):
     preferences: Optional[Dict[str, Any]] = {}
     tier: Optional[str] = "standard"
 
-def get_db_connection():
-    return psycopg2.connect(
-        host="postgres",
-        database="chatbot_db",
-        user="chatbot_user",
-        password="chatbot_password"
+async def init_connection(conn: asyncpg.Connection):
+    # preferences is stored as JSONB; exchange it as dicts
+    await conn.set_type_codec("jsonb", encoder=json.dumps, decoder=json.loads, schema="pg_catalog")
+
+@app.on_event("startup")
+async def open_db_pool():
+    global db_pool
+    db_pool = await asyncpg.create_pool(
+        host=POSTGRES_HOST,
+        database=POSTGRES_DB,
+        user=POSTGRES_USER,
+        password=POSTGRES_PASSWORD,
+        min_size=1,
+        max_size=DB_POOL_MAX_SIZE,
+        init=init_connection
     )
 
+@app.on_event("shutdown")
+async def close_db_pool():
+    if db_pool is not None:
+        await db_pool.close()
+
 @app.post("/profile")
 async def create_profile(profile: UserProfile):
-    conn = get_db_connection()
-    cur = conn.cursor()
-    
-    cur.execute(
+    await db_pool.execute(
         """
         INSERT INTO user_profiles (user_id, name, email, phone, preferences, tier)
-        VALUES (%s, %s, %s, %s, %s, %s)
+        VALUES ($1, $2, $3, $4, $5, $6)
         ON CONFLICT (user_id) DO UPDATE SET
             name = EXCLUDED.name,
             email = EXCLUDED.email,
@@ -42,31 +72,21 @@ async def create_profile(profile: UserProfile):
             preferences = EXCLUDED.preferences,
             tier = EXCLUDED.tier
         """,
-        (profile.user_id, profile.name, profile.email, profile.phone, 
-         json.dumps(profile.preferences), profile.tier)
+        profile.user_id, profile.name, profile.email, profile.phone,
+        profile.preferences, profile.tier
     )
     
-    conn.commit()
-    cur.close()
-    conn.close()
-    
     return {"status": "success"}
 
 @app.get("/profile/{user_id}")
 async def get_profile(user_id: str):
-    conn = get_db_connection()
-    cur = conn.cursor(cursor_factory=RealDictCursor)
-    
-    cur.execute(
-        "SELECT * FROM user_profiles WHERE user_id = %s",
-        (user_id,)
+    row = await db_pool.fetchrow(
+        "SELECT * FROM user_profiles WHERE user_id = $1",
+        user_id
     )
     
-    profile = cur.fetchone()
-    cur.close()
-    conn.close()
-    
-    if profile:
+    if row:
+        profile = dict(row)
         profile['preferences'] = profile.get('preferences') or {}
         return profile
     return {"error": "Profile not found"}
@@ -10,6 +10,9 @@ class CircuitState(Enum):
     OPEN = "open"
     HALF_OPEN = "half_open"
 
+class CircuitOpenError(Exception):
+    pass
+
 class CircuitBreaker:
     def __init__(self, failure_threshold: int = 5, timeout: int = 60, half_open_attempts: int = 3):
         self.failure_threshold = failure_threshold
@@ -20,13 +23,19 @@ class CircuitBreaker:
         self.state = CircuitState.CLOSED
         self.half_open_success_count = 0
     
-    async def call(self, func, *args, **kwargs):
+    def allow_request(self) -> bool:
+        """False while open; moves to half-open once the reset timeout has passed"""
         if self.state == CircuitState.OPEN:
             if datetime.now() - self.last_failure_time > timedelta(seconds=self.timeout):
                 self.state = CircuitState.HALF_OPEN
                 self.half_open_success_count = 0
             else:
-                raise Exception("Circuit breaker is OPEN")
+                return False
+        return True
+    
+    async def call(self, func, *args, **kwargs):
+        if not self.allow_request():
+            raise CircuitOpenError("Circuit breaker is OPEN")
         
         try:
             result = await func(*args, **kwargs)
@@ -36,6 +45,13 @@ class CircuitBreaker:
             self._on_failure()
             raise
     
+    # For calls that cannot be wrapped by call(), e.g. streamed responses
+    def record_success(self):
+        self._on_success()
+    
+    def record_failure(self):
+        self._on_failure()
+    
     def _on_success(self):
         if self.state == CircuitState.HALF_OPEN:
             self.half_open_success_count += 1